@@ -0,0 +1,315 @@
+"""
+analysis.py
+-----------
+Clause-level contract analysis orchestration: runs `reason_over_clause`
+over every clause of a contract with bounded concurrency, keeps results in
+the original clause order and isolates per-clause failures.
+
+Near-duplicate clauses (see backend/dedup.py) are analysed once: within a
+contract the result of a group's representative is fanned out to every
+member (marked with "duplicate_of" and "similarity"), and across contracts
+a clause close enough to a previously analysed one reuses its cached
+analysis (marked with "near_duplicate"). Both are opt-in (DEDUP_ENABLED=1)
+and require the clauses' negations, modals and numbers to match (party names
+may differ, but shared names must keep their roles).
+"""
+
+import os
+import asyncio
+import logging
+
+from backend.reasoning import (
+    reason_over_clause,
+    ANALYSIS_MODEL,
+    ANALYSIS_TEMPERATURE,
+    RETRIEVAL_K,
+)
+from backend.retrieval import retrieve_many
+from backend.prompts.contract_analysis import PROMPT_VERSION
+from backend.llm_cache import get_response_cache, make_key, CACHE_ENABLED
+from backend import dedup
+from backend.json_repair import strip_code_fences
+from backend.schemas import ClauseAnalysis, OutputValidationError, validate_output
+
+MAX_CONCURRENCY = int(os.getenv("ANALYZE_MAX_CONCURRENCY", "16"))
+
+logger = logging.getLogger(__name__)
+
+
+def clean_llm_json(text: str) -> str:
+    """
+    Remove ```json ... ``` wrappers and return raw JSON string.
+    """
+    if not isinstance(text, str):
+        return str(text)
+    return strip_code_fences(text)
+
+
+def _cache_key(clause: str):
+    return make_key(clause, PROMPT_VERSION, ANALYSIS_MODEL, ANALYSIS_TEMPERATURE)
+
+
+async def prefetch_context(clauses):
+    """
+    Retrieve memory context for every clause not already cached, using one
+    batched query per store (Chroma and FAISS) for the whole contract.
+    Returns {clause: retrieved}; empty if the batched search fails, in which
+    case each clause falls back to its own retrieval.
+    """
+    def uncached():
+        if not CACHE_ENABLED:
+            return list(dict.fromkeys(clauses))
+        cache = get_response_cache()
+        return list(dict.fromkeys(c for c in clauses if not cache.contains(_cache_key(c))))
+
+    try:
+        pending = await asyncio.to_thread(uncached)
+    except Exception as e:
+        logger.warning("Cache check failed, retrieving context for every clause: %s", e)
+        pending = list(dict.fromkeys(clauses))
+    if not pending:
+        return {}
+
+    try:
+        results = await retrieve_many(pending, k=RETRIEVAL_K)
+    except Exception:
+        return {}
+
+    return dict(zip(pending, results))
+
+
+def _lookup(cache_key: str, clause: str, signature, use_dedup: bool):
+    """
+    Blocking cache lookup, exact key first, then a near-duplicate. Returns
+    (cached value or None, near-duplicate similarity or None, signature).
+    """
+    cache = get_response_cache()
+    cached = cache.get(cache_key)
+    if cached is not None or not use_dedup:
+        return cached, None, signature
+    if signature is None:
+        signature = dedup.minhash(clause)
+    match = dedup.get_dedup_index().query(signature, dedup.meaning_guard(clause))
+    cached = cache.get(match[0]) if match else None
+    return cached, match[1] if cached is not None else None, signature
+
+
+def _store(cache_key: str, clause: str, value, signature, use_dedup: bool):
+    get_response_cache().set(cache_key, value)
+    if use_dedup:
+        if signature is None:
+            signature = dedup.minhash(clause)
+        dedup.get_dedup_index().add(cache_key, signature, dedup.meaning_guard(clause))
+
+
+async def analyze_clause(clause: str, retrieved=None, signature=None):
+    """
+    Analyze one clause and return its result entry.
+    Failures (LLM errors, unparseable JSON) are reported in an "error" field
+    instead of being raised, so one bad clause never sinks the whole contract.
+    Successful analyses are served from the response cache on repeat clauses,
+    or on near-duplicates of previously analysed clauses. `signature` is the
+    clause's MinHash signature, if already computed. Cache and index I/O
+    runs in a worker thread; if it fails the clause is simply re-analysed.
+    """
+    cache_key = None
+    use_dedup = CACHE_ENABLED and dedup.DEDUP_ENABLED
+    if CACHE_ENABLED:
+        cache_key = _cache_key(clause)
+        try:
+            cached, sim, signature = await asyncio.to_thread(
+                _lookup, cache_key, clause, signature, use_dedup
+            )
+        except Exception as e:
+            logger.warning("Cache lookup failed, treating as a miss: %s", e)
+            cached = None
+        if cached is not None:
+            entry = {
+                "clause": clause,
+                "analysis": cached["analysis"],
+                "sources": cached["sources"],
+                "cached": True,
+            }
+            if sim is not None:
+                dedup.STATS["cross_document"] += 1
+                entry["near_duplicate"] = {"similarity": sim}
+            return entry
+
+    try:
+        raw_text, sources = await reason_over_clause(clause, retrieved=retrieved)
+    except Exception as e:
+        return {
+            "clause": clause,
+            "analysis": None,
+            "sources": [],
+            "error": f"LLM request failed: {e}",
+        }
+
+    try:
+        reasoning = validate_output(ClauseAnalysis, raw_text)
+    except OutputValidationError as e:
+        return {
+            "clause": clause,
+            "analysis": None,
+            "sources": sources,
+            "error": f"invalid LLM output: {e}",
+            "raw_output": clean_llm_json(raw_text)[:4000],
+        }
+
+    if cache_key is not None:
+        try:
+            await asyncio.to_thread(
+                _store, cache_key, clause, {"analysis": reasoning, "sources": sources},
+                signature, use_dedup,
+            )
+        except Exception as e:
+            logger.warning("Could not cache clause analysis: %s", e)
+
+    return {
+        "clause": clause,
+        "analysis": reasoning,
+        "sources": sources,
+    }
+
+
+def _fan_out(entry, clause: str, rep_index: int, sim: float):
+    """Copy a representative's result entry to a near-duplicate member."""
+    return {**entry, "clause": clause, "duplicate_of": rep_index, "similarity": sim}
+
+
+def _group(clauses):
+    """
+    Cluster near-duplicate clauses. Returns (reps, members): reps maps each
+    representative index to its signature, members maps a representative
+    index to [(member index, similarity)].
+    """
+    dedup.STATS["clauses"] += len(clauses)
+    if not dedup.DEDUP_ENABLED:
+        return {i: None for i in range(len(clauses))}, {}
+
+    reps, members = {}, {}
+    for i, (rep, sim, sig) in enumerate(dedup.cluster(clauses)):
+        if rep == i:
+            reps[i] = sig
+        else:
+            members.setdefault(rep, []).append((i, sim))
+            dedup.STATS["in_document"] += 1
+    return reps, members
+
+
+async def analyze_clauses(clauses, max_concurrency: int = None):
+    """
+    Analyze clauses concurrently with at most `max_concurrency` LLM calls in
+    flight, once per group of near-duplicates. Results are returned in the
+    same order as `clauses`.
+    """
+    clauses = list(clauses)
+    if not clauses:
+        return []
+
+    reps, members = _group(clauses)
+    context = await prefetch_context([clauses[i] for i in reps])
+    semaphore = asyncio.Semaphore(max(1, max_concurrency or MAX_CONCURRENCY))
+
+    async def bounded(index):
+        clause = clauses[index]
+        async with semaphore:
+            return await analyze_clause(
+                clause, retrieved=context.get(clause), signature=reps[index]
+            )
+
+    output = [None] * len(clauses)
+    for index, entry in zip(reps, await asyncio.gather(*(bounded(i) for i in reps))):
+        output[index] = entry
+        for member, sim in members.get(index, ()):
+            output[member] = _fan_out(entry, clauses[member], index, sim)
+    return output
+
+
+async def iter_clause_analyses(clauses, max_concurrency: int = None):
+    """
+    Analyze clauses concurrently and yield `(index, entry)` pairs as soon as
+    each clause finishes, so callers can stream results in completion order.
+    Near-duplicates are yielded together with their group's representative.
+    Pending analyses are cancelled if the consumer stops early.
+    """
+    clauses = list(clauses)
+    reps, members = _group(clauses)
+    context = await prefetch_context([clauses[i] for i in reps])
+    semaphore = asyncio.Semaphore(max(1, max_concurrency or MAX_CONCURRENCY))
+
+    async def bounded(index):
+        clause = clauses[index]
+        async with semaphore:
+            return index, await analyze_clause(
+                clause, retrieved=context.get(clause), signature=reps[index]
+            )
+
+    tasks = [asyncio.ensure_future(bounded(i)) for i in reps]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            index, entry = await next_done
+            yield index, entry
+            for member, sim in members.get(index, ()):
+                yield member, _fan_out(entry, clauses[member], index, sim)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def iter_streamed_clause_analyses(clauses, max_concurrency: int = None):
+    """
+    Like `iter_clause_analyses`, but for an async iterable of clauses that
+    are still being produced (e.g. extracted page by page from a PDF).
+    A new clause is only pulled once one of the `max_concurrency` slots is
+    free, so a slow LLM applies back-pressure to extraction and memory stays
+    bounded however long the document is (beyond one small result entry per
+    distinct clause, kept for its near-duplicates). Near-duplicates of an
+    earlier clause wait for (or reuse) that clause's result instead of
+    taking a slot. Yields `(index, entry)` pairs in completion order.
+    """
+    limit = max(1, max_concurrency or MAX_CONCURRENCY)
+    clauses = clauses.__aiter__()
+    clusters = dedup.ClauseClusters() if dedup.DEDUP_ENABLED else None
+    pending = set()
+    waiting = {}   # representative index -> [(member index, clause, similarity)]
+    finished = {}  # representative index -> entry, for later near-duplicates
+    index = 0
+    exhausted = False
+
+    async def indexed(i, clause, sig):
+        return i, await analyze_clause(clause, signature=sig)
+
+    try:
+        while pending or not exhausted:
+            while not exhausted and len(pending) < limit:
+                try:
+                    clause = await clauses.__anext__()
+                except StopAsyncIteration:
+                    exhausted = True
+                    break
+                dedup.STATS["clauses"] += 1
+                rep, sim, sig = (index, 1.0, None) if clusters is None else clusters.assign(index, clause)
+                if rep == index:
+                    pending.add(asyncio.ensure_future(indexed(index, clause, sig)))
+                else:
+                    dedup.STATS["in_document"] += 1
+                    if rep in finished:
+                        yield index, _fan_out(finished[rep], clause, rep, sim)
+                    else:
+                        waiting.setdefault(rep, []).append((index, clause, sim))
+                index += 1
+
+            if not pending:
+                break
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                rep, entry = task.result()
+                if clusters is not None:
+                    finished[rep] = entry
+                yield rep, entry
+                for member, clause, sim in waiting.pop(rep, ()):
+                    yield member, _fan_out(entry, clause, rep, sim)
+    finally:
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,145 @@
+"""
+chunk_store.py
+--------------
+Append-only, memory-mapped store for FAISS chunk texts and metadata.
+
+Rows live in a JSONL data file; a sidecar of little-endian uint64 end
+offsets (one per row) gives O(1) random access. Both files are opened with
+mmap, so every worker process shares one page-cache copy and opening the
+store costs nothing proportional to its size. Individual rows are only
+decoded when a search actually returns them.
+"""
+
+import os
+import json
+import mmap
+import threading
+import numpy as np
+from pathlib import Path
+
+OFFSET_DTYPE = np.dtype("<u8")
+
+
+class ChunkStore:
+    """Row i is the (chunk, metadata) pair for FAISS vector id i."""
+
+    def __init__(self, data_path, offsets_path, limit=None):
+        self.data_path = Path(data_path)
+        self.offsets_path = Path(offsets_path)
+        self._lock = threading.Lock()
+        # (data mmap, end offsets, unflushed rows), replaced as one unit so
+        # lock-free readers always see a consistent view across flushes.
+        self._view = (None, np.zeros(0, dtype=OFFSET_DTYPE), [])
+
+        self.data_path.parent.mkdir(parents=True, exist_ok=True)
+        self.data_path.touch(exist_ok=True)
+        if not self.offsets_path.exists():
+            self._rebuild_offsets()
+
+        self._repair(limit)
+        self._view = self._open_view()
+
+    def _rebuild_offsets(self):
+        """One linear scan of the data file to recreate the offsets sidecar."""
+        ends = []
+        pos = 0
+        with open(self.data_path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                pos += len(line)
+                ends.append(pos)
+        tmp = self.offsets_path.with_suffix(".tmp")
+        np.asarray(ends, dtype=OFFSET_DTYPE).tofile(tmp)
+        os.replace(tmp, self.offsets_path)
+
+    def _repair(self, limit):
+        """
+        Truncate both files to a consistent row count: drop a torn offsets
+        entry, rows whose offsets were never written, and rows beyond `limit`
+        (the number of vectors actually persisted in the index).
+        """
+        rows = os.path.getsize(self.offsets_path) // OFFSET_DTYPE.itemsize
+        if rows:
+            ends = np.fromfile(self.offsets_path, dtype=OFFSET_DTYPE, count=rows)
+            data_size = os.path.getsize(self.data_path)
+            while rows and ends[rows - 1] > data_size:
+                rows -= 1
+        else:
+            ends = np.zeros(0, dtype=OFFSET_DTYPE)
+        if limit is not None:
+            rows = min(rows, limit)
+
+        end = int(ends[rows - 1]) if rows else 0
+        if os.path.getsize(self.offsets_path) != rows * OFFSET_DTYPE.itemsize:
+            with open(self.offsets_path, "r+b") as f:
+                f.truncate(rows * OFFSET_DTYPE.itemsize)
+        if os.path.getsize(self.data_path) != end:
+            with open(self.data_path, "r+b") as f:
+                f.truncate(end)
+
+    def _open_view(self):
+        data_map = None
+        if os.path.getsize(self.data_path):
+            with open(self.data_path, "rb") as f:
+                data_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if os.path.getsize(self.offsets_path):
+            offsets = np.memmap(self.offsets_path, dtype=OFFSET_DTYPE, mode="r")
+        else:
+            offsets = np.zeros(0, dtype=OFFSET_DTYPE)
+
+        return data_map, offsets, []
+
+    @property
+    def persisted(self) -> int:
+        return len(self._view[1])
+
+    def __len__(self):
+        _, offsets, pending = self._view
+        return len(offsets) + len(pending)
+
+    def get(self, i: int):
+        """Return the decoded row {"chunk": ..., "metadata": ...} for vector id i."""
+        data_map, offsets, pending = self._view
+        n = len(offsets)
+        if i >= n:
+            return pending[i - n]
+        start = int(offsets[i - 1]) if i else 0
+        end = int(offsets[i])
+        return json.loads(data_map[start:end])
+
+    def chunk(self, i: int):
+        return self.get(i)["chunk"]
+
+    def metadata(self, i: int):
+        return self.get(i)["metadata"]
+
+    def append(self, chunk, metadata):
+        """Queue a row; it is readable immediately and written on `flush`."""
+        with self._lock:
+            self._view[2].append({"chunk": chunk, "metadata": metadata})
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self._view[2])
+
+    def flush(self):
+        """Append queued rows to the data file, then their end offsets, then remap."""
+        with self._lock:
+            pending = self._view[2]
+            if not pending:
+                return
+            lines = [
+                (json.dumps(r, ensure_ascii=False) + "\n").encode("utf-8")
+                for r in pending
+            ]
+            base = os.path.getsize(self.data_path)
+            ends = base + np.cumsum([len(l) for l in lines], dtype=np.uint64)
+
+            with open(self.data_path, "ab") as f:
+                f.writelines(lines)
+            with open(self.offsets_path, "ab") as f:
+                f.write(ends.astype(OFFSET_DTYPE).tobytes())
+
+            self._view = self._open_view()
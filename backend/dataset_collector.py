@@ -1,13 +1,12 @@
 import os
+import asyncio
 import requests
 import csv
+from pathlib import Path
 from datetime import datetime
 from bs4 import BeautifulSoup
-from openai import OpenAI
-from dotenv import load_dotenv
 
-load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from backend.generation import GenerationItem, generate_all
 
 BASE_DIR = "data/raw"
 SOURCES = {
@@ -40,29 +39,26 @@ def fetch_text_from_url(url, selector=None, limit=5):
         print(f"❌ Error fetching {url}: {e}")
         return []
 
-def generate_legal_docs():
-    """Generate synthetic Kenyan legal docs via OpenAI."""
+def generate_legal_docs(copies: int = 7, **engine_kwargs):
+    """Generate synthetic Kenyan legal docs concurrently (see backend/generation.py)."""
     prompt_types = [
         ("Consultancy Agreement under Kenyan law", "contracts"),
         ("Mediation agreement resolving a business dispute under Kenyan law", "mediation_cases"),
         ("Negotiation dialogue between two companies under Kenyan contract law", "negotiation_samples"),
     ]
-    for i, (prompt, folder) in enumerate(prompt_types * 7, start=1):
-        print(f"🧠 Generating document {i}: {prompt}")
-        try:
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "You are a Kenyan legal expert creating example documents for AI training."},
-                    {"role": "user", "content": f"Generate a realistic, full-length {prompt}. Include clear section headings and proper structure."}
-                ]
-            )
-            content = response.choices[0].message.content.strip()
-            path = f"{BASE_DIR}/generated/{folder}_{i}.txt"
-            with open(path, "w", encoding="utf-8") as f:
-                f.write(content)
-        except Exception as e:
-            print(f"⚠️ Generation failed: {e}")
+    items = [
+        GenerationItem(
+            item_id=f"{folder}_{i}",
+            prompt=f"Generate a realistic, full-length {prompt}. Include clear section headings and proper structure.",
+            doc_type=folder,
+            path=Path(f"{BASE_DIR}/generated/{folder}_{i}.txt"),
+            temperature=1.0,
+        )
+        for i, (prompt, folder) in enumerate(prompt_types * copies, start=1)
+    ]
+    stats = asyncio.run(generate_all(items, f"{BASE_DIR}/generated/collector_manifest.jsonl", **engine_kwargs))
+    print(f"🧠 Generated {stats['generated']} documents ({stats['skipped']} already done, {stats['failed']} failed).")
+    return stats
 
 def collect_real_docs():
     """Collect short excerpts or metadata from real pages."""
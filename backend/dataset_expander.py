@@ -1,13 +1,9 @@
 import os
-from datetime import datetime
-from openai import OpenAI
-from dotenv import load_dotenv
-import csv
-import random
-import time
+import asyncio
+import argparse
+from pathlib import Path
 
-load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from backend.generation import GenerationItem, generate_all
 
 BASE_DIR = "data/raw/generated"
 os.makedirs(BASE_DIR, exist_ok=True)
@@ -36,70 +32,57 @@ NEGOTIATION_TYPES = [
     "Government tender negotiation", "Product distribution negotiation", "Vendor service fee negotiation"
 ]
 
-def generate_legal_doc(prompt, doc_type, idx):
-    """Generate one realistic legal document under Kenyan law."""
-    print(f"🧠 Generating {doc_type} document {idx}: {prompt}")
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are a Kenyan legal expert drafting realistic legal agreements, mediation summaries, and negotiation dialogues for AI training."},
-                {"role": "user", "content": f"Write a comprehensive {prompt} under Kenyan law. Include clear sections, proper formatting, and realistic context."}
-            ],
-            temperature=0.7
-        )
-
-        content = response.choices[0].message.content.strip()
-        filename = f"{doc_type}_{idx}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
-        path = os.path.join(BASE_DIR, filename)
-
-        with open(path, "w", encoding="utf-8") as f:
-            f.write(content)
-
-        print(f"✅ Saved: {path}")
-        time.sleep(random.uniform(1, 2))
-        return filename
-
-    except Exception as e:
-        print(f"⚠️ Error generating {prompt}: {e}")
-        return None
-
-
-def generate_bulk_documents():
-    """Generate a total of ~35 additional legal docs across categories."""
-    generated_files = []
-
-    
-    for i, topic in enumerate(CONTRACT_TYPES, start=1):
-        name = generate_legal_doc(topic, "contract", i)
-        if name: generated_files.append(("contract", name))
-
-    for i, topic in enumerate(MEDIATION_TYPES, start=1):
-        name = generate_legal_doc(topic, "mediation", i)
-        if name: generated_files.append(("mediation", name))
-
-    for i, topic in enumerate(NEGOTIATION_TYPES, start=1):
-        name = generate_legal_doc(topic, "negotiation", i)
-        if name: generated_files.append(("negotiation", name))
-
-    metadata_path = "data/metadata.csv"
-    with open(metadata_path, "a", newline="", encoding="utf-8") as csvfile:
-        writer = csv.writer(csvfile)
-        for idx, (doc_type, name) in enumerate(generated_files, start=1):
-            writer.writerow([
-                f"auto_{idx}",
-                name.replace(".txt", ""),
-                doc_type,
-                "generated",
-                datetime.now().strftime("%Y-%m-%d"),
-                "Expanded synthetic document"
-            ])
-
-    print(f"📈 Added {len(generated_files)} new documents to metadata.")
-    print(f"🎯 Total dataset now exceeds 50 documents ✅")
+MANIFEST_PATH = os.path.join(BASE_DIR, "manifest.jsonl")
+METADATA_PATH = "data/metadata.csv"
+
+
+def build_items(variants: int = 1):
+    """One item per topic and variant; ids are stable so runs can resume."""
+    items = []
+    for doc_type, topics in [
+        ("contract", CONTRACT_TYPES),
+        ("mediation", MEDIATION_TYPES),
+        ("negotiation", NEGOTIATION_TYPES),
+    ]:
+        for i, topic in enumerate(topics, start=1):
+            for v in range(1, variants + 1):
+                prompt = (
+                    f"Write a comprehensive {topic} under Kenyan law. Include clear sections, "
+                    "proper formatting, and realistic context."
+                )
+                if variants > 1:
+                    prompt += f" This is variant {v}: use different parties, sector, amounts and terms."
+                suffix = f"_{v}" if variants > 1 else ""
+                items.append(GenerationItem(
+                    item_id=f"{doc_type}_{i}{suffix}",
+                    prompt=prompt,
+                    doc_type=doc_type,
+                    path=Path(BASE_DIR) / f"{doc_type}_{i}{suffix}.txt",
+                ))
+    return items
+
+
+def generate_bulk_documents(variants: int = 1, **engine_kwargs):
+    """
+    Generate the synthetic contract, mediation and negotiation documents
+    (~35 per variant) concurrently; see backend/generation.py for rate
+    limiting, retries and the resumable manifest.
+    """
+    items = build_items(variants)
+    stats = asyncio.run(generate_all(
+        items, MANIFEST_PATH, metadata_path=METADATA_PATH, **engine_kwargs
+    ))
+
+    print(f"📈 Added {stats['generated']} new documents to metadata "
+          f"({stats['skipped']} already done, {stats['failed']} failed) in {stats['seconds']}s.")
+    return stats
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic Kenyan legal documents.")
+    parser.add_argument("--variants", type=int, default=1, help="documents per topic")
+    args = parser.parse_args()
+
     print("🚀 Starting dataset expansion...")
-    generate_bulk_documents()
+    generate_bulk_documents(variants=args.variants)
     print("🎉 Dataset expansion complete! Check data/raw/generated/")
@@ -0,0 +1,337 @@
+"""
+dedup.py
+--------
+Near-duplicate clause detection with MinHash signatures and LSH banding.
+
+Contracts restate near-identical clauses (definitions repeated in annexes,
+numbered variants that differ only in party names). Each clause gets a
+MinHash signature over word 3-shingles of its normalized text, with
+capitalised names and defined terms replaced by placeholders numbered in
+order of appearance, so "the Landlord shall notify the Tenant" and "the
+Lessor shall notify the Lessee" shingle identically. Estimated Jaccard
+similarity at or above DEDUP_THRESHOLD is a candidate duplicate.
+
+Shingle overlap cannot tell "shall not be liable" from "shall be liable",
+or "Supplier shall pay Client" from "Client shall pay Supplier". A
+candidate is therefore only accepted if its `meaning_guard` matches too
+(`guards_match`): negations, modal verbs and numbers must occur identically
+and in the same order, and names the two clauses share must appear in the
+same order (a renamed party is a duplicate, swapped roles are not).
+Dedup is opt-in (DEDUP_ENABLED=1).
+
+- `cluster` groups the clauses of one document so the LLM is called once
+  per group and the result is fanned out to every member.
+- `NearDuplicateIndex` is the persistent SQLite LSH index of clauses from
+  past analyses, so a near-identical clause in a later contract reuses the
+  earlier clause's cached analysis.
+
+Members are only ever matched against a group's representative (never
+chained through other members), so every clause that receives a shared
+analysis is itself within the threshold of the clause that was analysed.
+"""
+
+import os
+import re
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+from pathlib import Path
+
+from database.models import normalize_text
+
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "0") not in ("0", "false", "False")
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.9"))
+NUM_PERM = int(os.getenv("DEDUP_NUM_PERM", "128"))
+SHINGLE_WORDS = 3
+INDEX_PATH = Path(os.getenv("DEDUP_INDEX_PATH", "data/dedup_index.sqlite3"))
+MAX_ENTRIES = int(os.getenv("DEDUP_MAX_ENTRIES", "200000"))
+
+# Multiply-shift hashing: ((a * x + b) mod 2**64) >> 32 with random odd a.
+# uint64 array arithmetic wraps modulo 2**64, which is exactly what it needs.
+_rng = np.random.default_rng(1)
+_A = _rng.integers(0, 1 << 63, size=NUM_PERM, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+_B = _rng.integers(0, 1 << 63, size=NUM_PERM, dtype=np.uint64)
+_SHIFT = np.uint64(32)
+
+STATS = {"clauses": 0, "in_document": 0, "cross_document": 0, "guard_rejected": 0}
+
+# Words that flip or change an obligation; two clauses can only share an
+# analysis if these occur identically and in the same order.
+GUARD_WORDS = frozenset("""
+    not no nor never neither none without except unless notwithstanding non
+    cannot shall may must will should might can
+    one two three four five six seven eight nine ten eleven twelve fifteen
+    twenty thirty forty fifty sixty ninety hundred thousand million billion
+    half quarter percent per cent
+""".split())
+_TOKEN = re.compile(r"[A-Za-z][A-Za-z'’-]*|\d[\d.,/:%]*")
+_CAPITALISED = re.compile(r"\b[A-Z][A-Za-z'’-]*")
+
+
+def _is_name(word: str) -> bool:
+    """A capitalised word that is not a guard word: a party name or defined term."""
+    lower = word.lower()
+    return lower not in GUARD_WORDS and not lower.endswith(("n't", "n’t"))
+
+
+def mask_names(text: str) -> str:
+    """Replace names and defined terms with placeholders numbered by first appearance."""
+    seen = {}
+
+    def placeholder(m):
+        word = m.group(0)
+        if not _is_name(word):
+            return word
+        return "name%d" % seen.setdefault(word.lower(), len(seen) + 1)
+
+    return _CAPITALISED.sub(placeholder, text or "")
+
+
+def meaning_guard(text: str) -> str:
+    """
+    The clause's ordered negations, modals and numbers/amounts/durations,
+    then a tab and its ordered capitalised words (party names, defined
+    terms). Compare guards with `guards_match`.
+    """
+    core, names = [], []
+    for token in _TOKEN.findall(text or ""):
+        word = token.lower()
+        if word.endswith(("n't", "n’t")):
+            core.append("not")
+        elif token[0].isdigit():
+            core.append(token.rstrip(".,"))
+        elif word in GUARD_WORDS:
+            core.append(word)
+        elif token[0].isupper():
+            names.append(word)
+    return " ".join(core) + "\t" + " ".join(names)
+
+
+def guards_match(a: str, b: str) -> bool:
+    """
+    True if two meaning guards allow sharing an analysis: identical
+    negations, modals and numbers, and the names both clauses use appear in
+    the same order. Names only one clause uses (a renamed party) are ignored.
+    """
+    if a == b:
+        return True
+    if a is None or b is None:
+        return False
+    core_a, _, names_a = a.partition("\t")
+    core_b, _, names_b = b.partition("\t")
+    if core_a != core_b:
+        return False
+    names_a, names_b = names_a.split(), names_b.split()
+    shared = set(names_a) & set(names_b)
+    return [n for n in names_a if n in shared] == [n for n in names_b if n in shared]
+
+
+def shingles(text: str) -> np.ndarray:
+    """32-bit hashes of the word 3-shingles of the normalized text."""
+    words = normalize_text(mask_names(text)).split()
+    if len(words) < SHINGLE_WORDS:
+        grams = [" ".join(words)]
+    else:
+        grams = [" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)]
+    return np.fromiter(
+        (zlib.crc32(g.encode("utf-8")) for g in set(grams)), dtype=np.uint64
+    )
+
+
+def minhash(text: str) -> np.ndarray:
+    """MinHash signature (NUM_PERM uint64 values) of a clause."""
+    x = shingles(text)
+    with np.errstate(over="ignore"):
+        return ((_A[:, None] * x[None, :] + _B[:, None]) >> _SHIFT).min(axis=1)
+
+
+def similarity(sig_a, sig_b) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.count_nonzero(sig_a == sig_b)) / len(sig_a)
+
+
+def lsh_params(threshold: float, num_perm: int = NUM_PERM):
+    """
+    Choose (bands, rows) with bands * rows == num_perm whose S-curve
+    midpoint (1 / bands) ** (1 / rows) sits just below the threshold, so
+    true duplicates almost always share a bucket; candidates are verified.
+    """
+    options = [(b, num_perm // b) for b in range(1, num_perm + 1) if num_perm % b == 0]
+    below = [(b, r) for b, r in options if (1 / b) ** (1 / r) <= threshold]
+    return max(below, key=lambda br: (1 / br[0]) ** (1 / br[1])) if below else options[-1]
+
+
+def band_keys(sig, threshold: float = DEDUP_THRESHOLD):
+    bands, rows = lsh_params(threshold, len(sig))
+    return [
+        hashlib.blake2b(
+            sig[i * rows:(i + 1) * rows].tobytes(), digest_size=8, person=b"band%d" % i
+        ).hexdigest()
+        for i in range(bands)
+    ]
+
+
+class ClauseClusters:
+    """
+    Incremental in-memory clustering for one document. `assign` places each
+    new clause either in the group of the most similar earlier
+    representative or in a new group of its own.
+    """
+
+    def __init__(self, threshold: float = DEDUP_THRESHOLD):
+        self.threshold = threshold
+        self._buckets = {}
+        self._rep_sigs = {}
+        self._rep_guards = {}
+
+    def assign(self, index: int, text: str):
+        """Return (representative index, similarity, signature) for clause `index`."""
+        sig = minhash(text)
+        guard = meaning_guard(text)
+        keys = band_keys(sig, self.threshold)
+
+        rep, best = index, 1.0
+        candidates = dict.fromkeys(j for k in keys for j in self._buckets.get(k, ()))
+        for j in candidates:
+            sim = similarity(sig, self._rep_sigs[j])
+            if sim < self.threshold or not (rep == index or sim > best):
+                continue
+            if not guards_match(self._rep_guards[j], guard):
+                STATS["guard_rejected"] += 1
+                continue
+            rep, best = j, sim
+
+        if rep == index:
+            self._rep_sigs[index] = sig
+            self._rep_guards[index] = guard
+            for k in keys:
+                self._buckets.setdefault(k, []).append(index)
+        return rep, best, sig
+
+
+def cluster(texts, threshold: float = DEDUP_THRESHOLD):
+    """
+    Group near-duplicate texts. Returns a list aligned with `texts` of
+    (representative index, similarity, signature); representatives point
+    at themselves with similarity 1.0.
+    """
+    clusters = ClauseClusters(threshold)
+    return [clusters.assign(i, text) for i, text in enumerate(texts)]
+
+
+class NearDuplicateIndex:
+    """SQLite LSH index of past clauses: signature + band buckets per key."""
+
+    def __init__(self, path=INDEX_PATH, threshold=DEDUP_THRESHOLD, max_entries=MAX_ENTRIES):
+        self.path = Path(path)
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS signatures (
+                key TEXT PRIMARY KEY,
+                signature BLOB NOT NULL,
+                guard TEXT,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(signatures)")}
+        if "guard" not in columns:
+            # Entries indexed before guards existed never match (guard NULL).
+            self._conn.execute("ALTER TABLE signatures ADD COLUMN guard TEXT")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS bands (bucket TEXT NOT NULL, key TEXT NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_bands_bucket ON bands(bucket)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_bands_key ON bands(key)")
+        self._conn.commit()
+
+        self._count = self._conn.execute("SELECT COUNT(*) FROM signatures").fetchone()[0]
+
+    def add(self, key: str, sig, guard: str):
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.execute(
+                "INSERT OR IGNORE INTO signatures (key, signature, guard, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, np.asarray(sig, dtype=np.uint64).tobytes(), guard, time.time()),
+            )
+            if self._conn.total_changes == before:
+                return
+            self._conn.executemany(
+                "INSERT INTO bands (bucket, key) VALUES (?, ?)",
+                [(b, key) for b in band_keys(sig, self.threshold)],
+            )
+            self._count += 1
+            if self._count > self.max_entries:
+                self._evict()
+            self._conn.commit()
+
+    def query(self, sig, guard: str):
+        """
+        Return (key, similarity) of the most similar past clause at/above
+        threshold with the same meaning guard, or None.
+        """
+        buckets = band_keys(sig, self.threshold)
+        marks = ",".join("?" * len(buckets))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT key, signature, guard FROM signatures WHERE key IN "
+                f"(SELECT DISTINCT key FROM bands WHERE bucket IN ({marks}))",
+                buckets,
+            ).fetchall()
+
+        best = None
+        for key, blob, stored_guard in rows:
+            sim = similarity(sig, np.frombuffer(blob, dtype=np.uint64))
+            if sim < self.threshold or (best is not None and sim <= best[1]):
+                continue
+            if not guards_match(stored_guard, guard):
+                STATS["guard_rejected"] += 1
+                continue
+            best = (key, sim)
+        return best
+
+    def _evict(self):
+        """Drop the oldest entries until the index is back under 90% of its bound."""
+        excess = self._count - int(self.max_entries * 0.9)
+        old = [k for (k,) in self._conn.execute(
+            "SELECT key FROM signatures ORDER BY created_at ASC LIMIT ?", (excess,)
+        )]
+        self._conn.executemany("DELETE FROM bands WHERE key = ?", [(k,) for k in old])
+        self._conn.executemany("DELETE FROM signatures WHERE key = ?", [(k,) for k in old])
+        self._count -= len(old)
+
+    def __len__(self):
+        return self._count
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_dedup_index() -> NearDuplicateIndex:
+    """Return the process-wide near-duplicate index, opening it on first use."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = NearDuplicateIndex()
+    return _index
+
+
+def dedup_stats():
+    return {
+        "enabled": DEDUP_ENABLED,
+        "threshold": DEDUP_THRESHOLD,
+        "indexed": len(get_dedup_index()) if _index is not None else None,
+        **STATS,
+    }
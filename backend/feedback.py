@@ -1,72 +1,138 @@
+"""
+feedback.py
+-----------
+Append-only user feedback, stored in the shared SQLite database
+(database/models.py, WAL mode).
+
+Each submission is a single INSERT, so saving is O(1) and concurrent
+/feedback requests cannot overwrite each other. A one-row aggregate table
+(count, sum of ratings) is updated in the same transaction, which keeps
+the count and average O(1). Reads and exports stream rows from a cursor.
+
+A legacy `data/feedback.json` is imported on first use and renamed to
+`feedback.json.migrated`. The import is recorded in the database's `meta`
+table within the same transaction, so when several worker processes start
+against the same file only one of them imports it.
+"""
+
+import csv
 import json
+import threading
 from pathlib import Path
 
-FILE = Path("data/feedback.json")
+from database.models import (
+    FEEDBACK_FIELDS,
+    add_feedback_many,
+    clear_feedback_rows,
+    feedback_totals,
+    import_legacy_feedback,
+    iter_feedback_rows,
+)
+
+LEGACY_FILE = Path("data/feedback.json")
+
+_migrated = False
+_migrate_lock = threading.Lock()
+
+
+def _migrate_legacy():
+    """Import the old read-modify-write JSON file once, then move it aside."""
+    global _migrated
+    if _migrated:
+        return
+    with _migrate_lock:
+        if _migrated:
+            return
+        try:
+            entries = json.loads(LEGACY_FILE.read_text() or "[]")
+        except FileNotFoundError:
+            # No legacy file, or another process already moved it aside.
+            entries = None
+        if entries is not None:
+            rows = [(e.get("username", ""), e.get("rating", 0), e.get("comments", "")) for e in entries]
+            if import_legacy_feedback(rows):
+                print(f"Migrated {len(entries)} feedback entries from {LEGACY_FILE}.")
+            try:
+                LEGACY_FILE.rename(LEGACY_FILE.with_name(LEGACY_FILE.name + ".migrated"))
+            except FileNotFoundError:
+                pass
+        _migrated = True
+
 
 def save_feedback(username, rating, comments):
-    FILE.parent.mkdir(parents=True, exist_ok=True)
+    _migrate_legacy()
+    add_feedback_many([(username, rating, comments)])
+
 
-    if FILE.exists():
-        data = json.loads(FILE.read_text())
-    else:
-        data = []
+def iter_feedback():
+    _migrate_legacy()
+    return iter_feedback_rows()
 
-    data.append({
-        "username": username,
-        "rating": rating,
-        "comments": comments
-    })
 
-    FILE.write_text(json.dumps(data, indent=2))
 def load_feedback():
-    if FILE.exists():
-        return json.loads(FILE.read_text())
-    return []
+    return list(iter_feedback())
+
+
+def _totals():
+    _migrate_legacy()
+    return feedback_totals()
+
+
 def get_average_rating():
-    feedbacks = load_feedback()
-    if not feedbacks:
+    count, total = _totals()
+    if not count:
         return 0
-    total = sum(fb["rating"] for fb in feedbacks)
-    return total / len(feedbacks)
+    return total / count
+
+
 def get_feedback_count():
-    feedbacks = load_feedback()
-    return len(feedbacks)
+    return _totals()[0]
+
+
 def get_all_feedback():
     return load_feedback()
+
+
 def clear_feedback():
-    if FILE.exists():
-        FILE.unlink()
-    FILE.write_text("[]")
+    _migrate_legacy()
+    clear_feedback_rows()
     return True
+
+
 def export_feedback_to_json(export_path: str):
-    feedbacks = load_feedback()
-    with open(export_path, "w") as f:
-        json.dump(feedbacks, f, indent=2)
+    with open(export_path, "w", encoding="utf-8") as f:
+        sep = "[\n  "
+        for fb in iter_feedback():
+            f.write(sep + json.dumps(fb))
+            sep = ",\n  "
+        f.write("[]" if sep.startswith("[") else "\n]")
     return True
+
+
 def export_feedback_to_csv(export_path: str):
-    import csv
-    feedbacks = load_feedback()
-    if not feedbacks:
+    if not get_feedback_count():
         return False
 
-    keys = feedbacks[0].keys()
     with open(export_path, "w", newline='', encoding='utf-8') as f:
-        dict_writer = csv.DictWriter(f, fieldnames=keys)
+        dict_writer = csv.DictWriter(f, fieldnames=FEEDBACK_FIELDS)
         dict_writer.writeheader()
-        dict_writer.writerows(feedbacks)
+        dict_writer.writerows(iter_feedback())
     return True
+
+
+def feedback_stats():
+    count, total = _totals()
+    return {"count": count, "average_rating": total / count if count else 0}
+
+
 def summarize_feedback():
-    feedbacks = load_feedback()
-    if not feedbacks:
+    count, total = _totals()
+    if not count:
         return "No feedback available."
 
-    avg_rating = get_average_rating()
-    count = get_feedback_count()
-    comments = [fb["comments"] for fb in feedbacks if fb["comments"].strip()]
-
-    summary = f"Total Feedbacks: {count}\nAverage Rating: {avg_rating:.2f}\n\nComments:\n"
-    for comment in comments:
-        summary += f"- {comment}\n"
+    lines = [f"Total Feedbacks: {count}\nAverage Rating: {total / count:.2f}\n\nComments:\n"]
+    for fb in iter_feedback():
+        if fb["comments"].strip():
+            lines.append(f"- {fb['comments']}\n")
 
-    return summary
-    return summary
\ No newline at end of file
+    return "".join(lines)
@@ -0,0 +1,340 @@
+"""
+generation.py
+-------------
+Async, rate-limit-aware engine for synthetic training documents.
+
+Documents are generated concurrently on one AsyncOpenAI client while a
+token-bucket limiter keeps the job under the account's requests-per-minute
+and tokens-per-minute budgets. Rate-limit, timeout and server errors are
+retried with full-jitter exponential backoff (honouring Retry-After).
+
+Output is uncapped by default (GENERATION_MAX_TOKENS=0), since a cap below
+document length silently truncates agreements. A completion that stops with
+finish_reason "length" is retried and, if it stays truncated, counted as
+failed and kept out of the manifest.
+
+Runs are resumable: every completed item is appended to a JSONL manifest
+(and, optionally, a metadata CSV row is written) as soon as its file is on
+disk, so an interrupted run picks up where it stopped and items already in
+the manifest are never regenerated.
+
+Point GENERATION_BASE_URL at benchmarks/mock_llm_server.py to exercise the
+engine without an API key.
+"""
+
+import os
+import csv
+import json
+import time
+import random
+import asyncio
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+import httpx
+import openai
+from openai import AsyncOpenAI
+from dotenv import load_dotenv
+
+load_dotenv()
+
+GENERATION_MODEL = os.getenv("GENERATION_MODEL", "gpt-4o-mini")
+GENERATION_BASE_URL = os.getenv("GENERATION_BASE_URL") or None
+REQUESTS_PER_MINUTE = float(os.getenv("GENERATION_RPM", "500"))
+TOKENS_PER_MINUTE = float(os.getenv("GENERATION_TPM", "200000"))
+CONCURRENCY = int(os.getenv("GENERATION_CONCURRENCY", "32"))
+MAX_ATTEMPTS = int(os.getenv("GENERATION_MAX_ATTEMPTS", "6"))
+# 0 (the default) sends no max_tokens, so documents end where the model ends them.
+MAX_OUTPUT_TOKENS = int(os.getenv("GENERATION_MAX_TOKENS", "0")) or None
+# Output tokens reserved from the TPM budget per uncapped call, until usage is reported.
+RESERVED_OUTPUT_TOKENS = int(os.getenv("GENERATION_RESERVED_TOKENS", "4096"))
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_CAP_SECONDS = 60.0
+
+SYSTEM_PROMPT = (
+    "You are a Kenyan legal expert drafting realistic legal agreements, mediation "
+    "summaries, and negotiation dialogues for AI training."
+)
+
+RETRYABLE = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+
+class TruncatedGeneration(Exception):
+    """The model hit its output limit (finish_reason "length") before finishing."""
+
+
+class GenerationItem(NamedTuple):
+    """One document to generate; `item_id` keys the manifest."""
+    item_id: str
+    prompt: str
+    doc_type: str
+    path: Path
+    temperature: float = 0.7
+
+
+class TokenBucket:
+    """Refills continuously at `per_minute`; holds at most one minute's worth."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` is available (0 if it is now)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        self._refill()
+        self.level -= amount
+
+    def refund(self, amount: float):
+        self._refill()
+        self.level = min(self.capacity, self.level + amount)
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute buckets. Each call reserves
+    its worst-case token cost up front; `settle` returns what the reported
+    usage shows was not spent.
+    """
+
+    def __init__(self, rpm: float = REQUESTS_PER_MINUTE, tpm: float = TOKENS_PER_MINUTE):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: int):
+        # One waiter at a time keeps the buckets FIFO-fair.
+        async with self._lock:
+            while True:
+                wait = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+            self.requests.take(1)
+            self.tokens.take(tokens)
+
+    def settle(self, reserved: int, used: Optional[int]):
+        if used is not None and used < reserved:
+            self.tokens.refund(reserved - used)
+
+
+def estimate_tokens(messages, max_output_tokens: int = MAX_OUTPUT_TOKENS) -> int:
+    """
+    Cost reserved for a call: ~4 characters per prompt token plus the output
+    cap, or RESERVED_OUTPUT_TOKENS when output is uncapped.
+    """
+    prompt_chars = sum(len(m["content"]) for m in messages)
+    return prompt_chars // 4 + (max_output_tokens or RESERVED_OUTPUT_TOKENS)
+
+
+def backoff_delay(attempt: int, error: Exception = None) -> float:
+    """Full-jitter exponential backoff; a server Retry-After takes precedence."""
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return float(retry_after) + random.uniform(0, 1)
+        except ValueError:
+            pass
+    return random.uniform(0, min(BACKOFF_CAP_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+
+class Manifest:
+    """Append-only JSONL record of completed items; one line per item."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.done = {}
+        if self.path.exists():
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        row = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn final line from an interrupted run
+                    self.done[row["item_id"]] = row
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def __contains__(self, item_id):
+        return item_id in self.done
+
+    def record(self, row: dict):
+        self._file.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self.done[row["item_id"]] = row
+
+    def close(self):
+        self._file.close()
+
+
+class MetadataWriter:
+    """Appends data/metadata.csv rows (id, title, type, source, date, notes) as items finish."""
+
+    def __init__(self, path, source="generated", notes="Expanded synthetic document"):
+        self.path = Path(path)
+        self.source = source
+        self.notes = notes
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+
+    def write(self, item: GenerationItem):
+        self._writer.writerow([
+            f"auto_{item.item_id}",
+            item.path.stem,
+            item.doc_type,
+            self.source,
+            time.strftime("%Y-%m-%d"),
+            self.notes,
+        ])
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def make_client(base_url: str = GENERATION_BASE_URL, concurrency: int = CONCURRENCY) -> AsyncOpenAI:
+    """Client for generation runs; retries are handled here, not by the SDK."""
+    return AsyncOpenAI(
+        api_key=os.getenv("OPENAI_API_KEY") or "unused",
+        base_url=base_url,
+        max_retries=0,
+        http_client=httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+            timeout=httpx.Timeout(120.0, connect=10.0),
+        ),
+    )
+
+
+def build_messages(prompt: str):
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt},
+    ]
+
+
+async def _generate_one(client, limiter, item: GenerationItem, model, max_attempts, stats):
+    messages = build_messages(item.prompt)
+    reserved = estimate_tokens(messages)
+    cap = {"max_tokens": MAX_OUTPUT_TOKENS} if MAX_OUTPUT_TOKENS else {}
+    for attempt in range(max_attempts):
+        await limiter.acquire(reserved)
+        try:
+            response = await client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=item.temperature,
+                **cap,
+            )
+        except RETRYABLE as e:
+            # A rejected request spent no output tokens.
+            limiter.settle(reserved, 0)
+            stats["retries"] += 1
+            if attempt == max_attempts - 1:
+                raise
+            await asyncio.sleep(backoff_delay(attempt, e))
+            continue
+
+        usage = getattr(response, "usage", None)
+        limiter.settle(reserved, usage.total_tokens if usage else None)
+        if usage:
+            stats["tokens"] += usage.total_tokens
+
+        choice = response.choices[0]
+        if choice.finish_reason == "length":
+            # A cut-off document must never reach the manifest; sampling again
+            # may finish within the limit.
+            stats["truncated"] += 1
+            if attempt == max_attempts - 1:
+                raise TruncatedGeneration(f"output truncated after {max_attempts} attempts")
+            continue
+        return choice.message.content.strip()
+
+
+async def generate_all(
+    items,
+    manifest_path,
+    metadata_path=None,
+    client: AsyncOpenAI = None,
+    model: str = GENERATION_MODEL,
+    concurrency: int = CONCURRENCY,
+    rpm: float = REQUESTS_PER_MINUTE,
+    tpm: float = TOKENS_PER_MINUTE,
+    max_attempts: int = MAX_ATTEMPTS,
+    metadata_notes: str = "Expanded synthetic document",
+):
+    """
+    Generate every item not already in the manifest. Each finished document
+    is written to `item.path`, then recorded in the manifest (and metadata
+    CSV). Failed items are reported and left out of the manifest, so the
+    next run retries them. Returns run statistics.
+    """
+    manifest = Manifest(manifest_path)
+    metadata = MetadataWriter(metadata_path, notes=metadata_notes) if metadata_path else None
+    own_client = client is None
+    client = client or make_client(concurrency=concurrency)
+    limiter = RateLimiter(rpm, tpm)
+
+    pending = [item for item in items if item.item_id not in manifest]
+    stats = {
+        "total": len(items), "skipped": len(items) - len(pending),
+        "generated": 0, "failed": 0, "retries": 0, "truncated": 0, "tokens": 0,
+    }
+    queue = asyncio.Queue()
+    for item in pending:
+        queue.put_nowait(item)
+    started = time.perf_counter()
+
+    async def worker():
+        while not queue.empty():
+            item = queue.get_nowait()
+            try:
+                content = await _generate_one(client, limiter, item, model, max_attempts, stats)
+            except Exception as e:
+                stats["failed"] += 1
+                print(f"⚠️ Error generating {item.item_id} ({item.prompt[:60]}): {e}")
+                continue
+
+            item.path.parent.mkdir(parents=True, exist_ok=True)
+            item.path.write_text(content, encoding="utf-8")
+            manifest.record({
+                "item_id": item.item_id,
+                "path": str(item.path),
+                "doc_type": item.doc_type,
+                "chars": len(content),
+                "completed_at": time.time(),
+            })
+            if metadata:
+                metadata.write(item)
+            stats["generated"] += 1
+            if stats["generated"] % 50 == 0:
+                print(f"✅ {stats['generated']}/{len(pending)} documents generated")
+
+    try:
+        await asyncio.gather(*(worker() for _ in range(min(concurrency, len(pending)) or 1)))
+    finally:
+        manifest.close()
+        if metadata:
+            metadata.close()
+        if own_client:
+            await client.close()
+
+    stats["seconds"] = round(time.perf_counter() - started, 2)
+    return stats
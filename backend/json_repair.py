@@ -0,0 +1,390 @@
+"""
+json_repair.py
+--------------
+Local, deterministic parsing of JSON returned by the LLM, shared by every
+route. Parsing escalates through tiers and stops at the first that works:
+
+- strict     `json.loads` on the raw text
+- extracted  code fences / surrounding prose removed; the first balanced
+             object or array (string-aware, not a greedy regex) is parsed
+- repaired   one tolerant pass: single-quoted strings, Python literals,
+             unquoted keys, comments, trailing commas, raw newlines in
+             strings, and truncated output (open strings, dangling keys,
+             unclosed objects/arrays) are fixed up, then parsed
+
+STATS counts how often each tier fires (exposed under /metrics).
+`JSONStream` applies the same scanner incrementally to streamed tokens.
+"""
+
+import re
+import json
+
+STATS = {"strict": 0, "extracted": 0, "repaired": 0, "failed": 0}
+
+_FENCE = re.compile(r"```(?:json|JSON)?[ \t]*\n?")
+_LITERALS = {"true": "true", "false": "false", "null": "null",
+             "True": "true", "False": "false", "None": "null"}
+_WORD = re.compile(r"[A-Za-z_$][\w$-]*")
+
+
+def strip_code_fences(text: str) -> str:
+    return _FENCE.sub("", text or "").strip()
+
+
+def _value_start(text: str, pos: int = 0) -> int:
+    """Index of the first "{" or "[" at or after pos, or -1."""
+    starts = [i for i in (text.find("{", pos), text.find("[", pos)) if i >= 0]
+    return min(starts) if starts else -1
+
+
+def _balanced_end(text: str, start: int) -> int:
+    """End (exclusive) of the JSON value opening at `start`, or -1 if it never closes."""
+    depth = 0
+    in_string = escape = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            depth += 1
+        elif ch in "}]":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+    return -1
+
+
+class _Frame:
+    __slots__ = ("kind", "state")
+
+    def __init__(self, kind):
+        self.kind = kind  # "{" or "["
+        # objects: key -> colon -> value -> after; arrays: value -> after
+        self.state = "key" if kind == "{" else "value"
+
+
+def _last_token(out) -> int:
+    """Index of the last non-whitespace piece of output, or -1."""
+    i = len(out) - 1
+    while i >= 0 and out[i].isspace():
+        i -= 1
+    return i
+
+
+def _drop_trailing_comma(out):
+    i = _last_token(out)
+    if i >= 0 and out[i] == ",":
+        del out[i]
+
+
+def repair(text: str) -> str:
+    """
+    Rewrite the first JSON-like value in `text` as valid JSON (best effort).
+    Returns "" if the text contains no object or array.
+    """
+    text = strip_code_fences(text)
+    start = _value_start(text)
+    if start < 0:
+        return ""
+
+    out = []
+    stack = []
+    quote = None  # open string's quote character
+    escape = False
+    i, n = start, len(text)
+
+    def value_emitted():
+        if stack and stack[-1].state in ("value", "key"):
+            stack[-1].state = "after"
+
+    while i < n:
+        ch = text[i]
+
+        if quote:
+            if escape:
+                escape = False
+                # \' is not a JSON escape.
+                out.append("'" if ch == "'" else "\\" + ch)
+            elif ch == "\\":
+                escape = True
+            elif ch == quote:
+                quote = None
+                out.append('"')
+                if stack and stack[-1].kind == "{" and stack[-1].state == "key":
+                    stack[-1].state = "colon"
+                else:
+                    value_emitted()
+            elif ch == '"':
+                out.append('\\"')
+            elif ch == "\n":
+                out.append("\\n")
+            elif ch == "\t":
+                out.append("\\t")
+            elif ch < " ":
+                out.append("\\u%04x" % ord(ch))
+            else:
+                out.append(ch)
+            i += 1
+            continue
+
+        if ch in "\"'":
+            quote = ch
+            out.append('"')
+        elif ch in "{[":
+            value_emitted()
+            stack.append(_Frame(ch))
+            out.append(ch)
+        elif ch in "}]":
+            _drop_trailing_comma(out)
+            want = "{" if ch == "}" else "["
+            if not any(f.kind == want for f in stack):
+                i += 1
+                continue  # stray closer
+            while stack and stack[-1].kind != want:
+                _close(out, stack.pop())
+            _close(out, stack.pop())
+            if not stack:
+                break
+        elif ch == ":":
+            if stack and stack[-1].kind == "{":
+                stack[-1].state = "value"
+            out.append(ch)
+        elif ch == ",":
+            if stack:
+                stack[-1].state = "key" if stack[-1].kind == "{" else "value"
+            out.append(ch)
+        elif ch == "/" and text.startswith(("//", "/*"), i):
+            end = text.find("\n" if text[i + 1] == "/" else "*/", i + 2)
+            i = n if end < 0 else end + (1 if text[i + 1] == "/" else 2)
+            continue
+        elif ch.isalpha() or ch in "_$":
+            word = _WORD.match(text, i).group(0)
+            in_key = stack and stack[-1].kind == "{" and stack[-1].state == "key"
+            if in_key:
+                out.append(json.dumps(word))
+                stack[-1].state = "colon"
+            else:
+                out.append(_LITERALS.get(word) or json.dumps(word))
+                value_emitted()
+            i += len(word)
+            continue
+        elif ch.isspace():
+            out.append(ch)
+        else:
+            # digits, signs, decimal points
+            out.append(ch)
+            value_emitted()
+        i += 1
+
+    # Truncated output: close whatever is still open.
+    if quote:
+        out.append('"')
+        if stack and stack[-1].kind == "{" and stack[-1].state == "key":
+            stack[-1].state = "colon"
+    while out and (out[-1].isspace() or out[-1] in ".-+eE" and _dangling_number(out)):
+        out.pop()
+    while stack:
+        _close(out, stack.pop())
+    return "".join(out)
+
+
+def _dangling_number(out) -> bool:
+    """True if the output ends in an incomplete number such as "1." or "-"."""
+    tail = "".join(out[-32:])
+    return re.search(r"(?:^|[\s,:\[])-?\d*\.?\d*(?:[eE][-+]?)?$", tail) is not None
+
+
+def _close(out, frame):
+    _drop_trailing_comma(out)
+    if frame.kind == "{":
+        if frame.state == "colon":
+            out.append(": null")
+        elif out[_last_token(out)] == ":":
+            out.append(" null")
+        out.append("}")
+    else:
+        out.append("]")
+
+
+def parse_json_tiered(text):
+    """Return (obj, tier) for the first local tier that parses; (None, "failed") otherwise."""
+    if isinstance(text, (dict, list)):
+        return text, "strict"
+    text = "" if text is None else str(text)
+
+    try:
+        return json.loads(text), "strict"
+    except ValueError:
+        pass
+
+    stripped = strip_code_fences(text)
+    start = _value_start(stripped)
+    if start >= 0:
+        end = _balanced_end(stripped, start)
+        if end > 0:
+            try:
+                return json.loads(stripped[start:end]), "extracted"
+            except ValueError:
+                pass
+
+    repaired = repair(stripped)
+    if repaired:
+        try:
+            return json.loads(repaired), "repaired"
+        except ValueError:
+            pass
+    return None, "failed"
+
+
+def parse_json(text, default=None):
+    """Parse LLM output locally, recording which tier succeeded."""
+    obj, tier = parse_json_tiered(text)
+    STATS[tier] += 1
+    return default if tier == "failed" else obj
+
+
+def json_repair_stats():
+    return dict(STATS)
+
+
+class JSONStream:
+    """
+    Incremental parser for JSON arriving as streamed tokens. `feed` scans
+    only the new text and reports when the top-level value is complete.
+
+    With `track="text"`, the string value of that top-level key is decoded
+    as it arrives and `take_tracked()` returns what was added since the last
+    call, e.g. to render a dialogue turn word by word at O(chunk) cost per
+    token. `partial()` re-repairs the whole buffer, so call it sparingly.
+    """
+
+    def __init__(self, track: str = None):
+        self.buffer = []
+        self._length = 0
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self.complete = False
+
+        self.track = track
+        self._expect_key = False  # top-level object: next string is a key
+        self._key = None          # chars of a top-level key being read
+        self._last_key = None
+        self._capturing = False   # inside the tracked value
+        self._raw_escape = ""     # escape sequence not yet decoded
+        self._tracked = []
+        self._taken = 0
+
+    def feed(self, chunk: str) -> bool:
+        """Add streamed text; return True once the top-level value has closed."""
+        if not chunk:
+            return self.complete
+        self.buffer.append(chunk)
+        self._length += len(chunk)
+        if self.complete:
+            return True
+        for ch in chunk:
+            if not self._started:
+                if ch in "{[":
+                    self._started = True
+                    self._depth = 1
+                    self._expect_key = ch == "{"
+                continue
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                    self._string_char(ch)
+                elif ch == "\\":
+                    self._escape = True
+                    self._string_char(ch)
+                elif ch == '"':
+                    self._in_string = False
+                    self._end_string()
+                else:
+                    self._string_char(ch)
+            elif ch == '"':
+                self._in_string = True
+                if self._depth == 1 and self.track is not None:
+                    if self._expect_key:
+                        self._key = []
+                    elif self._last_key == self.track:
+                        self._capturing = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self.complete = True
+                    break
+            elif self._depth == 1 and ch in ":,":
+                self._expect_key = ch == ","
+        return self.complete
+
+    def _string_char(self, ch):
+        if self._key is not None:
+            self._key.append(ch)
+        elif self._capturing:
+            if self._raw_escape or ch == "\\":
+                self._raw_escape += ch
+                if self._escape_complete():
+                    try:
+                        self._tracked.append(json.loads('"' + self._raw_escape + '"'))
+                    except ValueError:
+                        self._tracked.append(self._raw_escape)
+                    self._raw_escape = ""
+            else:
+                self._tracked.append(ch)
+
+    def _escape_complete(self) -> bool:
+        """True once `_raw_escape` holds a whole escape; a high surrogate waits for its pair."""
+        raw = self._raw_escape
+        if len(raw) < 2:
+            return False
+        if raw[1] != "u":
+            return True
+        if len(raw) == 6:
+            try:
+                return not 0xD800 <= int(raw[2:6], 16) < 0xDC00
+            except ValueError:
+                return True
+        return len(raw) == 12 or (len(raw) == 7 and raw[6] != "\\") or (len(raw) == 8 and raw[7] != "u")
+
+    def _end_string(self):
+        if self._key is not None:
+            self._last_key = "".join(self._key)
+            self._key = None
+        elif self._capturing:
+            self._capturing = False
+
+    def take_tracked(self) -> str:
+        """Decoded text of the tracked value received since the previous call."""
+        new = "".join(self._tracked[self._taken:])
+        self._taken = len(self._tracked)
+        return new
+
+    @property
+    def text(self) -> str:
+        if len(self.buffer) > 1:
+            self.buffer = ["".join(self.buffer)]
+        return self.buffer[0] if self.buffer else ""
+
+    def partial(self):
+        """Best-effort parse of everything received so far (None before any value starts)."""
+        if not self._started:
+            return None
+        try:
+            return json.loads(repair(self.text))
+        except ValueError:
+            return None
+
+    def result(self, default=None):
+        """Final parse through the usual tiers (counted in STATS)."""
+        return parse_json(self.text, default=default)
@@ -0,0 +1,182 @@
+"""
+lexical_index.py
+----------------
+BM25 lexical index over the same chunks stored in Chroma and FAISS.
+
+Dense retrieval handles exact legal references ("Employment Act",
+"Section 45", "Data Protection Act 2019") poorly and costs a model forward
+pass per query. This index is an SQLite FTS5 inverted index (in-process,
+compact on disk, BM25-ranked), built incrementally as documents are added
+to either store. Queries need no embedding, so statute lookups are
+sub-millisecond.
+
+Rebuild from the existing stores with:
+    python -m backend.lexical_index --rebuild
+"""
+
+import os
+import re
+import sys
+import json
+import sqlite3
+import threading
+from pathlib import Path
+
+INDEX_PATH = Path(os.getenv("LEXICAL_INDEX_PATH", "data/lexical_index.sqlite3"))
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has in is it its of on or shall that the "
+    "this to was were will with".split()
+)
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str):
+    return [t for t in _TOKEN.findall((text or "").lower()) if t not in STOPWORDS]
+
+
+def build_match_query(query: str):
+    """
+    Build an FTS5 MATCH expression: any query term may match, and adjacent
+    term pairs are added as phrases so "Employment Act" or "Section 45"
+    outrank documents that merely mention "act" or "45".
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return None
+    terms = [f'"{t}"' for t in dict.fromkeys(tokens)]
+    phrases = [f'"{a} {b}"' for a, b in zip(tokens, tokens[1:])]
+    return " OR ".join(phrases + terms)
+
+
+class LexicalIndex:
+    def __init__(self, path=INDEX_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS chunks USING fts5("
+            "text, store UNINDEXED, metadata UNINDEXED, "
+            "tokenize='unicode61 remove_diacritics 2')"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS doc_keys (doc_key TEXT PRIMARY KEY, chunk_rowid INTEGER)"
+        )
+        self._conn.commit()
+
+    def add_many(self, docs):
+        """
+        Index (doc_key, text, store, metadata) tuples. Keys already indexed
+        are skipped, so re-ingestion is idempotent. Returns rows added.
+        """
+        added = 0
+        with self._lock:
+            for doc_key, text, store, metadata in docs:
+                exists = self._conn.execute(
+                    "SELECT 1 FROM doc_keys WHERE doc_key = ?", (doc_key,)
+                ).fetchone()
+                if exists:
+                    continue
+                cur = self._conn.execute(
+                    "INSERT INTO chunks (text, store, metadata) VALUES (?, ?, ?)",
+                    (text, store, json.dumps(metadata or {}, ensure_ascii=False)),
+                )
+                self._conn.execute(
+                    "INSERT INTO doc_keys (doc_key, chunk_rowid) VALUES (?, ?)",
+                    (doc_key, cur.lastrowid),
+                )
+                added += 1
+            self._conn.commit()
+        return added
+
+    def search(self, query: str, k: int = 5, store: str = None):
+        """Return up to k hits ranked by BM25 ("score": higher is better)."""
+        match = build_match_query(query)
+        if match is None:
+            return []
+
+        sql = "SELECT text, store, metadata, bm25(chunks) FROM chunks WHERE chunks MATCH ?"
+        params = [match]
+        if store:
+            sql += " AND store = ?"
+            params.append(store)
+        sql += " ORDER BY bm25(chunks) LIMIT ?"
+        params.append(k)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+
+        return [
+            {"text": text, "store": src, "metadata": json.loads(meta), "score": -rank}
+            for text, src, meta, rank in rows
+        ]
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM doc_keys").fetchone()[0]
+
+    def optimize(self):
+        """Merge FTS5 segments after large bulk loads."""
+        with self._lock:
+            self._conn.execute("INSERT INTO chunks(chunks) VALUES ('optimize')")
+            self._conn.commit()
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_lexical_index() -> LexicalIndex:
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = LexicalIndex()
+    return _index
+
+
+def index_documents(docs):
+    """Best-effort incremental indexing hook used by the dense stores."""
+    try:
+        return get_lexical_index().add_many(docs)
+    except Exception as e:
+        print(f"Lexical indexing failed: {e}")
+        return 0
+
+
+def search_lexical_many(queries, k: int = 5):
+    index = get_lexical_index()
+    return [index.search(q, k=k) for q in queries]
+
+
+def rebuild_from_stores():
+    """Index every chunk already held in the FAISS chunk store and the Chroma memory."""
+    from backend import memory_manager
+    from backend.utils import embedding_manager
+
+    index = get_lexical_index()
+    store = memory_manager.get_store()
+    added = index.add_many(
+        (f"faiss:{i}", row["chunk"]["doc"], "faiss", row["metadata"])
+        for i, row in ((i, store.get(i)) for i in range(len(store)))
+    )
+
+    memory = embedding_manager.get_collection().get(include=["documents", "metadatas"])
+    added += index.add_many(
+        (f"chroma:{doc_id}", doc, "chroma", meta)
+        for doc_id, doc, meta in zip(
+            memory.get("ids") or [], memory.get("documents") or [], memory.get("metadatas") or []
+        )
+    )
+
+    index.optimize()
+    return added
+
+
+if __name__ == "__main__":
+    if "--rebuild" in sys.argv:
+        print(f"Indexed {rebuild_from_stores()} new chunks into {INDEX_PATH}.")
@@ -0,0 +1,213 @@
+"""
+llm_cache.py
+------------
+Persistent, content-addressed cache for LLM responses backed by SQLite.
+Entries are keyed on a hash of the normalized input, the prompt template
+version, the model and the temperature. The cache supports TTL expiry,
+size-bounded LRU eviction and hit/miss metrics.
+
+Reads do not write: a hit only records its access time in memory, and the
+recorded times are written in one batch every TOUCH_BATCH hits (and before
+any write or eviction, so LRU order stays accurate).
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+
+from database.models import normalize_text
+
+CACHE_PATH = Path(os.getenv("LLM_CACHE_PATH", "data/llm_cache.sqlite3"))
+CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") not in ("0", "false", "False")
+TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+TOUCH_BATCH = int(os.getenv("LLM_CACHE_TOUCH_BATCH", "256"))
+
+
+def make_key(text: str, prompt_version: str, model: str, temperature: float) -> str:
+    """Content-address an LLM call."""
+    payload = json.dumps(
+        [normalize_text(text), prompt_version, model, round(float(temperature), 4)],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed LRU cache with TTL for JSON-serializable LLM results."""
+
+    def __init__(self, path=CACHE_PATH, ttl_seconds=TTL_SECONDS, max_bytes=MAX_BYTES):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._touched = {}  # key -> last access time not yet written
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access)"
+        )
+        self._conn.commit()
+
+        self._total_bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def get(self, key: str):
+        """Return the cached value or None. Expired entries count as misses."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, size, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            value, size, created_at = row
+            if self.ttl_seconds and now - created_at > self.ttl_seconds:
+                self._touched.pop(key, None)
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                self._total_bytes -= size
+                self.expired += 1
+                self.misses += 1
+                return None
+
+            self._touched[key] = now
+            self.hits += 1
+            if len(self._touched) >= TOUCH_BATCH:
+                self._flush_touches()
+                self._conn.commit()
+
+        return json.loads(value)
+
+    def _flush_touches(self):
+        """Write pending access times (caller holds the lock and commits)."""
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE responses SET last_access = ? WHERE key = ?",
+                [(t, k) for k, t in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def flush(self):
+        with self._lock:
+            self._flush_touches()
+            self._conn.commit()
+
+    def contains(self, key: str) -> bool:
+        """Check for a live entry without touching LRU order or metrics."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return False
+        return not (self.ttl_seconds and time.time() - row[0] > self.ttl_seconds)
+
+    def set(self, key: str, value):
+        """Store a JSON-serializable value, evicting least-recently-used entries if needed."""
+        data = json.dumps(value, ensure_ascii=False)
+        size = len(data.encode("utf-8"))
+        now = time.time()
+
+        with self._lock:
+            old = self._conn.execute(
+                "SELECT size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, data, size, now, now),
+            )
+            self._total_bytes += size - (old[0] if old else 0)
+            self._touched.pop(key, None)
+
+            if self._total_bytes > self.max_bytes:
+                self._flush_touches()
+                self._evict()
+
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop least-recently-used rows until the cache is back under 90% of its budget."""
+        target = int(self.max_bytes * 0.9)
+        rows = self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY last_access ASC"
+        )
+        doomed = []
+        for key, size in rows:
+            if self._total_bytes <= target:
+                break
+            doomed.append((key,))
+            self._total_bytes -= size
+
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+        self.evictions += len(doomed)
+
+    def clear(self):
+        with self._lock:
+            self._touched.clear()
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self._total_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "enabled": CACHE_ENABLED,
+            "entries": entries,
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Return the process-wide response cache, opening it on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache()
+    return _cache
+
+
+def flush_response_cache():
+    """Write pending access times; called from the app shutdown event."""
+    if _cache is not None:
+        _cache.flush()
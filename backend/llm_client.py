@@ -0,0 +1,161 @@
+"""
+llm_client.py
+-------------
+Shared async OpenAI client for reasoning, negotiation and mediation.
+A single pooled HTTP connection layer per process lets one uvicorn worker
+keep hundreds of LLM calls in flight without tying up threadpool workers.
+
+Calls made with a `prompt_version` are metered per version: prompt,
+cached and completion tokens from the provider's usage block, plus
+latency (and time to first token for streams) split by whether the
+provider served part of the prompt from its cache. See `prompt_cache_stats`.
+"""
+
+import os
+import time
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "256"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "64"))
+TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "120"))
+MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+# Send the prompt version as OpenAI's `prompt_cache_key`, which routes calls
+# sharing a prefix to the same cache. Disable for endpoints that reject it.
+SEND_PROMPT_CACHE_KEY = os.getenv("LLM_PROMPT_CACHE_KEY", "1") not in ("0", "false", "False")
+
+USAGE = {}
+
+_client = None
+
+
+def get_client() -> AsyncOpenAI:
+    """Return the process-wide async client, creating it on first use."""
+    global _client
+    if _client is None:
+        http_client = DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            ),
+            timeout=httpx.Timeout(TIMEOUT_SECONDS, connect=10.0),
+        )
+        _client = AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            http_client=http_client,
+            max_retries=MAX_RETRIES,
+        )
+    return _client
+
+
+def _cached_tokens(usage) -> int:
+    details = getattr(usage, "prompt_tokens_details", None)
+    if isinstance(details, dict):
+        return details.get("cached_tokens") or 0
+    return getattr(details, "cached_tokens", None) or 0
+
+
+def record_usage(prompt_version: str, usage, seconds: float, first_token: float = None):
+    stats = USAGE.setdefault(prompt_version, {
+        "calls": 0, "cache_hits": 0, "prompt_tokens": 0, "cached_tokens": 0,
+        "completion_tokens": 0, "seconds": {"hit": 0.0, "miss": 0.0},
+        "first_token": {"hit": [0.0, 0], "miss": [0.0, 0]},
+    })
+    cached = _cached_tokens(usage) if usage else 0
+    outcome = "hit" if cached else "miss"
+    stats["calls"] += 1
+    stats["cache_hits"] += 1 if cached else 0
+    stats["cached_tokens"] += cached
+    if usage:
+        stats["prompt_tokens"] += usage.prompt_tokens or 0
+        stats["completion_tokens"] += usage.completion_tokens or 0
+    stats["seconds"][outcome] += seconds
+    if first_token is not None:
+        stats["first_token"][outcome][0] += first_token
+        stats["first_token"][outcome][1] += 1
+
+
+def prompt_cache_stats():
+    """Per prompt version: cached share of prompt tokens and hit vs. miss latency."""
+    out = {}
+    for version, s in USAGE.items():
+        hits, misses = s["cache_hits"], s["calls"] - s["cache_hits"]
+        out[version] = {
+            "calls": s["calls"],
+            "cache_hits": hits,
+            "prompt_tokens": s["prompt_tokens"],
+            "cached_tokens": s["cached_tokens"],
+            "completion_tokens": s["completion_tokens"],
+            "cached_token_rate": s["cached_tokens"] / max(1, s["prompt_tokens"]),
+            "mean_seconds_hit": s["seconds"]["hit"] / hits if hits else None,
+            "mean_seconds_miss": s["seconds"]["miss"] / misses if misses else None,
+            "mean_first_token_hit": _mean(s["first_token"]["hit"]),
+            "mean_first_token_miss": _mean(s["first_token"]["miss"]),
+        }
+    return out
+
+
+def _mean(pair):
+    total, n = pair
+    return total / n if n else None
+
+
+async def _metered_stream(stream, prompt_version: str, started: float):
+    """
+    Pass stream chunks through, recording usage and time to first token.
+    The call is recorded however the stream ends: drained, failed, or
+    closed early by the consumer (which also releases the connection).
+    """
+    first_token = usage = None
+    try:
+        async for chunk in stream:
+            if first_token is None and chunk.choices and chunk.choices[0].delta.content:
+                first_token = time.perf_counter() - started
+            if getattr(chunk, "usage", None):
+                usage = chunk.usage
+            yield chunk
+    finally:
+        record_usage(prompt_version, usage, time.perf_counter() - started, first_token)
+        close = getattr(stream, "close", None)
+        if close is not None:
+            await close()
+
+
+async def chat_completion(
+    model: str, messages: list, temperature: float, prompt_version: str = None, **kwargs
+):
+    """
+    Run a chat completion on the shared client and return the raw response
+    (an async iterator of chunks with `stream=True`). With `prompt_version`
+    the call is metered and tagged for the provider's prompt cache.
+    """
+    if prompt_version:
+        if SEND_PROMPT_CACHE_KEY:
+            kwargs["extra_body"] = {**kwargs.get("extra_body", {}), "prompt_cache_key": prompt_version}
+        if kwargs.get("stream"):
+            kwargs.setdefault("stream_options", {"include_usage": True})
+
+    started = time.perf_counter()
+    response = await get_client().chat.completions.create(
+        model=model,
+        messages=messages,
+        temperature=temperature,
+        **kwargs,
+    )
+    if not prompt_version:
+        return response
+    if kwargs.get("stream"):
+        return _metered_stream(response, prompt_version, started)
+    record_usage(prompt_version, getattr(response, "usage", None), time.perf_counter() - started)
+    return response
+
+
+async def close_client():
+    """Close pooled connections; called from the app shutdown event."""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
@@ -1,25 +1,27 @@
-import os, json, re
-from openai import OpenAI
-from backend.prompts.mediation import build_mediation_messages
-from dotenv import load_dotenv
+from backend.llm_client import chat_completion
+from backend.prompts.mediation import PROMPT_VERSION, build_mediation_messages
+from backend.schemas import MediationResult, OutputValidationError, response_format, validate_output
 
-load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-def mediate(party_a: str, party_b: str):
+async def mediate(party_a: str, party_b: str):
     """
     Generates a mediation decision using:
     - System + Few-shot prompt builder
     - Kenyan ADR principles
-    - Markdown output for the UI
+    - Output constrained to, and validated against, MediationResult
     """
 
     messages = build_mediation_messages(party_a, party_b)
 
-    res = client.chat.completions.create(
+    res = await chat_completion(
         model="gpt-4.1-mini",
         messages=messages,
-        temperature=0.3
+        temperature=0.3,
+        prompt_version=PROMPT_VERSION,
+        response_format=response_format(MediationResult),
     )
 
-    return {"result": res.choices[0].message.content}
+    raw_text = res.choices[0].message.content or ""
+    try:
+        return validate_output(MediationResult, raw_text)
+    except OutputValidationError as e:
+        return {"error": f"Invalid mediation output: {e}", "raw_output": raw_text}
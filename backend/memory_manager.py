@@ -1,70 +1,332 @@
 import os
-import faiss
+import json
+import time
+import atexit
+import argparse
 import pickle
+import threading
 import numpy as np
 from pathlib import Path
 from dotenv import load_dotenv
-from openai import OpenAI
+
+from backend.utils.embedding_cache import cached_embed
+from backend.chunk_store import ChunkStore
+from backend.lexical_index import index_documents
+from backend import vector_index
 
 load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+EMBED_MODEL = "text-embedding-3-small"
+EMBED_API_BATCH = 256
 
 BASE = Path(__file__).resolve().parents[1]
 FAISS_DIR = BASE / "data" / "vectorstore_faiss"
 
-FAISS_DIR.mkdir(parents=True, exist_ok=True)
+INDEX_PATH = FAISS_DIR / "documents.index"
+META_LOG_PATH = FAISS_DIR / "metadata.jsonl"
+META_OFFSETS_PATH = FAISS_DIR / "metadata.offsets"
+# Legacy monolithic pickle written by notebooks/clean_and_embed.ipynb;
+# migrated once into META_LOG_PATH and never rewritten.
+META_PATH = FAISS_DIR / "metadata.pkl"
+
+# Open the index with FAISS IO_FLAG_MMAP so worker processes share one
+# page-cache copy. FAISS maps IVF inverted lists (ivf_flat / ivf_pq); flat
+# and HNSW storage is still read into each process.
+MMAP_INDEX = os.getenv("MEMORY_MMAP", "1") not in ("0", "false", "False")
+
+# Write-behind persistence: new vectors are searchable immediately, but the
+# index and metadata log are only written every FLUSH_EVERY additions or
+# FLUSH_INTERVAL_SECONDS, whichever comes first (and at interpreter exit).
+# A background timer enforces the interval even if no further write arrives.
+WRITE_BEHIND = os.getenv("MEMORY_WRITE_BEHIND", "1") not in ("0", "false", "False")
+FLUSH_EVERY = int(os.getenv("MEMORY_FLUSH_EVERY", "500"))
+FLUSH_INTERVAL_SECONDS = float(os.getenv("MEMORY_FLUSH_INTERVAL_SECONDS", "30"))
+
+_client = None
+_index = None
+_index_mapped = False
+_store = None
+_lock = threading.Lock()
+_write_lock = threading.Lock()
+
+_last_flush = time.monotonic()
+_flush_timer = None
 
-INDEX_PATH = FAISS_DIR / "/data/vectorstore_faiss/documents.index"
-META_PATH = FAISS_DIR / "/data/vectorstore_faiss/metadata.pkl"
 
-def load_faiss_index(dim=1536):
+def get_client():
+    """Return the OpenAI client used for corpus embeddings, created on first use."""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                from openai import OpenAI
+                _client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    return _client
+
+
+def load_faiss_index(dim=1536, mmap=MMAP_INDEX):
+    import faiss
+    global _index_mapped
     if INDEX_PATH.exists():
-        index = faiss.read_index(str(INDEX_PATH))
+        if mmap:
+            index = faiss.read_index(
+                str(INDEX_PATH), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+            )
+            _index_mapped = True
+        else:
+            index = faiss.read_index(str(INDEX_PATH))
+            _index_mapped = False
     else:
-        index = faiss.IndexFlatL2(dim)
-    return index
+        # IVF types need vectors to train on; start flat and rebuild_index() later.
+        kind = "hnsw" if vector_index.INDEX_TYPE == "hnsw" else "flat"
+        index = vector_index.new_index(kind, dim)
+        _index_mapped = False
+    return vector_index.configure_search(index)
 
-index = load_faiss_index()
 
-if META_PATH.exists():
+def _migrate_legacy_pickle():
+    """Convert the old metadata.pkl into the append-only JSONL log."""
     with open(META_PATH, "rb") as f:
-        store = pickle.load(f)
-else:
-    store = {"chunks": [], "metadata": []}
+        legacy = pickle.load(f)
+
+    FAISS_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = META_LOG_PATH.with_suffix(".jsonl.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        for chunk, meta in zip(legacy.get("chunks", []), legacy.get("metadata", [])):
+            f.write(json.dumps({"chunk": chunk, "metadata": meta}, ensure_ascii=False) + "\n")
+    os.replace(tmp, META_LOG_PATH)
+
+
+def load_store(limit=None):
+    """
+    Open the memory-mapped chunk store, keeping at most `limit` rows so rows
+    written by a flush interrupted before the index write are discarded.
+    """
+    if not META_LOG_PATH.exists() and META_PATH.exists():
+        _migrate_legacy_pickle()
+    return ChunkStore(META_LOG_PATH, META_OFFSETS_PATH, limit=limit)
+
+
+def get_index():
+    """Return the FAISS index, reading it from disk on first use."""
+    global _index
+    if _index is None:
+        with _lock:
+            if _index is None:
+                _index = load_faiss_index()
+    return _index
+
+
+def get_store():
+    """Return the chunk/metadata store, mapping the metadata log on first use."""
+    global _store
+    if _store is None:
+        index = get_index()
+        with _lock:
+            if _store is None:
+                _store = load_store(limit=index.ntotal)
+    return _store
+
+
+def warm_up():
+    """Load the FAISS index and metadata ahead of the first request."""
+    get_index()
+    get_store()
+
+
+def _embed_api(texts):
+    vectors = []
+    for i in range(0, len(texts), EMBED_API_BATCH):
+        emb = get_client().embeddings.create(
+            model=EMBED_MODEL,
+            input=texts[i:i + EMBED_API_BATCH]
+        )
+        vectors.extend(d.embedding for d in emb.data)
+    return vectors
+
+def embed_many(texts):
+    """Embed texts through the persistent cache; returns an (n, dim) float32 matrix."""
+    vectors = cached_embed(f"openai/{EMBED_MODEL}", texts, _embed_api)
+    return np.vstack(vectors).astype("float32")
 
 def embed(text):
-    emb = client.embeddings.create(
-        model="text-embedding-3-small",
-        input=[text]
+    return embed_many([text])[0]
+
+def add_many_to_memory(items):
+    """
+    Bulk-add (content, meta) pairs: one batched embedding call, one index
+    add, and metadata rows queued for the next write-behind flush.
+    """
+    items = list(items)
+    if not items:
+        return 0
+
+    vectors = embed_many([content for content, _ in items])
+    store = get_store()
+
+    with _write_lock:
+        _ensure_writable()
+        first_id = len(store)
+        get_index().add(vectors)
+        for content, meta in items:
+            store.append({"doc": content, **meta}, meta)
+
+        due = (
+            not WRITE_BEHIND
+            or len(store) - store.persisted >= FLUSH_EVERY
+            or time.monotonic() - _last_flush >= FLUSH_INTERVAL_SECONDS
+        )
+        if due:
+            _flush_locked()
+        else:
+            _schedule_flush_locked()
+
+    index_documents(
+        (f"faiss:{first_id + i}", content, "faiss", meta)
+        for i, (content, meta) in enumerate(items)
     )
-    return np.array(emb.data[0].embedding).astype("float32")
+    return len(items)
 
 def add_to_memory(content, meta):
-    vector = embed(content).reshape(1, -1)
-    index.add(vector)
+    add_many_to_memory([(content, meta)])
+
+def _ensure_writable():
+    """
+    Swap a memory-mapped IVF index for an in-memory copy before the first
+    write; FAISS cannot add to mmapped inverted lists. Caller holds _write_lock.
+    """
+    global _index, _index_mapped
+    index = get_index()
+    if _index_mapped and vector_index.index_kind(index).startswith("ivf"):
+        _index = load_faiss_index(mmap=False)
+    _index_mapped = False
+
+def _schedule_flush_locked():
+    """Start a timer that flushes once the interval expires. Caller holds _write_lock."""
+    global _flush_timer
+    if _flush_timer is not None:
+        return
+    delay = max(0.0, FLUSH_INTERVAL_SECONDS - (time.monotonic() - _last_flush))
+    _flush_timer = threading.Timer(delay, _timed_flush)
+    _flush_timer.daemon = True
+    _flush_timer.start()
+
+def _timed_flush():
+    global _flush_timer
+    with _write_lock:
+        _flush_timer = None
+        try:
+            if _store is not None and _store.dirty:
+                _flush_locked()
+        except Exception as e:
+            print(f"Memory flush failed: {e}")
 
-    store["chunks"].append({"doc": content, **meta})
-    store["metadata"].append(meta)
+def _flush_locked():
+    """Append queued metadata rows, then write the index. Caller holds _write_lock."""
+    global _last_flush
+    import faiss
 
-    persist_memory()
+    FAISS_DIR.mkdir(parents=True, exist_ok=True)
+    get_store().flush()
+
+    tmp = INDEX_PATH.with_suffix(".index.tmp")
+    faiss.write_index(get_index(), str(tmp))
+    os.replace(tmp, INDEX_PATH)
+    _last_flush = time.monotonic()
+
+def rebuild_index(kind=None, **params):
+    """
+    Re-train and rebuild the memory index as `kind` (default FAISS_INDEX_TYPE)
+    over the vectors already stored, then persist it. Rebuilding from an
+    ivf_pq index starts from its quantized vectors, so keep a flat or
+    hnsw index around if you expect to switch types again.
+    """
+    global _index
+    with _write_lock:
+        _ensure_writable()
+        index = get_index()
+        if vector_index.index_kind(index) == "ivf_pq":
+            print("Rebuilding from an ivf_pq index: source vectors are approximate.")
+        vectors = vector_index.extract_vectors(index)
+        _index = vector_index.build_index(vectors, kind, **params)
+        _flush_locked()
+    return vector_index.index_kind(_index)
 
 def persist_memory():
-    faiss.write_index(index, str(INDEX_PATH))
-    with open(META_PATH, "wb") as f:
-        pickle.dump(store, f)
+    """Flush any pending additions to disk immediately."""
+    with _write_lock:
+        if _index is not None:
+            _flush_locked()
 
-def search_memory(query, k=5):
-    vec = embed(query).reshape(1, -1)
-    distances, indices = index.search(vec, k)
+def flush_if_dirty():
+    with _write_lock:
+        if _store is not None and _store.dirty:
+            _flush_locked()
+
+atexit.register(flush_if_dirty)
+
+def search_memory_many(queries, k=5):
+    """
+    Search the FAISS store for many queries with one batched embedding call
+    and one index search. "score" is the squared L2 distance (lower is closer).
+    """
+    queries = list(queries)
+    if not queries:
+        return []
+
+    index = get_index()
+    if index.ntotal == 0:
+        return [[] for _ in queries]
+
+    vecs = embed_many(queries)
+    distances, indices = index.search(vecs, k)
+    store = get_store()
     results = []
 
-    for idx, dist in zip(indices[0], distances[0]):
-        if idx == -1:
-            continue
-        results.append({
-            "text": store["chunks"][idx]["doc"],
-            "meta": store["metadata"][idx],
-            "score": float(dist)
-        })
+    for row_ids, row_dists in zip(indices, distances):
+        hits = []
+        for idx, dist in zip(row_ids, row_dists):
+            if idx == -1 or idx >= len(store):
+                continue
+            row = store.get(int(idx))
+            hits.append({
+                "text": row["chunk"]["doc"],
+                "meta": row["metadata"],
+                "score": float(dist)
+            })
+        results.append(hits)
 
     return results
+
+def search_memory(query, k=5):
+    return search_memory_many([query], k=k)[0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m backend.memory_manager", description="Maintain the FAISS document memory."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    rebuild = commands.add_parser(
+        "rebuild", help="re-train the index over the stored vectors as another index type"
+    )
+    rebuild.add_argument("--kind", choices=vector_index.INDEX_TYPES, default=None,
+                         help="index type (default: FAISS_INDEX_TYPE)")
+    rebuild.add_argument("--nlist", type=int, help="IVF lists (default: FAISS_NLIST)")
+    rebuild.add_argument("--pq-m", type=int, help="PQ sub-quantizers (default: FAISS_PQ_M)")
+    rebuild.add_argument("--pq-nbits", type=int, help="bits per PQ code (default: FAISS_PQ_NBITS)")
+    rebuild.add_argument("--hnsw-m", type=int, help="HNSW neighbours (default: FAISS_HNSW_M)")
+    args = parser.parse_args(argv)
+
+    params = {
+        name: getattr(args, name)
+        for name in ("nlist", "pq_m", "pq_nbits", "hnsw_m")
+        if getattr(args, name) is not None
+    }
+    kind = rebuild_index(args.kind, **params)
+    print(f"Rebuilt {INDEX_PATH} as {kind} over {get_index().ntotal} vectors.")
+    return kind
+
+
+if __name__ == "__main__":
+    main()
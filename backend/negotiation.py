@@ -1,85 +1,242 @@
-import json
-import re
 import os
-from openai import OpenAI
-from backend.prompts.negotiation import build_negotiation_messages
-from dotenv import load_dotenv
-
-load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-STRICT_SCHEMA = {
-    "dialogue": [
-        {"party": "A", "text": "string"},
-        {"party": "B", "text": "string"}
-    ],
-    "mutually_beneficial_revision": "string",
-    "tradeoffs": ["string"],
-    "win_win_justification": "string",
-    "legal_refs": ["string"]
-}
-
-def force_json_repair(bad_text: str):
-    """
-    Attempts to repair invalid JSON output from LLM.
-    """
-
-    fix_prompt = f"""
-Convert the following into STRICT JSON with these keys only:
-dialogue, mutually_beneficial_revision, tradeoffs, win_win_justification, legal_refs.
+import time
+import asyncio
 
-Return ONLY JSON. No explanations.
+from backend.json_repair import JSONStream
+from database.models import normalize_text
+from backend.llm_client import chat_completion
+from backend.prompts.negotiation import (
+    PROMPT_VERSION,
+    SUMMARY_PROMPT_VERSION,
+    TURN_PROMPT_VERSION,
+    build_negotiation_messages,
+    build_summary_messages,
+    build_turn_messages,
+)
+from backend.schemas import (
+    NegotiationMove,
+    NegotiationResult,
+    NegotiationSummary,
+    OutputValidationError,
+    response_format,
+    validate_output,
+)
 
-Input:
-{bad_text}
-"""
-
-    try:
-        res = client.chat.completions.create(
-            model="gpt-4.1-mini",
-            messages=[{"role": "user", "content": fix_prompt}],
-            temperature=0
-        )
-        txt = res.choices[0].message.content.strip()
-        return json.loads(txt)
-    except:
-        return None
+NEGOTIATION_MODEL = "gpt-4.1-mini"
+NEGOTIATION_TEMPERATURE = 0.25
+# Upper bound on party turns generated by one streamed negotiation request.
+MAX_TURNS = int(os.getenv("NEGOTIATION_MAX_TURNS", "12"))
+# Clause negotiations run at once by /negotiate/batch.
+MAX_CONCURRENCY = int(os.getenv("NEGOTIATE_MAX_CONCURRENCY", "8"))
 
 
-def negotiate(clause: str, position: str, turns: int = 4):
+async def negotiate(clause: str, position: str, turns: int = 4):
     """
     Runs a contract negotiation simulation between Party A & Party B.
+    The reply is constrained to, and validated against, NegotiationResult.
     """
 
     messages = build_negotiation_messages(clause, position, turns)
 
     try:
-        res = client.chat.completions.create(
-            model="gpt-4.1-mini",
+        res = await chat_completion(
+            model=NEGOTIATION_MODEL,
             messages=messages,
-            temperature=0.25
+            temperature=NEGOTIATION_TEMPERATURE,
+            prompt_version=PROMPT_VERSION,
+            response_format=response_format(NegotiationResult),
         )
-        raw_text = res.choices[0].message.content.strip()
+        message = res.choices[0].message
     except Exception as e:
         return {"error": f"LLM request failed: {e}"}
 
+    if getattr(message, "refusal", None):
+        return {"error": f"Model refused: {message.refusal}"}
+
+    raw_text = (message.content or "").strip()
+    try:
+        return validate_output(NegotiationResult, raw_text)
+    except OutputValidationError as e:
+        return {
+            "error": f"Invalid negotiation output: {e}",
+            "raw_output": raw_text
+        }
+
+
+
+async def _timed_negotiation(clause: str, position: str):
+    """`negotiate` with its wall time; an unexpected failure becomes an error entry."""
+    started = time.perf_counter()
+    try:
+        result = await negotiate(clause, position)
+    except Exception as e:
+        result = {"error": f"Negotiation failed: {e}"}
+    return result, round(time.perf_counter() - started, 3)
+
+
+async def iter_negotiations(pairs, max_concurrency: int = None):
+    """
+    Negotiate many (clause, position) pairs with at most `max_concurrency`
+    LLM calls in flight. Yields `(index, result, seconds)` as each finishes;
+    one clause failing never affects the others. Pending negotiations are
+    cancelled if the consumer stops early.
+    """
+    pairs = list(pairs)
+    semaphore = asyncio.Semaphore(max(1, max_concurrency or MAX_CONCURRENCY))
+
+    async def bounded(index):
+        async with semaphore:
+            return (index, *await _timed_negotiation(*pairs[index]))
+
+    tasks = [asyncio.ensure_future(bounded(i)) for i in range(len(pairs))]
     try:
-        return json.loads(raw_text)
-    except:
-        pass
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
 
-    match = re.search(r"\{[\s\S]*\}", raw_text)
-    if match:
+async def negotiate_many(pairs, max_concurrency: int = None):
+    """Ordered `[(result, seconds)]` for every pair, via `iter_negotiations`."""
+    pairs = list(pairs)
+    results = [None] * len(pairs)
+    async for index, result, seconds in iter_negotiations(pairs, max_concurrency):
+        results[index] = (result, seconds)
+    return results
+
+def next_party(transcript) -> str:
+    """Parties alternate, Party A first; user notes do not take a turn."""
+    for turn in reversed(transcript):
+        if turn["party"] in ("A", "B"):
+            return "B" if turn["party"] == "A" else "A"
+    return "A"
+
+
+def converged(move: dict, transcript) -> bool:
+    """True once a party accepts (or repeats verbatim) the other side's latest proposal."""
+    if move["accepts"]:
+        return True
+    for turn in reversed(transcript):
+        if turn["party"] in ("A", "B"):
+            return bool(turn.get("proposal")) and (
+                normalize_text(turn["proposal"]) == normalize_text(move["proposal"])
+            )
+    return False
+
+
+async def _stream_move(messages, index, party):
+    """
+    Stream one party turn. Yields {"type": "delta"} events carrying the new
+    part of the turn's text as it arrives, then the validated move dict.
+    """
+    stream = await chat_completion(
+        model=NEGOTIATION_MODEL,
+        messages=messages,
+        temperature=NEGOTIATION_TEMPERATURE,
+        prompt_version=TURN_PROMPT_VERSION,
+        response_format=response_format(NegotiationMove),
+        stream=True,
+    )
+    parser = JSONStream(track="text")
+    async for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta
+        if getattr(delta, "refusal", None):
+            raise OutputValidationError(f"Model refused: {delta.refusal}")
+        if not delta.content:
+            continue
+        parser.feed(delta.content)
+        text = parser.take_tracked()
+        if text:
+            yield {"type": "delta", "index": index, "party": party, "text": text}
+    yield validate_output(NegotiationMove, parser.text)
+
+
+async def iter_negotiation(
+    clause: str,
+    position: str,
+    max_turns: int = 6,
+    history=None,
+    interjection: str = None,
+):
+    """
+    Turn-by-turn negotiation. Each party turn is its own short, streamed
+    completion, so the first words of Party A's opening reach the client
+    after one small call instead of after the whole dialogue is generated.
+
+    Yields event dicts:
+      {"type": "start", "next_party", "max_turns"}
+      {"type": "delta", "index", "party", "text"}   text fragments of a turn
+      {"type": "turn", "index", "party", "text", "proposal", "accepts"}
+      {"type": "error", "error"[, "raw_output"]}
+      {"type": "done", "converged", "stopped", "transcript", "result"}
+
+    Generation stops early once the parties converge. To interject, the
+    client sends the "transcript" from "done" back as `history` together
+    with an `interjection` (a user note both parties must follow) and the
+    negotiation resumes from there. "result" has the NegotiationResult shape.
+    """
+    transcript = [dict(turn) for turn in history or []]
+    if interjection and interjection.strip():
+        transcript.append({"party": "user", "text": interjection.strip()})
+    max_turns = max(1, min(max_turns, MAX_TURNS))
+
+    yield {"type": "start", "next_party": next_party(transcript), "max_turns": max_turns}
+
+    agreed = False
+    for _ in range(max_turns):
+        party = next_party(transcript)
+        index = len(transcript)
+        messages = build_turn_messages(clause, position, party, transcript)
+        move = None
         try:
-            return json.loads(match.group(0))
-        except:
-            pass
+            async for event in _stream_move(messages, index, party):
+                if event.get("type") == "delta":
+                    yield event
+                else:
+                    move = event
+        except OutputValidationError as e:
+            yield {"type": "error", "error": f"Invalid negotiation turn: {e}"}
+            return
+        except Exception as e:
+            yield {"type": "error", "error": f"LLM request failed: {e}"}
+            return
 
-    repaired = force_json_repair(raw_text)
-    if repaired:
-        return repaired
+        agreed = converged(move, transcript)
+        turn = {"party": party, **move}
+        transcript.append(turn)
+        yield {"type": "turn", "index": index, **turn}
+        if agreed:
+            break
+
+    try:
+        res = await chat_completion(
+            model=NEGOTIATION_MODEL,
+            messages=build_summary_messages(clause, position, transcript),
+            temperature=NEGOTIATION_TEMPERATURE,
+            prompt_version=SUMMARY_PROMPT_VERSION,
+            response_format=response_format(NegotiationSummary),
+        )
+        raw_text = (res.choices[0].message.content or "").strip()
+    except Exception as e:
+        yield {"type": "error", "error": f"LLM request failed: {e}"}
+        return
+    try:
+        summary = validate_output(NegotiationSummary, raw_text)
+    except OutputValidationError as e:
+        yield {"type": "error", "error": f"Invalid negotiation summary: {e}", "raw_output": raw_text}
+        return
 
-    return {
-        "error": "Unable to parse negotiation JSON.",
-        "raw_output": raw_text
+    dialogue = [
+        {"party": turn["party"], "text": turn["text"]}
+        for turn in transcript if turn["party"] in ("A", "B")
+    ]
+    yield {
+        "type": "done",
+        "converged": agreed,
+        "stopped": "converged" if agreed else "max_turns",
+        "transcript": transcript,
+        "result": {"dialogue": dialogue, **summary},
     }
@@ -1,19 +1,21 @@
-import re
+from backend.segmenter import ClauseStream, MAX_CLAUSE_CHARS, split_clauses
+
 
 def split_into_clauses(text):
     """
     Split contract into clauses using section headers, numbering, etc.
+    See backend/segmenter.py for the recognised boundaries.
     """
+    return split_clauses(text)
 
-    patterns = [
-        r"\n\d+\.",        
-        r"\n\d+\)",        
-        r"\n[A-Z][a-zA-Z ]+:" 
-    ]
-
-    combined = "|".join(patterns)
-
-    pieces = re.split(combined, text)
-    clauses = [c.strip() for c in pieces if len(c.strip()) > 30]
 
-    return clauses
+def iter_clauses(chunks, max_clause_chars: int = MAX_CLAUSE_CHARS):
+    """
+    Streaming `split_into_clauses` over an iterable of text chunks (e.g. PDF
+    pages, joined with newlines). Clauses are yielded as soon as the next
+    boundary is seen, so only the clause still in progress is held in memory.
+    """
+    stream = ClauseStream(max_chars=max_clause_chars)
+    for chunk in chunks:
+        yield from stream.feed(chunk)
+    yield from stream.close()
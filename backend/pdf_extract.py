@@ -0,0 +1,311 @@
+"""
+pdf_extract.py
+--------------
+Shared PDF text extraction for the backend, the Streamlit UI and the
+notebooks.
+
+- Pages are extracted lazily, so the streaming clause splitter sees them
+  one at a time and peak memory depends on the largest page and clause,
+  not on how many pages the document has.
+- PyPDF2 extraction is CPU-bound, so documents with at least
+  PDF_PARALLEL_MIN_PAGES pages are split into page ranges and extracted
+  across a process pool. Pages are reassembled in order, and only a small
+  window of ranges is in flight at once.
+- Extracted pages are cached on disk, keyed by the SHA-256 of the file, so
+  a re-uploaded contract is read back instantly instead of re-parsed.
+
+Uploads should be passed as a path or a seekable file object, never as one
+big in-memory string.
+"""
+
+import os
+import json
+import hashlib
+import tempfile
+import threading
+import contextlib
+import multiprocessing
+from pathlib import Path
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from backend.parser import iter_clauses
+
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "0")) or os.cpu_count() or 1
+PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "32"))
+PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "16"))
+TEXT_CACHE_DIR = Path(os.getenv("PDF_TEXT_CACHE_DIR", "data/pdf_text_cache"))
+TEXT_CACHE_ENABLED = os.getenv("PDF_TEXT_CACHE_ENABLED", "1") == "1"
+
+# Bump when extraction output changes (e.g. a PyPDF2 upgrade) to invalidate the cache.
+EXTRACTOR_VERSION = "pypdf2-v1"
+
+COPY_CHUNK_BYTES = 1 << 20
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    Lazily create the shared extraction pool. Workers are spawned rather than
+    forked: both the API server and Streamlit are multi-threaded.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(
+                    max_workers=PDF_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def file_sha256(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(COPY_CHUNK_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def spool_upload(fileobj):
+    """
+    Copy a binary stream to a named temporary file in fixed-size chunks,
+    hashing it on the way. Returns (path, sha256); the caller deletes the
+    file. Keeps an upload readable (here and by pool workers) after the
+    request that carried it has been closed.
+    """
+    digest = hashlib.sha256()
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    with os.fdopen(fd, "wb") as out:
+        for block in iter(lambda: fileobj.read(COPY_CHUNK_BYTES), b""):
+            digest.update(block)
+            out.write(block)
+    return path, digest.hexdigest()
+
+
+@contextlib.contextmanager
+def as_path(source):
+    """Yield (path, sha256 or None) for a path or a binary file object."""
+    if isinstance(source, (str, os.PathLike)):
+        yield source, None
+        return
+    if hasattr(source, "seek"):
+        source.seek(0)
+    path, digest = spool_upload(source)
+    try:
+        yield path, digest
+    finally:
+        os.remove(path)
+
+
+# Per-process (path, mtime, size) -> PdfReader of the last file read, so a
+# worker handed consecutive ranges of one document only parses it once.
+_reader_cache = {}
+
+
+def _extract_range(path, start: int, stop: int):
+    """Worker: extract pages [start, stop) of the PDF at `path`."""
+    from PyPDF2 import PdfReader
+
+    st = os.stat(path)
+    key = (str(path), st.st_mtime_ns, st.st_size)
+    reader = _reader_cache.get(key)
+    if reader is None:
+        _reader_cache.clear()
+        reader = _reader_cache[key] = PdfReader(path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def _page_ranges(n: int, step: int):
+    return [(s, min(s + step, n)) for s in range(0, n, step)]
+
+
+def _iter_extracted(path, workers: int):
+    """Extract pages in order, in parallel page ranges when it pays off."""
+    from PyPDF2 import PdfReader
+
+    reader = PdfReader(path)
+    n = len(reader.pages)
+    if workers <= 1 or n < PARALLEL_MIN_PAGES:
+        for page in reader.pages:
+            yield page.extract_text() or ""
+        return
+    del reader
+
+    pool = get_pool()
+    step = max(1, min(PAGES_PER_TASK, -(-n // workers)))
+    ranges = iter(_page_ranges(n, step))
+    # At most two ranges per worker are in flight, bounding buffered text.
+    window = [
+        (s, e, pool.submit(_extract_range, str(path), s, e))
+        for s, e in islice(ranges, 2 * workers)
+    ]
+    try:
+        while window:
+            s, e, future = window.pop(0)
+            try:
+                pages = future.result()
+            except BrokenProcessPool as exc:
+                # e.g. workers that cannot be spawned from this interpreter.
+                print(f"PDF extraction pool failed ({exc}); continuing in-process.")
+                shutdown_pool()
+                for s, e in [(s, e)] + [(ws, we) for ws, we, _ in window] + list(ranges):
+                    yield from _extract_range(str(path), s, e)
+                window = []
+                _reader_cache.clear()
+                return
+            for s, e in islice(ranges, 1):
+                window.append((s, e, pool.submit(_extract_range, str(path), s, e)))
+            yield from pages
+    finally:
+        for _, _, future in window:
+            future.cancel()
+
+
+def _cache_path(digest: str) -> Path:
+    return TEXT_CACHE_DIR / f"{EXTRACTOR_VERSION}-{digest}.jsonl"
+
+
+def _write_cache(digest: str, pages):
+    cached = _cache_path(digest)
+    cached.parent.mkdir(parents=True, exist_ok=True)
+    tmp = cached.with_name(f"{cached.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as out:
+        out.writelines(json.dumps(text, ensure_ascii=False) + "\n" for text in pages)
+    os.replace(tmp, cached)
+
+
+def iter_pages(source, digest: str = None, workers: int = None):
+    """
+    Yield the text of each page of a PDF path or binary file object, in
+    order, from the text cache when this exact file was extracted before.
+    Pages are written to the cache as they stream past; the entry only
+    becomes visible once every page has been extracted.
+    """
+    with as_path(source) as (path, spooled_digest):
+        if not TEXT_CACHE_ENABLED:
+            yield from _iter_extracted(path, workers or PDF_WORKERS)
+            return
+
+        digest = digest or spooled_digest or file_sha256(path)
+        cached = _cache_path(digest)
+        if cached.exists():
+            with open(cached, encoding="utf-8") as f:
+                for line in f:
+                    yield json.loads(line)
+            return
+
+        cached.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cached.with_name(f"{cached.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        complete = False
+        try:
+            with open(tmp, "w", encoding="utf-8") as out:
+                for text in _iter_extracted(path, workers or PDF_WORKERS):
+                    out.write(json.dumps(text, ensure_ascii=False) + "\n")
+                    yield text
+            os.replace(tmp, cached)
+            complete = True
+        finally:
+            if not complete and tmp.exists():
+                tmp.unlink()
+
+
+def extract_pages(source, max_pages: int = None, workers: int = None):
+    """
+    Return the page texts of a PDF as a list. With `max_pages`, only the
+    first pages are needed: they come from the cache when available and are
+    otherwise read sequentially without populating it.
+    """
+    if max_pages is None:
+        return list(iter_pages(source, workers=workers))
+
+    with as_path(source) as (path, digest):
+        digest = digest or file_sha256(path)
+        if TEXT_CACHE_ENABLED and _cache_path(digest).exists():
+            return list(islice(iter_pages(path, digest=digest), max_pages))
+        return list(islice(_iter_extracted(path, workers=1), max_pages))
+
+
+def extract_text(source, max_pages: int = None, workers: int = None) -> str:
+    """Extract the text of a PDF (or its first `max_pages`), pages joined by newlines."""
+    return "\n".join(extract_pages(source, max_pages=max_pages, workers=workers)).strip()
+
+
+def extract_many(paths, workers: int = None):
+    """
+    Extract several PDFs at once, returning {path: text}. Cached files are
+    read back directly; the page ranges of all other files share one pool,
+    so a bundle of small documents still keeps every core busy. Files that
+    cannot be read map to "".
+    """
+    from PyPDF2 import PdfReader
+
+    workers = workers or PDF_WORKERS
+    results = {}
+    jobs = []
+    for path in paths:
+        digest = file_sha256(path)
+        if TEXT_CACHE_ENABLED and _cache_path(digest).exists():
+            results[path] = extract_text(path)
+            continue
+        try:
+            n = len(PdfReader(path).pages)
+        except Exception as e:
+            print(f"Failed to read PDF {path}: {e}")
+            results[path] = ""
+            continue
+        jobs.append((path, digest, _page_ranges(n, max(1, PAGES_PER_TASK))))
+
+    if workers <= 1:
+        futures = None
+    else:
+        pool = get_pool()
+        futures = {
+            (path, s): pool.submit(_extract_range, str(path), s, e)
+            for path, _, ranges in jobs for s, e in ranges
+        }
+
+    for path, digest, ranges in jobs:
+        try:
+            pages = []
+            for s, e in ranges:
+                if futures is None:
+                    pages.extend(_extract_range(str(path), s, e))
+                else:
+                    pages.extend(futures[(path, s)].result())
+        except Exception as e:
+            print(f"Failed to extract text from {path}: {e}")
+            results[path] = ""
+            continue
+        if TEXT_CACHE_ENABLED:
+            _write_cache(digest, pages)
+        results[path] = "\n".join(pages).strip()
+
+    _reader_cache.clear()
+    return {path: results[path] for path in paths}
+
+
+def iter_pdf_clauses(source, stats: dict = None, digest: str = None):
+    """
+    Yield clauses from a PDF as pages are read. If `stats` is given, its
+    "pages" entry tracks how many pages have been extracted so far.
+    """
+    def counted(pages):
+        for text in pages:
+            if stats is not None:
+                stats["pages"] = stats.get("pages", 0) + 1
+            yield text
+
+    yield from iter_clauses(counted(iter_pages(source, digest=digest)))
@@ -1,4 +1,13 @@
-from backend.prompts.shared import THINKING_INSTRUCTIONS, KENYAN_LAW_CONTEXT, OUTPUT_POLICY
+from backend.prompts.shared import (
+    THINKING_INSTRUCTIONS,
+    KENYAN_LAW_CONTEXT,
+    OUTPUT_POLICY,
+    static_prefix,
+    with_dynamic,
+)
+
+# Bump whenever SYSTEM_PROMPT or FEW_SHOT changes so cached analyses are invalidated.
+PROMPT_VERSION = "contract-analysis-v3"
 
 SYSTEM_PROMPT = f"""
 You are a Kenyan contract lawyer and junior legal analyst.
@@ -36,13 +45,20 @@ FEW_SHOT = [
     }
 ]
 
-def build_contract_analysis_messages(clause: str):
-    user_content = f"CLAUSE TO ANALYSE:\n{clause}"
+PREFIX = static_prefix(
+    PROMPT_VERSION,
+    {"role": "system", "content": SYSTEM_PROMPT},
+    *FEW_SHOT,
+)
 
-    messages = [
-        {"role": "system", "content": SYSTEM_PROMPT},
-        *FEW_SHOT,
-        {"role": "user", "content": user_content}
-    ]
-    return messages
 
+def build_contract_analysis_messages(clause: str, context: str = None):
+    """
+    Static prefix, then one user message with the retrieved memory context
+    (if any) and the clause last.
+    """
+    user_content = f"CLAUSE TO ANALYSE:\n{clause}"
+    if context and context.strip():
+        user_content = f"ADDITIONAL CONTEXT FROM MEMORY:\n{context}\n\n{user_content}"
+
+    return with_dynamic(PREFIX, user_content)
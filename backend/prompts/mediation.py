@@ -1,4 +1,13 @@
-from backend.prompts.shared import THINKING_INSTRUCTIONS, KENYAN_LAW_CONTEXT, OUTPUT_POLICY
+from backend.prompts.shared import (
+    THINKING_INSTRUCTIONS,
+    KENYAN_LAW_CONTEXT,
+    OUTPUT_POLICY,
+    static_prefix,
+    with_dynamic,
+)
+
+# Bump whenever SYSTEM_PROMPT or FEW_SHOT changes.
+PROMPT_VERSION = "mediation-v1"
 
 SYSTEM_PROMPT = f"""
 You are a neutral mediator using Kenyan ADR principles.
@@ -32,6 +41,12 @@ FEW_SHOT = [
     }
 ]
 
+PREFIX = static_prefix(
+    PROMPT_VERSION,
+    {"role": "system", "content": SYSTEM_PROMPT},
+    *FEW_SHOT,
+)
+
 def build_mediation_messages(party_a: str, party_b: str):
     user_text = f"""
 PARTY A:
@@ -40,8 +55,4 @@ PARTY A:
 PARTY B:
 {party_b}
 """
-    return [
-        {"role": "system", "content": SYSTEM_PROMPT},
-        *FEW_SHOT,
-        {"role": "user", "content": user_text}
-    ]
+    return with_dynamic(PREFIX, user_text)
@@ -1,4 +1,15 @@
-from backend.prompts.shared import THINKING_INSTRUCTIONS, KENYAN_LAW_CONTEXT, OUTPUT_POLICY
+from backend.prompts.shared import (
+    THINKING_INSTRUCTIONS,
+    KENYAN_LAW_CONTEXT,
+    OUTPUT_POLICY,
+    static_prefix,
+    with_dynamic,
+)
+
+# Bump the matching version whenever a system prompt or FEW_SHOT changes.
+PROMPT_VERSION = "negotiation-v1"
+TURN_PROMPT_VERSION = "negotiation-turn-v1"
+SUMMARY_PROMPT_VERSION = "negotiation-summary-v1"
 
 SYSTEM_PROMPT = f"""
 You are simulating a professional contract negotiation between two parties:
@@ -9,9 +20,10 @@ Party B = Counterparty
 Rules:
 - Use Kenyan professional negotiation practice.
 - Keep tone professional and realistic.
-- Each turn must clearly show "Party A" or "Party B".
-- Number turns: Turn 1, Turn 2, Turn 3...
-- After all turns, propose a revised clause AND justification.
+- Return the turns in order as "dialogue", each with its party ("A" or "B").
+- After all turns, propose a mutually beneficial revised clause, the
+  tradeoffs each side made, a win-win justification and the Kenyan legal
+  references relied on.
 
 {KENYAN_LAW_CONTEXT}
 {THINKING_INSTRUCTIONS}
@@ -26,18 +38,27 @@ FEW_SHOT = [
     {
         "role": "assistant",
         "content": """{
-  "negotiation": [
-    "Turn 1 - Party A: We prefer 3 days for early liquidity.",
-    "Turn 2 - Party B: Our cash flow cycles require 30 days.",
-    "Turn 3 - Party A: We can agree to 14 days as a midpoint."
+  "dialogue": [
+    {"party": "A", "text": "We prefer 3 days for early liquidity."},
+    {"party": "B", "text": "Our cash flow cycles require 30 days."},
+    {"party": "A", "text": "We can agree to 14 days as a midpoint."}
   ],
-  "revised_clause": "Payment shall be made within fourteen (14) days from date of invoice.",
-  "justification": "14 days balances both liquidity needs and operational cash flow."
+  "mutually_beneficial_revision": "Payment shall be made within fourteen (14) days from date of invoice.",
+  "tradeoffs": ["Party A accepts a longer payment period", "Party B commits to a fixed 14-day cycle"],
+  "win_win_justification": "14 days balances both liquidity needs and operational cash flow.",
+  "legal_refs": ["Law of Contract Act (Cap. 23)"]
 }"""
     }
 ]
 
 
+PREFIX = static_prefix(
+    PROMPT_VERSION,
+    {"role": "system", "content": SYSTEM_PROMPT},
+    *FEW_SHOT,
+)
+
+
 def build_negotiation_messages(clause: str, counterparty: str, turns: int):
     user_text = f"""
 CLAUSE:
@@ -50,8 +71,98 @@ TURNS:
 {turns}
 """
 
-    return [
-        {"role": "system", "content": SYSTEM_PROMPT},
-        *FEW_SHOT,
-        {"role": "user", "content": user_text}
-    ]
+    return with_dynamic(PREFIX, user_text)
+
+
+# ---------------------------------------------------------------------------
+# Turn-by-turn negotiation (backend.negotiation.iter_negotiation): one call
+# per party turn, then one call summarising the finished transcript.
+# ---------------------------------------------------------------------------
+
+PARTY_ROLES = {
+    "A": "Party A (the User), who proposed the clause",
+    "B": "Party B (the Counterparty), whose position is given",
+}
+
+TURN_SYSTEM_PROMPT = f"""
+You are one side of a professional contract negotiation under Kenyan law.
+You will be told which party you speak for, the clause, the counterparty's
+position and the transcript so far. Write only your party's next turn.
+
+Rules:
+- Use Kenyan professional negotiation practice; keep the turn to a few
+  sentences, professional and realistic.
+- "text" is what your party says.
+- "proposal" is the full clause wording your party now proposes.
+- "accepts" is true only if your party accepts the other party's latest
+  proposal exactly as worded; your "proposal" must then repeat it.
+- Notes from the user in the transcript are instructions both parties
+  must take into account from that point on.
+
+{KENYAN_LAW_CONTEXT}
+{OUTPUT_POLICY}
+"""
+
+SUMMARY_SYSTEM_PROMPT = f"""
+You are a neutral Kenyan contracts lawyer reviewing a finished negotiation
+transcript. Propose the mutually beneficial revised clause the parties
+reached (or the fairest one if they did not converge), the tradeoffs each
+side made, a win-win justification and the Kenyan legal references relied on.
+
+{KENYAN_LAW_CONTEXT}
+{OUTPUT_POLICY}
+"""
+
+TURN_PREFIX = static_prefix(
+    TURN_PROMPT_VERSION, {"role": "system", "content": TURN_SYSTEM_PROMPT}
+)
+SUMMARY_PREFIX = static_prefix(
+    SUMMARY_PROMPT_VERSION, {"role": "system", "content": SUMMARY_SYSTEM_PROMPT}
+)
+
+
+def format_transcript(transcript) -> str:
+    lines = []
+    for turn in transcript:
+        if turn["party"] == "user":
+            lines.append(f"USER NOTE: {turn['text']}")
+        else:
+            lines.append(f"PARTY {turn['party']}: {turn['text']}")
+            if turn.get("proposal"):
+                lines.append(f"  (proposes: {turn['proposal']})")
+    return "\n".join(lines) or "(no turns yet)"
+
+
+def build_turn_messages(clause: str, counterparty: str, party: str, transcript):
+    # The transcript only grows and the speaking party comes after it, so
+    # each turn's prompt also starts with most of the previous turn's.
+    user_text = f"""
+CLAUSE:
+{clause}
+
+COUNTERPARTY POSITION:
+{counterparty}
+
+TRANSCRIPT:
+{format_transcript(transcript)}
+
+YOU SPEAK FOR:
+{PARTY_ROLES[party]}
+"""
+
+    return with_dynamic(TURN_PREFIX, user_text)
+
+
+def build_summary_messages(clause: str, counterparty: str, transcript):
+    user_text = f"""
+CLAUSE:
+{clause}
+
+COUNTERPARTY POSITION:
+{counterparty}
+
+TRANSCRIPT:
+{format_transcript(transcript)}
+"""
+
+    return with_dynamic(SUMMARY_PREFIX, user_text)
@@ -1,3 +1,6 @@
+import json
+import hashlib
+
 THINKING_INSTRUCTIONS = """
 You may think step-by-step internally.
 Do NOT reveal chain-of-thought to the user.
@@ -13,7 +16,40 @@ You must interpret all clauses using Kenyan law, including:
 """
 
 OUTPUT_POLICY = """
-Always return output in valid JSON. Do not add commentary outside JSON.
-If you cannot answer, return JSON with an "error" field.
+Always return output as valid JSON matching the required response schema.
+Do not add commentary outside JSON.
 """
 
+
+# ---------------------------------------------------------------------------
+# Static prompt prefixes. Providers cache the longest previously seen prompt
+# prefix (OpenAI: from 1024 tokens, in 128-token steps), so every builder
+# sends its system prompt and few-shot examples first, byte-identical on
+# every call, and puts everything that varies in one final user message.
+# ---------------------------------------------------------------------------
+
+# Prompts below this many tokens are never cached by the provider.
+CACHEABLE_PREFIX_TOKENS = 1024
+
+PREFIXES = {}
+
+
+def static_prefix(version: str, *messages):
+    """
+    Register the fixed head of a prompt under its version and return it as
+    a tuple, so a builder cannot append to it by accident.
+    """
+    prefix = tuple(messages)
+    text = json.dumps(prefix, ensure_ascii=False, sort_keys=True)
+    approx_tokens = len(text) // 4
+    PREFIXES[version] = {
+        "sha256": hashlib.sha256(text.encode("utf-8")).hexdigest()[:16],
+        "approx_tokens": approx_tokens,
+        "cacheable": approx_tokens >= CACHEABLE_PREFIX_TOKENS,
+    }
+    return prefix
+
+
+def with_dynamic(prefix, content: str):
+    """Messages for one call: the static prefix, then the per-call content last."""
+    return [*prefix, {"role": "user", "content": content}]
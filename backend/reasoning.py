@@ -1,36 +1,36 @@
-import os, json, re
-from openai import OpenAI
-from backend.prompts.contract_analysis import build_contract_analysis_messages
-from backend.utils.embedding_manager import search_memory
-from dotenv import load_dotenv
+from backend.llm_client import chat_completion
+from backend.prompts.contract_analysis import PROMPT_VERSION, build_contract_analysis_messages
+from backend.retrieval import retrieve
+from backend.schemas import ClauseAnalysis, response_format
 
-load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+ANALYSIS_MODEL = "gpt-4o-mini"
+ANALYSIS_TEMPERATURE = 0.2
 
-def reason_over_clause(clause: str):
+RETRIEVAL_K = 4
+
+async def reason_over_clause(clause: str, retrieved=None):
     """
     Performs contract clause analysis using:
-    - Chroma memory retrieval
-    - New system + few-shot + CoT-suppressed prompts
-    - JSON output structure from prompt template
+    - Chroma + FAISS memory retrieval (skipped when `retrieved` is
+      pre-fetched, e.g. by a batched search over the whole contract)
+    - New system + few-shot + CoT-suppressed prompts, sent as a static
+      (provider-cacheable) prefix with the memory context and clause last
+    - JSON output constrained to the ClauseAnalysis schema
     """
 
-    retrieved = search_memory(clause, k=4)
+    if retrieved is None:
+        retrieved = await retrieve(clause, k=RETRIEVAL_K)
     context = "\n\n---\n\n".join([r.get("text", "") for r in retrieved])
 
-    messages = build_contract_analysis_messages(clause)
-
-    if context.strip():
-        messages.append({
-            "role": "user",
-            "content": f"\nADDITIONAL CONTEXT FROM MEMORY:\n{context}"
-        })
+    messages = build_contract_analysis_messages(clause, context=context)
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
+    response = await chat_completion(
+        model=ANALYSIS_MODEL,
         messages=messages,
-        temperature=0.2,
+        temperature=ANALYSIS_TEMPERATURE,
+        prompt_version=PROMPT_VERSION,
         max_tokens=1500,
+        response_format=response_format(ClauseAnalysis),
     )
 
     result_text = response.choices[0].message.content
@@ -0,0 +1,212 @@
+"""
+retrieval.py
+------------
+Unified retrieval over the Chroma feedback memory, the FAISS document
+corpus and the BM25 lexical index.
+
+All stores are queried concurrently under a per-request latency budget;
+whatever arrives in time is used, and a slow or failing store only drops its
+own results. Dense distances are converted to a common similarity in [0, 1]
+(both stores hold unit-normalized embeddings, so squared L2 distance d maps
+to cosine similarity 1 - d / 2).
+
+Results are de-duplicated by normalized text and fused either with
+reciprocal rank fusion (RETRIEVAL_FUSION=rrf, the default; robust to the
+incomparable BM25 and cosine scales) or by best similarity
+(RETRIEVAL_FUSION=score). With RETRIEVAL_LEXICAL_PREFILTER=1, dense hits
+are dropped when the query matches lexical documents and they are not among
+them, so queries naming a statute stay on documents that mention it.
+"""
+
+import os
+import asyncio
+import hashlib
+import logging
+
+from database.models import normalize_text
+
+RETRIEVAL_BUDGET_MS = float(os.getenv("RETRIEVAL_BUDGET_MS", "1500"))
+RETRIEVAL_STORES = [
+    s.strip() for s in os.getenv("RETRIEVAL_STORES", "chroma,faiss,bm25").split(",") if s.strip()
+]
+RETRIEVAL_FUSION = os.getenv("RETRIEVAL_FUSION", "rrf")
+RRF_K = int(os.getenv("RETRIEVAL_RRF_K", "60"))
+LEXICAL_PREFILTER = os.getenv("RETRIEVAL_LEXICAL_PREFILTER", "0") == "1"
+
+logger = logging.getLogger(__name__)
+
+DENSE_STORES = ("chroma", "faiss")
+
+STATS = {
+    store: {"ok": 0, "timeout": 0, "error": 0}
+    for store in ("chroma", "faiss", "bm25")
+}
+
+
+def _similarity(distance, space: str = "l2") -> float:
+    if distance is None:
+        return 0.0
+    if space == "l2":
+        sim = 1.0 - float(distance) / 2.0
+    else:
+        # Chroma reports cosine and inner-product distances as 1 - similarity.
+        sim = 1.0 - float(distance)
+    return max(0.0, min(1.0, sim))
+
+
+def _search_chroma(queries, k):
+    from backend.utils import embedding_manager
+
+    space = embedding_manager.distance_space()
+    return [
+        [
+            {
+                "text": hit["text"],
+                "metadata": hit.get("metadata") or {},
+                "score": _similarity(hit.get("distance"), space),
+                "store": "chroma",
+            }
+            for hit in hits
+        ]
+        for hits in embedding_manager.search_memory_many(queries, k=k)
+    ]
+
+
+def _search_faiss(queries, k):
+    from backend import memory_manager
+
+    return [
+        [
+            {
+                "text": hit["text"],
+                "metadata": hit.get("meta") or {},
+                "score": _similarity(hit.get("score"), "l2"),
+                "store": "faiss",
+            }
+            for hit in hits
+        ]
+        for hits in memory_manager.search_memory_many(queries, k=k)
+    ]
+
+
+def _search_bm25(queries, k):
+    from backend.lexical_index import search_lexical_many
+
+    # BM25 scores are unbounded; only their rank is used when fusing.
+    return [
+        [{**hit, "store": "bm25"} for hit in hits]
+        for hits in search_lexical_many(queries, k=k)
+    ]
+
+
+SEARCHERS = {"chroma": _search_chroma, "faiss": _search_faiss, "bm25": _search_bm25}
+
+
+def _text_key(text: str) -> str:
+    return hashlib.sha1(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+def merge_results(result_lists, k, fusion: str = None):
+    """
+    Merge per-store hit lists: de-duplicate by normalized text and rank by
+    reciprocal rank fusion (sum of 1 / (RRF_K + rank) over stores) or by the
+    best per-store score. Each hit keeps its best dense "score" and lists the
+    stores that returned it.
+    """
+    fusion = fusion or RETRIEVAL_FUSION
+    merged = {}
+    for hits in result_lists:
+        for rank, hit in enumerate(hits, start=1):
+            key = _text_key(hit["text"])
+            best = merged.get(key)
+            if best is None:
+                best = merged[key] = {**hit, "stores": [hit["store"]], "rrf": 0.0}
+            elif hit["store"] not in best["stores"]:
+                best["stores"].append(hit["store"])
+            best["rrf"] += 1.0 / (RRF_K + rank)
+
+            # Raw BM25 scores are not similarities; prefer a dense score when one exists.
+            replace = hit["store"] != "bm25" and (
+                best["store"] == "bm25" or hit["score"] > best["score"]
+            )
+            if replace:
+                best.update(text=hit["text"], metadata=hit["metadata"],
+                            score=hit["score"], store=hit["store"])
+
+    if fusion == "score":
+        ranked = sorted(merged.values(), key=lambda h: (h["store"] != "bm25", h["score"]),
+                        reverse=True)
+    else:
+        ranked = sorted(merged.values(), key=lambda h: h["rrf"], reverse=True)
+    return ranked[:k]
+
+
+def lexical_prefilter(result_lists, lexical_hits):
+    """Drop dense hits absent from a non-empty set of lexical matches."""
+    if not lexical_hits:
+        return result_lists
+    allowed = {_text_key(hit["text"]) for hit in lexical_hits}
+    return [
+        [hit for hit in hits if hit["store"] == "bm25" or _text_key(hit["text"]) in allowed]
+        for hits in result_lists
+    ]
+
+
+async def retrieve_many(queries, k: int = 4, budget_ms: float = None, stores=None):
+    """
+    Retrieve top-k context for each query from all configured stores at once.
+    Returns one merged result list per query, in query order.
+    """
+    queries = list(queries)
+    if not queries:
+        return []
+
+    stores = [s for s in (stores or RETRIEVAL_STORES) if s in SEARCHERS]
+    budget = (budget_ms if budget_ms is not None else RETRIEVAL_BUDGET_MS) / 1000.0
+
+    tasks = {
+        asyncio.ensure_future(asyncio.to_thread(SEARCHERS[s], queries, k)): s
+        for s in stores
+    }
+    if not tasks:
+        return [[] for _ in queries]
+
+    done, pending = await asyncio.wait(tasks, timeout=budget)
+
+    per_store = {}
+    for task in done:
+        store = tasks[task]
+        try:
+            per_store[store] = task.result()
+            STATS[store]["ok"] += 1
+        except Exception as e:
+            STATS[store]["error"] += 1
+            logger.warning("Retrieval from %s failed: %s", store, e)
+
+    for task in pending:
+        # The worker thread cannot be interrupted; its result is simply dropped.
+        STATS[tasks[task]]["timeout"] += 1
+        task.add_done_callback(lambda t: t.exception() if not t.cancelled() else None)
+
+    merged = []
+    for i in range(len(queries)):
+        result_lists = [results[i] for results in per_store.values()]
+        if LEXICAL_PREFILTER and "bm25" in per_store:
+            result_lists = lexical_prefilter(result_lists, per_store["bm25"][i])
+        merged.append(merge_results(result_lists, k))
+    return merged
+
+
+async def retrieve(query: str, k: int = 4, budget_ms: float = None):
+    """Retrieve merged top-k context for a single query."""
+    return (await retrieve_many([query], k=k, budget_ms=budget_ms))[0]
+
+
+def retrieval_stats():
+    return {
+        "budget_ms": RETRIEVAL_BUDGET_MS,
+        "stores": RETRIEVAL_STORES,
+        "fusion": RETRIEVAL_FUSION,
+        "lexical_prefilter": LEXICAL_PREFILTER,
+        **{store: dict(counts) for store, counts in STATS.items()},
+    }
@@ -1,57 +1,110 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+import os
+import time
+import asyncio
+import logging
+from fastapi import APIRouter, File, Form, UploadFile
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 import json
-import re
-from typing import Any
+from typing import List, Literal, Optional
 
 from backend.parser import split_into_clauses
-from backend.reasoning import reason_over_clause
-from backend.negotiation import negotiate
+from backend.analysis import (
+    analyze_clauses,
+    iter_clause_analyses,
+    iter_streamed_clause_analyses,
+    MAX_CONCURRENCY,
+)
+from backend.pdf_extract import iter_pdf_clauses, spool_upload
+from backend.versioning import RevisionPlan, analyze_revision, iter_revision_analyses
+from backend.negotiation import (
+    MAX_CONCURRENCY as NEGOTIATE_MAX_CONCURRENCY,
+    iter_negotiation,
+    iter_negotiations,
+    negotiate,
+    negotiate_many,
+)
 from backend.mediation import mediate
-from backend.feedback import save_feedback
+from backend.feedback import save_feedback, feedback_stats
+from backend.llm_cache import get_response_cache
+from backend.utils.embedding_cache import get_embedding_cache
+from backend.retrieval import retrieval_stats
+from backend.dedup import dedup_stats
+from backend.json_repair import json_repair_stats
+from backend.llm_client import prompt_cache_stats
+from backend.prompts.shared import PREFIXES
+from database.models import (
+    ContractWriter,
+    contract_analyses,
+    find_analyses,
+    recent_contracts,
+    recent_negotiations,
+    save_contract_analysis,
+    save_mediation,
+    save_negotiation,
+)
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
-def clean_llm_json(text: str) -> str:
-    """
-    Remove ```json ... ``` wrappers and return raw JSON string.
-    """
-    if not isinstance(text, str):
-        return str(text)
-    t = text.strip()
-    t = re.sub(r"^```json\s*", "", t, flags=re.IGNORECASE)
-    t = t.replace("```", "")
-    return t.strip()
+# Largest number of clauses accepted by one /negotiate/batch request.
+NEGOTIATE_BATCH_MAX_ITEMS = int(os.getenv("NEGOTIATE_BATCH_MAX_ITEMS", "100"))
 
 
-def try_parse_json_maybe(text_or_obj: Any):
+async def _store_history(fn, *args, **kwargs):
     """
-    Try to convert returned LLM value into a Python object.
-    Returns (parsed_obj, raw_text).
-    parsed_obj: Python object if JSON parsed, else None.
-    raw_text: string representation to return/display.
+    Run a blocking database write in a worker thread. Past results are a
+    convenience; a storage error must not fail the request.
     """
-    if isinstance(text_or_obj, (dict, list)):
-        return text_or_obj, json.dumps(text_or_obj)
-
-    raw = "" if text_or_obj is None else str(text_or_obj)
+    try:
+        return await asyncio.to_thread(fn, *args, **kwargs)
+    except Exception as e:
+        logger.warning("Could not store %s: %s", getattr(fn, "__name__", fn), e)
+        return None
 
-    cleaned = clean_llm_json(raw)
 
+def _abort_unfinished(writer):
+    """
+    Drop a streamed upload's history if the stream ended early (client
+    disconnect, extraction error). Runs inline: it may be called from a
+    cancelled task, where awaiting a worker thread is not possible, and
+    unless a batch was already flushed it does no I/O at all.
+    """
+    if writer is None or writer.closed:
+        return
     try:
-        parsed = json.loads(cleaned)
-        return parsed, cleaned
-    except Exception:
-        return None, cleaned
+        writer.abort()
+    except Exception as e:
+        logger.warning("Could not drop unfinished upload: %s", e)
 
 
 class Contract(BaseModel):
     text: str
+    max_concurrency: Optional[int] = None
+    # Set to re-analyse only the clauses that changed since the last upload
+    # of the same contract; results for unchanged clauses are reused.
+    contract_id: Optional[str] = None
 
 class Negotiate(BaseModel):
     clause: str
     position: str
 
+class TranscriptTurn(BaseModel):
+    party: Literal["A", "B", "user"]
+    text: str
+    proposal: Optional[str] = None
+    accepts: bool = False
+
+class NegotiateStream(Negotiate):
+    max_turns: int = 6
+    # Transcript returned by a previous stream's "done" event, to resume it.
+    history: List[TranscriptTurn] = []
+    interjection: Optional[str] = None
+
+class NegotiateBatch(BaseModel):
+    items: List[Negotiate] = Field(..., min_length=1, max_length=NEGOTIATE_BATCH_MAX_ITEMS)
+    max_concurrency: Optional[int] = None
+
 class Mediate(BaseModel):
     a: str
     b: str
@@ -63,62 +116,305 @@ class Feedback(BaseModel):
 
 
 @router.post("/analyze")
-def analyze(req: Contract):
+async def analyze(req: Contract):
+    clauses = split_into_clauses(req.text)
+
+    limit = min(req.max_concurrency or MAX_CONCURRENCY, MAX_CONCURRENCY)
+    revision = {}
+    if req.contract_id:
+        output, revision = await analyze_revision(req.contract_id, clauses, max_concurrency=limit)
+    else:
+        output = await analyze_clauses(clauses, max_concurrency=limit)
+        await _store_history(save_contract_analysis, output)
+    failed = sum(1 for entry in output if entry.get("error"))
+    deduplicated = sum(1 for entry in output if "duplicate_of" in entry)
+
+    return {"clauses": output, "failed": failed, "deduplicated": deduplicated, **revision}
+
+
+@router.post("/analyze/stream")
+async def analyze_stream(req: Contract):
+    """
+    Streaming variant of /analyze. Emits NDJSON events:
+    {"type": "start", "total": n}, then one {"type": "clause", "index": i, ...}
+    per clause as soon as it is analysed, then {"type": "done", ...}.
+    With a contract_id, reused clauses come first and "start" carries the
+    diff summary; "done" carries the stored version number.
+    """
     clauses = split_into_clauses(req.text)
-    output = []
+    limit = min(req.max_concurrency or MAX_CONCURRENCY, MAX_CONCURRENCY)
+    plan = await asyncio.to_thread(RevisionPlan, req.contract_id, clauses) if req.contract_id else None
+
+    async def events():
+        revision = plan.summary() if plan else {}
+        yield json.dumps({"type": "start", "total": len(clauses), **revision}) + "\n"
+        failed = deduplicated = 0
+        writer = None
+        if plan:
+            results = iter_revision_analyses(plan, max_concurrency=limit)
+        else:
+            results = iter_clause_analyses(clauses, max_concurrency=limit)
+            writer = await _store_history(ContractWriter)
+        try:
+            async for index, entry in results:
+                if entry.get("error"):
+                    failed += 1
+                if "duplicate_of" in entry:
+                    deduplicated += 1
+                if writer:
+                    await _store_history(writer.add, index, entry)
+                yield json.dumps({"type": "clause", "index": index, **entry}) + "\n"
+            if writer:
+                await _store_history(writer.close)
+        finally:
+            _abort_unfinished(writer)
+        version = {}
+        if plan:
+            version = {"contract_id": plan.contract_id, "version": await asyncio.to_thread(plan.commit)}
+        yield json.dumps({
+            "type": "done", "total": len(clauses), "failed": failed,
+            "deduplicated": deduplicated, **version,
+        }) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
 
-    for c in clauses:
-        raw_text, sources = reason_over_clause(c)
 
-        cleaned = clean_llm_json(raw_text)
+@router.post("/analyze/pdf")
+async def analyze_pdf(
+    file: UploadFile = File(...),
+    max_concurrency: Optional[int] = Form(None),
+    contract_id: Optional[str] = Form(None),
+):
+    """
+    Upload a contract PDF and stream its clause analyses as NDJSON. Pages
+    are extracted lazily and clauses are analysed as soon as they are split
+    off, so neither the full text nor the full clause list is ever held in
+    memory. Events: {"type": "start", "filename"}, {"type": "clause",
+    "index": i, ...} in completion order, then {"type": "done", "total",
+    "failed", "deduplicated", "pages"}. With a contract_id the clauses are
+    collected first so the revision can be diffed against the stored one;
+    a {"type": "revision", "total", ...diff summary} event then precedes
+    the clauses and "done" carries the stored version number.
+    """
+    limit = min(max_concurrency or MAX_CONCURRENCY, MAX_CONCURRENCY)
+    stats = {"pages": 0}
+    # FastAPI closes the upload once this handler returns, before the body
+    # streams, so extraction reads from a private on-disk copy instead. The
+    # copy is hashed on the way, which keys the extracted-text cache.
+    path, digest = await asyncio.to_thread(spool_upload, file.file)
+    extractor = iter_pdf_clauses(path, stats, digest=digest)
 
+    async def clauses():
+        while True:
+            clause = await asyncio.to_thread(next, extractor, None)
+            if clause is None:
+                return
+            yield clause
+
+    revision = {}
+
+    async def results():
+        if not contract_id:
+            writer = await _store_history(ContractWriter, source="pdf", filename=file.filename)
+            try:
+                async for index, entry in iter_streamed_clause_analyses(clauses(), max_concurrency=limit):
+                    if writer:
+                        await _store_history(writer.add, index, entry)
+                    yield index, entry
+                if writer:
+                    await _store_history(writer.close)
+            finally:
+                _abort_unfinished(writer)
+            return
+        plan = await asyncio.to_thread(RevisionPlan, contract_id, [c async for c in clauses()])
+        yield None, {"type": "revision", "total": len(plan.clauses), **plan.summary()}
+        async for item in iter_revision_analyses(plan, max_concurrency=limit):
+            yield item
+        version = await asyncio.to_thread(plan.commit, source="pdf", filename=file.filename)
+        revision.update(contract_id=contract_id, version=version)
+
+    async def events():
+        yield json.dumps({"type": "start", "filename": file.filename}) + "\n"
+        total = failed = deduplicated = 0
         try:
-            reasoning = json.loads(cleaned)
+            async for index, entry in results():
+                if index is None:
+                    yield json.dumps(entry) + "\n"
+                    continue
+                total += 1
+                if entry.get("error"):
+                    failed += 1
+                if "duplicate_of" in entry:
+                    deduplicated += 1
+                yield json.dumps({"type": "clause", "index": index, **entry}) + "\n"
         except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"analysis failed: could not parse cleaned LLM JSON: {str(e)}\nCLEANED LLM OUTPUT:\n{cleaned[:4000]}"
-            )
-
-        output.append({
-            "clause": c,
-            "analysis": reasoning,
-            "sources": sources
-        })
+            yield json.dumps({"type": "error", "error": f"PDF extraction failed: {e}"}) + "\n"
+        finally:
+            try:
+                extractor.close()
+            except ValueError:
+                # A worker thread is still inside next(); it finishes on its own.
+                pass
+            os.remove(path)
+        yield json.dumps({
+            "type": "done", "total": total, "failed": failed,
+            "deduplicated": deduplicated, "pages": stats["pages"], **revision,
+        }) + "\n"
 
-    return {"clauses": output}
+    return StreamingResponse(events(), media_type="application/x-ndjson")
 
 
 @router.post("/negotiate")
-def negotiate_route(req: Negotiate):
-    raw = negotiate(req.clause, req.position)
+async def negotiate_route(req: Negotiate):
+    raw = await negotiate(req.clause, req.position)
+    await _store_history(save_negotiation, req.clause, req.position, raw)
 
-    if isinstance(raw, dict):
-        return {"result": raw}
+    return {"result": raw}
 
-    try:
-        parsed = json.loads(raw)
-        return {"result": parsed}
-    except:
-        pass
 
-    
-    return {"result": str(raw)}
+def _batch_timing(seconds, started):
+    """Overall timing of a batch: wall time vs. the sum of per-clause times."""
+    return {
+        "seconds": round(time.perf_counter() - started, 3),
+        "sequential_seconds": round(sum(seconds), 3),
+        "max_item_seconds": max(seconds, default=0.0),
+    }
 
 
-@router.post("/mediate")
-def mediate_route(req: Mediate):
-    raw = mediate(req.a, req.b)
+def _batch_pairs(req: NegotiateBatch):
+    """The request's (clause, position) pairs and its capped concurrency."""
+    limit = min(req.max_concurrency or NEGOTIATE_MAX_CONCURRENCY, NEGOTIATE_MAX_CONCURRENCY)
+    return [(item.clause, item.position) for item in req.items], limit
 
-    parsed, raw_text = try_parse_json_maybe(raw)
 
-    if parsed is not None:
-        return {"result": parsed}
-    else:
-        return {"result": raw_text}
+def _batch_item(clause, position, result, seconds):
+    return {"clause": clause, "position": position, "result": result, "seconds": seconds}
+
+
+@router.post("/negotiate/batch")
+async def negotiate_batch(req: NegotiateBatch):
+    """
+    Negotiate many clauses in one request with bounded concurrency. Each
+    item's result (or error) is isolated from the others; "items" are in
+    request order and "timing" compares wall time with the sequential sum.
+    """
+    started = time.perf_counter()
+    pairs, limit = _batch_pairs(req)
+    results = await negotiate_many(pairs, max_concurrency=limit)
+    items = []
+    for index, ((clause, position), (result, seconds)) in enumerate(zip(pairs, results)):
+        await _store_history(save_negotiation, clause, position, result)
+        items.append({"index": index, **_batch_item(clause, position, result, seconds)})
+    failed = sum(1 for item in items if item["result"].get("error"))
+    return {
+        "items": items,
+        "total": len(items),
+        "failed": failed,
+        "timing": _batch_timing([item["seconds"] for item in items], started),
+    }
+
+
+@router.post("/negotiate/batch/stream")
+async def negotiate_batch_stream(req: NegotiateBatch):
+    """
+    Streaming variant of /negotiate/batch. Emits NDJSON events:
+    {"type": "start", "total": n}, one {"type": "item", "index": i, ...} per
+    clause as soon as it is negotiated, then {"type": "done", "total",
+    "failed", "timing"}.
+    """
+    started = time.perf_counter()
+    pairs, limit = _batch_pairs(req)
+
+    async def events():
+        yield json.dumps({"type": "start", "total": len(req.items)}) + "\n"
+        seconds = []
+        failed = 0
+        async for index, result, took in iter_negotiations(pairs, max_concurrency=limit):
+            clause, position = pairs[index]
+            await _store_history(save_negotiation, clause, position, result)
+            seconds.append(took)
+            if result.get("error"):
+                failed += 1
+            item = _batch_item(clause, position, result, took)
+            yield json.dumps({"type": "item", "index": index, **item}) + "\n"
+        yield json.dumps({
+            "type": "done", "total": len(req.items), "failed": failed,
+            "timing": _batch_timing(seconds, started),
+        }) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+@router.post("/negotiate/stream")
+async def negotiate_stream(req: NegotiateStream):
+    """
+    Streaming, turn-by-turn variant of /negotiate. Emits the NDJSON events
+    of backend.negotiation.iter_negotiation: text deltas and a "turn" event
+    per party turn, stopping early once the parties converge, then "done"
+    with the full transcript and the NegotiationResult. Post that
+    transcript back as `history` with an `interjection` to continue.
+    """
+    history = [turn.model_dump(exclude_none=True) for turn in req.history]
+
+    async def events():
+        async for event in iter_negotiation(
+            req.clause,
+            req.position,
+            max_turns=req.max_turns,
+            history=history,
+            interjection=req.interjection,
+        ):
+            if event["type"] == "done":
+                await _store_history(save_negotiation, req.clause, req.position, event["result"])
+            yield json.dumps(event) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+@router.post("/mediate")
+async def mediate_route(req: Mediate):
+    raw = await mediate(req.a, req.b)
+    await _store_history(save_mediation, req.a, req.b, raw)
+
+    return {"result": raw}
 
 
 @router.post("/feedback")
 def feedback_route(req: Feedback):
     save_feedback(req.username, req.rating, req.comments)
     return {"status": "ok", "msg": "Feedback stored + added to memory"}
+
+
+@router.get("/analyses")
+def analyses_route(limit: int = 20, contract_id: Optional[str] = None, clause: Optional[str] = None):
+    """
+    Past analysed uploads, newest first (optionally the versions of one
+    contract). With `clause`, the past successful analyses of that clause.
+    """
+    if clause:
+        return {"analyses": find_analyses(clause, limit=min(limit, 200))}
+    return {"contracts": recent_contracts(limit=min(limit, 200), contract_id=contract_id)}
+
+
+@router.get("/analyses/{contract_pk}")
+def analysis_detail_route(contract_pk: int):
+    return {"clauses": contract_analyses(contract_pk)}
+
+
+@router.get("/negotiations")
+def negotiations_route(limit: int = 20, clause: Optional[str] = None):
+    """Past negotiations, newest first (optionally of one clause)."""
+    return {"negotiations": recent_negotiations(limit=min(limit, 200), clause=clause)}
+
+
+@router.get("/metrics")
+def metrics_route():
+    return {
+        "llm_cache": get_response_cache().stats(),
+        "embedding_cache": get_embedding_cache().stats(),
+        "retrieval": retrieval_stats(),
+        "dedup": dedup_stats(),
+        "feedback": feedback_stats(),
+        "json_repair": json_repair_stats(),
+        "prompt_cache": {"prefixes": PREFIXES, "usage": prompt_cache_stats()},
+    }
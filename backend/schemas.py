@@ -0,0 +1,107 @@
+"""
+schemas.py
+----------
+Response models for every LLM task (clause analysis, negotiation,
+turn-by-turn negotiation, mediation). The same model drives both ends of a call:
+
+- `response_format` turns it into an OpenAI JSON-schema response format,
+  so the model is constrained to emit exactly these fields
+- `validate_output` checks the reply once at the boundary and returns a
+  plain dict; nothing downstream (routes, UI) has to guess at key names
+
+Models are `extra="forbid"` with every field required, which is what the
+API's strict schema mode demands.
+"""
+
+import os
+from typing import List, Literal, Type
+
+from pydantic import BaseModel, ConfigDict, ValidationError
+
+from backend.json_repair import parse_json
+
+# Some proxies and older models reject response_format=json_schema; set
+# to 0 to fall back to prompt-only JSON (still validated on return).
+STRUCTURED_OUTPUT = os.getenv("LLM_STRUCTURED_OUTPUT", "1") not in ("0", "false", "False")
+
+
+class _Strict(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+
+class ClauseAnalysis(_Strict):
+    clause_summary: str
+    issues: List[str]
+    compliance_notes: List[str]
+    suggested_revision: str
+
+
+class NegotiationTurn(_Strict):
+    party: Literal["A", "B"]
+    text: str
+
+
+class NegotiationResult(_Strict):
+    dialogue: List[NegotiationTurn]
+    mutually_beneficial_revision: str
+    tradeoffs: List[str]
+    win_win_justification: str
+    legal_refs: List[str]
+
+
+class NegotiationMove(_Strict):
+    # "text" comes first so streamed replies expose it before the rest.
+    text: str
+    proposal: str
+    accepts: bool
+
+
+class NegotiationSummary(_Strict):
+    mutually_beneficial_revision: str
+    tradeoffs: List[str]
+    win_win_justification: str
+    legal_refs: List[str]
+
+
+class MediationResult(_Strict):
+    neutral_summary: str
+    interests_party_a: List[str]
+    interests_party_b: List[str]
+    evaluation: str
+    proposed_compromise: str
+
+
+class OutputValidationError(ValueError):
+    """The LLM reply could not be parsed into the task's response model."""
+
+
+def response_format(model: Type[BaseModel]):
+    """OpenAI `response_format` constraining the reply to `model`'s schema."""
+    if not STRUCTURED_OUTPUT:
+        return {"type": "json_object"}
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": model.__name__,
+            "strict": True,
+            "schema": model.model_json_schema(),
+        },
+    }
+
+
+def validate_output(model: Type[BaseModel], text) -> dict:
+    """
+    Parse and validate an LLM reply against `model`; returns the validated
+    dict or raises OutputValidationError. Schema-constrained replies are
+    plain JSON; local repair only matters when STRUCTURED_OUTPUT is off.
+    """
+    obj = parse_json(text)
+    if obj is None:
+        raise OutputValidationError("reply is not JSON")
+    try:
+        return model.model_validate(obj).model_dump()
+    except ValidationError as e:
+        raise OutputValidationError(
+            f"reply does not match {model.__name__}: {e.error_count()} error(s), "
+            f"first: {e.errors()[0]['loc']} {e.errors()[0]['msg']}"
+        ) from None
@@ -0,0 +1,255 @@
+"""
+segmenter.py
+------------
+Single-pass clause segmentation shared by the API and the Streamlit UI.
+
+One precompiled, line-anchored pattern recognises every clause boundary:
+
+- numbered sections and nested numbering: "1.", "1)", "1.1", "1.1.a"
+- enumerated items: "(a)", "a)", "(1)", "(i)", "(iv)"
+- short title lines ending in a colon: "Termination:", "Governing Law:"
+
+`segment` makes one linear scan with `finditer` and returns `ClauseSpan`
+offsets into the original text rather than copied strings; each span
+carries its full hierarchical label (e.g. "4.2(a)(iii)") and depth.
+Numbering markers are excluded from the span, title lines are kept (they
+are part of the clause's meaning). `ClauseStream` applies the same scan
+incrementally to text arriving in chunks (e.g. PDF pages).
+"""
+
+import os
+import re
+from typing import NamedTuple, Optional
+
+# A clause must be longer than this (after trimming) to be kept.
+MIN_CLAUSE_CHARS = 30
+
+# Upper bound on text buffered by `ClauseStream` while waiting for the next
+# boundary; longer runs are emitted at the last paragraph break.
+MAX_CLAUSE_CHARS = int(os.getenv("PARSER_MAX_CLAUSE_CHARS", "20000"))
+
+# Title lines are matched by lookahead, so a match always ends where the
+# clause body begins (after the marker and its trailing blanks, or at the
+# title itself).
+_LINE = r"""
+    [ \t]*
+    (?:
+        (?P<num>\d{1,3}(?:\.\d{1,3})*)          # 1  1.1  1.1.2
+        (?:\.(?P<sub>[a-z]))?                   # 1.1.a
+        (?:
+            (?P<term>[.)])(?=\s|[A-Z(])         # "1."  "1)"
+          | (?<=[a-z])(?=\s)                    # "1.1.a"
+          | (?=[ \t]*(?:["“'A-Z(]|\n|$))       # "1.1 Payment", not "3.5 percent"
+            (?![ \t]*(?i:per\s?cent)\b)
+        )
+      | \((?P<paren>[a-z]{1,4}|\d{1,3})\)(?=\s) # (a)  (iv)  (1)
+      | (?P<alpha>[a-z])\)(?=\s)                # a)
+      | (?=(?P<heading>[A-Z][A-Za-z ]{1,60}:))  # Termination:
+    )
+    [ \t]*
+"""
+
+# Boundaries after the first line start at their preceding newline; a
+# literal "\n" prefix lets the regex engine skip straight between lines,
+# which is several times faster than a MULTILINE "^" anchor.
+BOUNDARY = re.compile(r"\n" + _LINE, re.VERBOSE)
+FIRST_LINE = re.compile(_LINE, re.VERBOSE)
+
+ROMAN = frozenset(
+    "i ii iii iv v vi vii viii ix x xi xii xiii xiv xv xvi xvii xviii xix xx".split()
+)
+
+
+class ClauseSpan(NamedTuple):
+    start: int
+    end: int
+    label: Optional[str]  # e.g. "1.1.a", "4(b)(ii)"; None for preamble and titled clauses
+    depth: int
+
+
+class _Numbering:
+    """Tracks the current section / item / sub-item to label nested markers."""
+
+    def __init__(self):
+        self.section = None
+        self.section_depth = 0
+        self.item = None
+        self.subitem = None
+
+    def _is_roman(self, token: str) -> bool:
+        if token not in ROMAN:
+            return False
+        # "(i)" right after "(h)" (or "(v)" after "(u)", ...) continues the letters.
+        if self.item and len(token) == 1 and len(self.item) == 1 and self.item.isalpha():
+            return ord(token) != ord(self.item) + 1
+        return True
+
+    def advance(self, m):
+        """Return (label, depth) for a boundary match, or None if it is not one."""
+        num, sub, term, paren, alpha, heading = m.group(
+            "num", "sub", "term", "paren", "alpha", "heading"
+        )
+        if num is not None:
+            # A bare "12 months" at the start of a line is not a section number.
+            if sub is None and term is None and "." not in num:
+                return None
+            self.section = num if sub is None else f"{num}.{sub}"
+            self.section_depth = self.section.count(".") + 1
+            self.item = self.subitem = None
+            return self.section, self.section_depth
+
+        if heading is not None:
+            return None, max(1, self.section_depth)
+
+        token = paren or alpha
+        prefix = self.section or ""
+        if paren is not None and self._is_roman(token):
+            self.subitem = token
+            if self.item is not None:
+                return f"{prefix}({self.item})({token})", self.section_depth + 2
+            return f"{prefix}({token})", self.section_depth + 1
+
+        self.item, self.subitem = token, None
+        return f"{prefix}({token})", self.section_depth + 1
+
+
+def _trimmed(text, start, end, label, depth, min_chars):
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    if end - start > min_chars:
+        return ClauseSpan(start, end, label, depth)
+    return None
+
+
+def _scan(text, pos, endpos, at_start):
+    """Boundary matches in text[pos:endpos], one linear pass."""
+    if at_start:
+        m = FIRST_LINE.match(text, 0, endpos)
+        if m:
+            yield m
+    yield from BOUNDARY.finditer(text, pos, endpos)
+
+
+def _marker_start(m) -> int:
+    # BOUNDARY matches include the newline that precedes the marker line.
+    return m.start() + 1 if m.re is BOUNDARY else m.start()
+
+
+def iter_spans(text: str, min_chars: int = MIN_CLAUSE_CHARS):
+    """Yield the `ClauseSpan`s of `text` in document order, in one scan."""
+    advance = _Numbering().advance
+    body, label, depth = 0, None, 0
+
+    m = FIRST_LINE.match(text)
+    if m:
+        nxt = advance(m)
+        if nxt is not None:
+            label, depth = nxt
+            body = m.end()
+
+    for m in BOUNDARY.finditer(text):
+        nxt = advance(m)
+        if nxt is None:
+            continue
+        # The match starts at the newline before the marker line, and ends
+        # past the marker's trailing blanks, so most bodies need no trimming.
+        end = m.start()
+        if end - body > min_chars:
+            if text[body].isspace() or text[end - 1].isspace():
+                span = _trimmed(text, body, end, label, depth, min_chars)
+                if span:
+                    yield span
+            else:
+                yield ClauseSpan(body, end, label, depth)
+        label, depth = nxt
+        body = m.end()
+
+    span = _trimmed(text, body, len(text), label, depth, min_chars)
+    if span:
+        yield span
+
+
+def segment(text: str, min_chars: int = MIN_CLAUSE_CHARS):
+    """Return the clause spans of `text` as a list."""
+    return list(iter_spans(text, min_chars))
+
+
+def split_clauses(text: str, min_chars: int = MIN_CLAUSE_CHARS):
+    """Return clause texts; prefer `segment` when offsets are enough."""
+    return [text[s.start:s.end] for s in iter_spans(text, min_chars)]
+
+
+class ClauseStream:
+    """
+    Incremental segmenter over text arriving in chunks, joined with newlines.
+    Only complete lines are scanned (every boundary lies within one line),
+    so results match `split_clauses` on the joined text, and only the
+    clause still in progress is buffered. `max_chars` caps that buffer.
+    """
+
+    def __init__(self, min_chars: int = MIN_CLAUSE_CHARS, max_chars: int = MAX_CLAUSE_CHARS):
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self._numbering = _Numbering()
+        self._buf = None
+        self._scanned = 0  # buffer offset where unscanned text begins
+        self._at_start = True
+        self._label = None
+        self._depth = 0
+
+    def _emit(self, start, end):
+        span = _trimmed(self._buf, start, end, self._label, self._depth, self.min_chars)
+        return self._buf[span.start:span.end] if span else None
+
+    def _consume(self, endpos):
+        """Emit clauses closed by boundaries in [_scanned, endpos); return the open clause's start."""
+        body = 0
+        for m in _scan(self._buf, self._scanned, endpos, self._at_start):
+            nxt = self._numbering.advance(m)
+            if nxt is None:
+                continue
+            clause = self._emit(body, _marker_start(m))
+            if clause:
+                yield clause
+            self._label, self._depth = nxt
+            body = m.end()
+        self._at_start = False
+        return body
+
+    def feed(self, chunk: str):
+        """Add a chunk and yield the clause texts it completes."""
+        chunk = chunk or ""
+        self._buf = chunk if self._buf is None else self._buf + "\n" + chunk
+        last_nl = self._buf.rfind("\n")
+        if last_nl < 0 and len(self._buf) <= self.max_chars:
+            return
+
+        # Scan through the final newline (so a marker's lookahead can see it);
+        # the incomplete last line is rescanned from that newline next time.
+        # Without any newline the buffer is one over-long first line, whose
+        # marker (if any) is already decided.
+        body = yield from self._consume(last_nl + 1 if last_nl >= 0 else len(self._buf))
+        self._buf = self._buf[body:]
+        self._scanned = max(0, last_nl - body)
+
+        while len(self._buf) > self.max_chars:
+            limit = min(self.max_chars, self._scanned) or self.max_chars
+            cut = self._buf.rfind("\n\n", 0, limit)
+            cut = cut if cut > 0 else limit
+            clause = self._emit(0, cut)
+            if clause:
+                yield clause
+            self._buf = self._buf[cut:]
+            self._scanned = max(0, self._scanned - cut)
+
+    def close(self):
+        """Yield the final clause once all chunks have been fed."""
+        if self._buf is None:
+            return
+        body = yield from self._consume(len(self._buf))
+        clause = self._emit(body, len(self._buf))
+        self._buf = None
+        if clause:
+            yield clause
@@ -1,7 +1,14 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from backend.routes import router
+from backend.llm_client import close_client
+from backend.llm_cache import flush_response_cache
+from backend.utils.embedding_cache import flush_embedding_cache
+from backend.pdf_extract import shutdown_pool
+from database.models import close_pool
+from backend.warmup import WARMUP_ON_STARTUP, warm_up_all
 
 app = FastAPI(
     title="AI Legal Negotiation & Mediation Agent",
@@ -18,3 +25,19 @@ app.add_middleware(
 )
 
 app.include_router(router)
+
+
+@app.on_event("startup")
+async def startup():
+    if WARMUP_ON_STARTUP:
+        await asyncio.to_thread(warm_up_all)
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await close_client()
+    shutdown_pool()
+    close_pool()
+    flush_response_cache()
+    flush_embedding_cache()
+
@@ -0,0 +1,201 @@
+"""
+embedding_cache.py
+------------------
+Persistent embedding cache backed by SQLite.
+Vectors are keyed on a hash of (model name, text) and stored compactly as
+float32 bytes, so re-analysis and re-ingestion skip the model or API call
+for any text that has been embedded before. Size is bounded by entry count
+with least-recently-used eviction.
+
+Reads do not write: a hit only records its access time in memory, and the
+recorded times are written in one batch every TOUCH_BATCH hits (and before
+any eviction, so LRU order stays accurate).
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+from pathlib import Path
+
+CACHE_PATH = Path(os.getenv("EMBED_CACHE_PATH", "data/embedding_cache.sqlite3"))
+CACHE_ENABLED = os.getenv("EMBED_CACHE_ENABLED", "1") not in ("0", "false", "False")
+MAX_ENTRIES = int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "200000"))
+TOUCH_BATCH = int(os.getenv("EMBED_CACHE_TOUCH_BATCH", "1024"))
+
+# SQLite caps bound parameters per statement; stay well below the limit.
+_SQL_CHUNK = 500
+
+
+def make_key(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\x00{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """SQLite-backed LRU store of float32 vectors keyed by (model, text) hash."""
+
+    def __init__(self, path=CACHE_PATH, max_entries=MAX_ENTRIES):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._touched = {}  # key -> last access time not yet written
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                vector BLOB NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings(last_access)"
+        )
+        self._conn.commit()
+
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_many(self, model: str, texts):
+        """Return a list aligned with `texts`: a float32 vector on hit, None on miss."""
+        keys = [make_key(model, t) for t in texts]
+        found = {}
+
+        with self._lock:
+            unique = list(dict.fromkeys(keys))
+            for i in range(0, len(unique), _SQL_CHUNK):
+                chunk = unique[i:i + _SQL_CHUNK]
+                marks = ",".join("?" * len(chunk))
+                for key, blob in self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({marks})", chunk
+                ):
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+
+            if found:
+                now = time.time()
+                self._touched.update(dict.fromkeys(found, now))
+                if len(self._touched) >= TOUCH_BATCH:
+                    self._flush_touches()
+                    self._conn.commit()
+
+            hits = sum(1 for k in keys if k in found)
+            self.hits += hits
+            self.misses += len(keys) - hits
+
+        return [found.get(k) for k in keys]
+
+    def put_many(self, model: str, texts, vectors):
+        """Store vectors for texts, evicting least-recently-used rows past the size bound."""
+        now = time.time()
+        rows = [
+            (make_key(model, t), np.asarray(v, dtype=np.float32).tobytes(), now)
+            for t, v in zip(texts, vectors)
+        ]
+        if not rows:
+            return
+
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_access) VALUES (?, ?, ?)",
+                rows,
+            )
+            self._count += self._conn.total_changes - before
+
+            if self._count > self.max_entries:
+                self._flush_touches()
+                self._evict()
+
+            self._conn.commit()
+
+    def _flush_touches(self):
+        """Write pending access times (caller holds the lock and commits)."""
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                [(t, k) for k, t in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def flush(self):
+        with self._lock:
+            self._flush_touches()
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop least-recently-used rows until the cache is back under 90% of its bound."""
+        excess = self._count - int(self.max_entries * 0.9)
+        cur = self._conn.execute(
+            "DELETE FROM embeddings WHERE key IN "
+            "(SELECT key FROM embeddings ORDER BY last_access ASC LIMIT ?)",
+            (excess,),
+        )
+        self._count -= cur.rowcount
+        self.evictions += cur.rowcount
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "enabled": CACHE_ENABLED,
+            "entries": self._count,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Return the process-wide embedding cache, opening it on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = EmbeddingCache()
+    return _cache
+
+
+def flush_embedding_cache():
+    """Write pending access times; called from the app shutdown event."""
+    if _cache is not None:
+        _cache.flush()
+
+
+def cached_embed(model: str, texts, embed_fn):
+    """
+    Embed `texts` through the cache: hits are served from disk, and only the
+    unique misses are passed (in one call) to `embed_fn(list_of_texts)`,
+    which must return one vector per text. Returns float32 vectors in order.
+    """
+    texts = list(texts)
+    if not texts:
+        return []
+
+    if not CACHE_ENABLED:
+        return [np.asarray(v, dtype=np.float32) for v in embed_fn(texts)]
+
+    cache = get_embedding_cache()
+    vectors = cache.get_many(model, texts)
+
+    missing = list(dict.fromkeys(t for t, v in zip(texts, vectors) if v is None))
+    if missing:
+        fresh = [np.asarray(v, dtype=np.float32) for v in embed_fn(missing)]
+        cache.put_many(model, missing, fresh)
+        by_text = dict(zip(missing, fresh))
+        vectors = [v if v is not None else by_text[t] for t, v in zip(texts, vectors)]
+
+    return vectors
@@ -2,47 +2,120 @@
 embedding_manager.py
 ---------------------
 Handles embedding generation, storage, and retrieval using ChromaDB.
+The SentenceTransformer model and the Chroma client are loaded lazily on
+first use, so importing this module stays cheap. Embeddings go through the
+persistent embedding cache, so previously seen texts skip the model.
 """
 
-import chromadb
-from chromadb.config import Settings
-from sentence_transformers import SentenceTransformer
+import os
+import threading
 
-model = SentenceTransformer("all-MiniLM-L6-v2")
+from backend.utils.embedding_cache import cached_embed
+from backend.lexical_index import index_documents
 
-client = chromadb.Client(Settings(persist_directory="data/chroma_memory"))
-collection = client.get_or_create_collection("feedback_memory")
+EMBED_MODEL_NAME = "all-MiniLM-L6-v2"
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+CHROMA_PATH = "data/chroma_memory"
+COLLECTION_NAME = "feedback_memory"
+
+_model = None
+_collection = None
+_lock = threading.Lock()
+
+
+def get_model():
+    """Return the shared SentenceTransformer, loading it on first use."""
+    global _model
+    if _model is None:
+        with _lock:
+            if _model is None:
+                from sentence_transformers import SentenceTransformer
+                _model = SentenceTransformer(EMBED_MODEL_NAME)
+    return _model
+
+
+def get_collection():
+    """Return the Chroma memory collection, opening the client on first use."""
+    global _collection
+    if _collection is None:
+        with _lock:
+            if _collection is None:
+                import chromadb
+                from chromadb.config import Settings
+                client = chromadb.Client(Settings(persist_directory=CHROMA_PATH))
+                _collection = client.get_or_create_collection(COLLECTION_NAME)
+    return _collection
+
+
+def warm_up():
+    """Load the model and open the collection ahead of the first request."""
+    get_model()
+    get_collection()
+
+
+def generate_embeddings(texts, batch_size: int = None):
+    """Generate vector embeddings for many texts in batched forward passes."""
+    def encode(missing):
+        return get_model().encode(missing, batch_size=batch_size or EMBED_BATCH_SIZE)
+
+    vectors = cached_embed(f"sentence-transformers/{EMBED_MODEL_NAME}", texts, encode)
+    return [v.tolist() for v in vectors]
 
 
 def generate_embedding(text: str):
     """Generate a vector embedding for text."""
-    return model.encode([text])[0].tolist()
+    return generate_embeddings([text])[0]
 
 
 def store_in_chromadb(text: str, metadata: dict, embedding: list):
-    """Store feedback text and metadata in ChromaDB."""
-    collection.add(
+    """Store feedback text and metadata in ChromaDB (and the lexical index)."""
+    doc_id = f"feedback_{metadata['timestamp']}"
+    get_collection().add(
         documents=[text],
         embeddings=[embedding],
         metadatas=[metadata],
-        ids=[f"feedback_{metadata['timestamp']}"]
+        ids=[doc_id]
     )
+    index_documents([(f"chroma:{doc_id}", text, "chroma", metadata)])
     print(f"Stored feedback from {metadata['username']} in ChromaDB.")
 
 
-def search_memory(query: str, k: int = 4):
-    """Retrieve top-k similar memory entries from ChromaDB."""
-    query_embedding = generate_embedding(query)
+def distance_space() -> str:
+    """Distance function of the collection ("l2", "cosine" or "ip")."""
+    return (get_collection().metadata or {}).get("hnsw:space", "l2")
+
+
+def search_memory_many(queries, k: int = 4):
+    """
+    Retrieve top-k similar memory entries for many queries at once:
+    one batched embedding pass and a single ChromaDB query.
+    Returns one result list per query, in query order; each entry carries
+    the raw Chroma "distance" (lower is closer).
+    """
+    queries = list(queries)
+    if not queries:
+        return []
+
+    query_embeddings = generate_embeddings(queries)
 
-    results = collection.query(
-        query_embeddings=[query_embedding],
+    results = get_collection().query(
+        query_embeddings=query_embeddings,
         n_results=k
     )
 
-    docs = results.get("documents", [[]])[0]
-    metas = results.get("metadatas", [[]])[0]
+    all_docs = results.get("documents") or [[] for _ in queries]
+    all_metas = results.get("metadatas") or [[] for _ in queries]
+    all_dists = results.get("distances") or [[None] * len(d) for d in all_docs]
 
     return [
-        {"text": doc, "metadata": meta}
-        for doc, meta in zip(docs, metas)
+        [
+            {"text": doc, "metadata": meta, "distance": dist}
+            for doc, meta, dist in zip(docs, metas, dists)
+        ]
+        for docs, metas, dists in zip(all_docs, all_metas, all_dists)
     ]
+
+
+def search_memory(query: str, k: int = 4):
+    """Retrieve top-k similar memory entries from ChromaDB."""
+    return search_memory_many([query], k=k)[0]
@@ -0,0 +1,135 @@
+"""
+vector_index.py
+---------------
+FAISS index construction for the document memory.
+
+Supported index types (FAISS_INDEX_TYPE):
+- flat      exact brute-force L2 search (baseline)
+- ivf_flat  inverted file over full vectors; tune FAISS_NPROBE
+- ivf_pq    inverted file over product-quantized vectors (compact, lossy);
+            tune FAISS_NPROBE
+- hnsw      HNSW graph over full vectors; tune FAISS_EF_SEARCH
+
+Approximate indexes need a training/build step over existing vectors, see
+`build_index`. Use benchmarks/faiss_recall.py to pick parameters. Changing
+FAISS_INDEX_TYPE only affects newly created indexes; convert the stored
+memory index with:
+    python -m backend.memory_manager rebuild --kind ivf_pq [--nlist 1024 --pq-m 64]
+"""
+
+import os
+import numpy as np
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+
+INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat")
+NLIST = int(os.getenv("FAISS_NLIST", "1024"))
+PQ_M = int(os.getenv("FAISS_PQ_M", "64"))
+PQ_NBITS = int(os.getenv("FAISS_PQ_NBITS", "8"))
+HNSW_M = int(os.getenv("FAISS_HNSW_M", "32"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("FAISS_HNSW_EF_CONSTRUCTION", "200"))
+NPROBE = int(os.getenv("FAISS_NPROBE", "16"))
+EF_SEARCH = int(os.getenv("FAISS_EF_SEARCH", "64"))
+
+# FAISS k-means warns below ~39 training points per centroid.
+MIN_POINTS_PER_CENTROID = 39
+
+
+def _effective_nlist(n_vectors: int, nlist: int) -> int:
+    return max(1, min(nlist, n_vectors // MIN_POINTS_PER_CENTROID))
+
+
+def new_index(kind: str, dim: int, n_train: int = 0, nlist: int = NLIST,
+              pq_m: int = PQ_M, pq_nbits: int = PQ_NBITS, hnsw_m: int = HNSW_M):
+    """Create an empty (untrained) index of the given kind."""
+    import faiss
+
+    if kind == "flat":
+        return faiss.IndexFlatL2(dim)
+
+    if kind == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, hnsw_m)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        return index
+
+    if kind in ("ivf_flat", "ivf_pq"):
+        quantizer = faiss.IndexFlatL2(dim)
+        lists = _effective_nlist(n_train, nlist)
+        if kind == "ivf_flat":
+            return faiss.IndexIVFFlat(quantizer, dim, lists)
+        if dim % pq_m != 0:
+            raise ValueError(f"FAISS_PQ_M={pq_m} must divide the vector dimension {dim}")
+        return faiss.IndexIVFPQ(quantizer, dim, lists, pq_m, pq_nbits)
+
+    raise ValueError(f"Unknown FAISS index type {kind!r}; expected one of {INDEX_TYPES}")
+
+
+def build_index(vectors, kind: str = None, **params):
+    """
+    Build and populate an index of `kind` over an (n, dim) float32 matrix,
+    training it first when the index type requires it. Falls back to a flat
+    index when there are too few vectors to train the requested type.
+    """
+    kind = kind or INDEX_TYPE
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    n, dim = vectors.shape
+
+    if kind == "ivf_pq" and n < (1 << params.get("pq_nbits", PQ_NBITS)):
+        print(f"Only {n} vectors; too few to train ivf_pq, using flat index.")
+        kind = "flat"
+    elif kind == "ivf_flat" and n < MIN_POINTS_PER_CENTROID:
+        print(f"Only {n} vectors; too few to train ivf_flat, using flat index.")
+        kind = "flat"
+
+    index = new_index(kind, dim, n_train=n, **params)
+    if not index.is_trained:
+        index.train(vectors)
+    if n:
+        index.add(vectors)
+    configure_search(index)
+    return index
+
+
+def configure_search(index, nprobe: int = None, ef_search: int = None):
+    """Apply query-time knobs (nprobe for IVF, efSearch for HNSW) to a loaded index."""
+    import faiss
+
+    ivf = None
+    try:
+        ivf = faiss.extract_index_ivf(index)
+    except RuntimeError:
+        pass
+    if ivf is not None:
+        ivf.nprobe = nprobe or NPROBE
+
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = ef_search or EF_SEARCH
+    return index
+
+
+def index_kind(index) -> str:
+    import faiss
+
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf_flat"
+    return "flat"
+
+
+def extract_vectors(index):
+    """
+    Recover stored vectors as an (ntotal, dim) float32 matrix. Exact for
+    flat, ivf_flat and hnsw; approximate (quantized) for ivf_pq.
+    """
+    import faiss
+
+    if index.ntotal == 0:
+        return np.zeros((0, index.d), dtype="float32")
+    try:
+        faiss.extract_index_ivf(index).make_direct_map()
+    except RuntimeError:
+        pass
+    return index.reconstruct_n(0, index.ntotal)
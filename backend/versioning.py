@@ -0,0 +1,138 @@
+"""
+versioning.py
+-------------
+Diff-aware re-analysis of contract revisions.
+
+When /analyze is called with a `contract_id`, each clause is fingerprinted
+(SHA-256 of its normalized text) and the sequence of fingerprints is
+diffed (difflib) against the previous version of the same contract:
+
+- unchanged  fingerprint carried over; the stored result is reused
+- changed    replaces a clause of the previous version; re-analysed
+- new        inserted; analysed
+
+Clauses of the previous version with no counterpart are reported as
+"removed". Every revision is stored as a new version in the shared
+database (database/models.py), so the history of a negotiated contract
+stays available.
+"""
+
+import asyncio
+import difflib
+
+from backend.analysis import analyze_clauses, iter_clause_analyses
+from database.models import clause_hash as fingerprint, latest_version, save_contract_analysis
+
+
+def diff_clauses(old_fps, new_fps):
+    """
+    Align two fingerprint sequences. Returns (statuses, removed): statuses
+    has one (status, previous index or None) per new clause, removed lists
+    previous indices with no counterpart. Within a replaced block clauses
+    are paired by position; surplus new clauses are "new".
+    """
+    statuses = []
+    removed = []
+    matcher = difflib.SequenceMatcher(None, old_fps, new_fps, autojunk=False)
+    for op, i1, i2, j1, j2 in matcher.get_opcodes():
+        if op == "equal":
+            statuses.extend(("unchanged", i1 + k) for k in range(j2 - j1))
+        elif op == "insert":
+            statuses.extend(("new", None) for _ in range(j2 - j1))
+        elif op == "delete":
+            removed.extend(range(i1, i2))
+        else:
+            paired = min(i2 - i1, j2 - j1)
+            statuses.extend(("changed", i1 + k) for k in range(paired))
+            statuses.extend(("new", None) for _ in range(j2 - j1 - paired))
+            removed.extend(range(i1 + paired, i2))
+    return statuses, removed
+
+
+def _strip_status(entry):
+    return {k: v for k, v in entry.items() if k not in ("status", "previous_index")}
+
+
+class RevisionPlan:
+    """
+    What to reuse and what to (re-)analyse for one uploaded revision.
+    Construction and `commit` hit the database; async callers run them in
+    a worker thread.
+    """
+
+    def __init__(self, contract_id: str, clauses):
+        self.contract_id = contract_id
+        self.clauses = list(clauses)
+        self.fingerprints = [fingerprint(c) for c in self.clauses]
+
+        self.previous_version, previous = latest_version(contract_id)
+        statuses, removed = diff_clauses([fp for fp, _ in previous], self.fingerprints)
+
+        self.statuses = statuses
+        self.removed = [
+            {"previous_index": i, "clause": previous[i][1].get("clause")} for i in removed
+        ]
+        self.entries = [None] * len(self.clauses)
+        self.pending = []
+        for i, (status, prev) in enumerate(statuses):
+            stored = previous[prev][1] if status == "unchanged" else None
+            # Failed results are not worth carrying over; retry them.
+            if stored is not None and not stored.get("error"):
+                self.entries[i] = self.mark(i, {**_strip_status(stored), "clause": self.clauses[i]})
+            else:
+                self.pending.append(i)
+
+    def mark(self, index: int, entry):
+        status, prev = self.statuses[index]
+        entry = {**entry, "status": status}
+        if prev is not None:
+            entry["previous_index"] = prev
+        return entry
+
+    def commit(self, source: str = "text", filename: str = None) -> int:
+        """Store the completed revision as the contract's next version."""
+        _, version = save_contract_analysis(
+            self.entries, contract_id=self.contract_id, source=source, filename=filename
+        )
+        return version
+
+    def summary(self):
+        counts = {"new": 0, "changed": 0, "unchanged": 0}
+        for status, _ in self.statuses:
+            counts[status] += 1
+        return {
+            "contract_id": self.contract_id,
+            "previous_version": self.previous_version or None,
+            "removed": self.removed,
+            **counts,
+        }
+
+
+async def analyze_revision(contract_id: str, clauses, max_concurrency: int = None):
+    """
+    Analyze a revision of `contract_id`, re-running only new and changed
+    clauses. Returns (entries in clause order, summary incl. "version").
+    """
+    plan = await asyncio.to_thread(RevisionPlan, contract_id, clauses)
+    fresh = await analyze_clauses([plan.clauses[i] for i in plan.pending], max_concurrency)
+    for i, entry in zip(plan.pending, fresh):
+        plan.entries[i] = plan.mark(i, entry)
+    version = await asyncio.to_thread(plan.commit)
+    return plan.entries, {**plan.summary(), "version": version}
+
+
+async def iter_revision_analyses(plan: RevisionPlan, max_concurrency: int = None):
+    """
+    Streaming form of `analyze_revision`: yields `(index, entry)` for reused
+    clauses first, then for re-analysed ones as they finish. The revision is
+    stored once every clause has been yielded.
+    """
+    for i, entry in enumerate(plan.entries):
+        if entry is not None:
+            yield i, entry
+
+    pending = [plan.clauses[i] for i in plan.pending]
+    async for j, entry in iter_clause_analyses(pending, max_concurrency=max_concurrency):
+        i = plan.pending[j]
+        plan.entries[i] = plan.mark(i, entry)
+        yield i, plan.entries[i]
@@ -0,0 +1,27 @@
+"""
+warmup.py
+---------
+Optional warm-up of lazily loaded resources (embedding model, Chroma
+collection, FAISS index) so the first request does not pay for them.
+Enabled with WARMUP_ON_STARTUP=1.
+"""
+
+import os
+
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "0") in ("1", "true", "True")
+
+
+def warm_up_all():
+    """Load every heavy resource; failures are reported but never block startup."""
+    from backend.utils import embedding_manager
+    from backend import memory_manager
+
+    for name, hook in (
+        ("embedding model + Chroma", embedding_manager.warm_up),
+        ("FAISS memory", memory_manager.warm_up),
+    ):
+        try:
+            hook()
+            print(f"Warmed up {name}.")
+        except Exception as e:
+            print(f"Warm-up of {name} failed: {e}")
@@ -0,0 +1,103 @@
+"""
+faiss_recall.py
+---------------
+Recall-versus-latency benchmark of the approximate FAISS index types
+against the exact flat baseline.
+
+By default runs on synthetic vectors; pass --from-store to benchmark on the
+vectors already stored in data/vectorstore_faiss (queries are sampled from
+the corpus with a little noise).
+
+Usage:
+    python benchmarks/faiss_recall.py [--n 50000] [--dim 1536] [--queries 500]
+                                      [--k 5] [--from-store]
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from backend import vector_index  # noqa: E402
+
+SWEEPS = {
+    "ivf_flat": [("nprobe", v) for v in (1, 4, 16, 64)],
+    "ivf_pq": [("nprobe", v) for v in (1, 4, 16, 64)],
+    "hnsw": [("efSearch", v) for v in (16, 32, 64, 128)],
+}
+
+
+def load_vectors(args):
+    if args.from_store:
+        from backend import memory_manager
+        vectors = vector_index.extract_vectors(memory_manager.get_index())
+        if not len(vectors):
+            sys.exit("The memory store is empty; nothing to benchmark.")
+        return vectors
+
+    rng = np.random.default_rng(0)
+    # Clustered data behaves more like real embeddings than uniform noise.
+    centers = rng.normal(size=(max(1, args.n // 500), args.dim)).astype("float32")
+    labels = rng.integers(0, len(centers), size=args.n)
+    return centers[labels] + 0.3 * rng.normal(size=(args.n, args.dim)).astype("float32")
+
+
+def timed_search(index, queries, k):
+    start = time.perf_counter()
+    _, ids = index.search(queries, k)
+    return ids, (time.perf_counter() - start) * 1000 / len(queries)
+
+
+def recall_at_k(truth, found):
+    hits = sum(len(set(t) & set(f)) for t, f in zip(truth, found))
+    return hits / truth.size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--from-store", action="store_true")
+    parser.add_argument("--types", default="ivf_flat,ivf_pq,hnsw")
+    args = parser.parse_args()
+
+    vectors = np.ascontiguousarray(load_vectors(args), dtype="float32")
+    n, dim = vectors.shape
+
+    rng = np.random.default_rng(1)
+    picks = rng.integers(0, n, size=min(args.queries, n))
+    queries = vectors[picks] + 0.05 * rng.normal(size=(len(picks), dim)).astype("float32")
+
+    flat = vector_index.build_index(vectors, "flat")
+    truth, flat_ms = timed_search(flat, queries, args.k)
+
+    print(f"{n} vectors x {dim} dims, {len(queries)} queries, k={args.k}")
+    print(f"{'index':<10} {'param':<14} {'build s':>8} {'ms/query':>9} {'recall':>7} {'speedup':>8}")
+    print(f"{'flat':<10} {'-':<14} {'-':>8} {flat_ms:>9.3f} {1.0:>7.3f} {1.0:>7.1f}x")
+
+    for kind in args.types.split(","):
+        start = time.perf_counter()
+        index = vector_index.build_index(vectors, kind)
+        build_s = time.perf_counter() - start
+        if vector_index.index_kind(index) != kind:
+            print(f"{kind:<10} skipped (too few vectors to train)")
+            continue
+
+        for name, value in SWEEPS[kind]:
+            if name == "nprobe":
+                vector_index.configure_search(index, nprobe=value)
+            else:
+                vector_index.configure_search(index, ef_search=value)
+            found, ms = timed_search(index, queries, args.k)
+            print(f"{kind:<10} {f'{name}={value}':<14} {build_s:>8.1f} {ms:>9.3f} "
+                  f"{recall_at_k(truth, found):>7.3f} {flat_ms / ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
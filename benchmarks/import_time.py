@@ -0,0 +1,92 @@
+"""
+import_time.py
+--------------
+Import-time regression guard for the API.
+
+Imports `backend.routes` (and the app modules) in fresh interpreters,
+reports wall-clock import time, and fails if the import exceeds the budget
+or drags in heavy resources that must stay lazy (torch, sentence-transformers,
+chromadb, faiss).
+
+The budget is checked against the fastest of N runs: scheduling and cold
+page cache only ever add time, so the minimum tracks what the code itself
+costs. A bare `import fastapi` is measured the same way and reported as the
+baseline, separating the app's own import cost from the framework's.
+tests/test_import_time.py runs the forbidden-module check with the suite.
+
+Usage:
+    python benchmarks/import_time.py [--budget SECONDS] [--runs N]
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+MODULES = ["backend.routes", "backend.server"]
+FORBIDDEN = ["torch", "sentence_transformers", "chromadb", "faiss"]
+BASELINE = ["fastapi"]
+DEFAULT_BUDGET = float(os.getenv("IMPORT_BUDGET_SECONDS", "2.0"))
+
+PROBE = """
+import sys, json, time, importlib
+start = time.perf_counter()
+for name in {modules!r}:
+    importlib.import_module(name)
+elapsed = time.perf_counter() - start
+loaded = [m for m in {forbidden!r} if m in sys.modules]
+print(json.dumps({{"seconds": elapsed, "forbidden": loaded}}))
+"""
+
+
+def measure_once(modules=MODULES):
+    """Import `modules` in a fresh interpreter; returns {"seconds", "forbidden"}."""
+    code = PROBE.format(modules=list(modules), forbidden=FORBIDDEN)
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=str(ROOT),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    runs = [measure_once() for _ in range(args.runs)]
+    times = [r["seconds"] for r in runs]
+    forbidden = sorted({m for r in runs for m in r["forbidden"]})
+    best = min(times)
+    baseline = min(measure_once(BASELINE)["seconds"] for _ in range(args.runs))
+
+    print(f"import {', '.join(MODULES)}: min {best * 1000:.0f} ms "
+          f"(median {statistics.median(times) * 1000:.0f} ms, max {max(times) * 1000:.0f} ms, "
+          f"{args.runs} runs)")
+    print(f"import {', '.join(BASELINE)} baseline: min {baseline * 1000:.0f} ms; "
+          f"app overhead {(best - baseline) * 1000:.0f} ms")
+
+    failed = False
+    if forbidden:
+        print(f"FAIL: heavy modules loaded at import time: {', '.join(forbidden)}")
+        failed = True
+    if best > args.budget:
+        print(f"FAIL: fastest import exceeds budget of {args.budget:.2f} s")
+        failed = True
+
+    if not failed:
+        print("OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""
+mock_llm_server.py
+------------------
+Local stand-in for the OpenAI chat completions API, for exercising the
+generation engine (backend/generation.py) without an API key or spend.
+
+Responses arrive after a random latency and carry a `usage` block. The
+server enforces its own requests-per-minute limit (429 + Retry-After) and
+can inject random 500s, so throttling and retries behave as they do
+against the real API.
+
+Usage:
+    python benchmarks/mock_llm_server.py [--port 8999] [--latency 0.8]
+                                         [--rpm 3000] [--error-rate 0.02]
+    GENERATION_BASE_URL=http://127.0.0.1:8999/v1 python -m backend.dataset_expander
+"""
+
+import time
+import random
+import asyncio
+import argparse
+from collections import deque
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+CONFIG = {"latency": 0.8, "rpm": 3000, "error_rate": 0.02, "output_tokens": 900}
+STATS = {"requests": 0, "throttled": 0, "errors": 0}
+
+app = FastAPI(title="Mock LLM server")
+_recent = deque()
+
+
+def configure(**kwargs):
+    CONFIG.update({k: v for k, v in kwargs.items() if v is not None})
+    _recent.clear()
+    for key in STATS:
+        STATS[key] = 0
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    STATS["requests"] += 1
+
+    now = time.monotonic()
+    while _recent and now - _recent[0] > 60:
+        _recent.popleft()
+    if len(_recent) >= CONFIG["rpm"]:
+        STATS["throttled"] += 1
+        retry_after = max(0.1, 60 - (now - _recent[0]))
+        return JSONResponse(
+            {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+            status_code=429,
+            headers={"retry-after": f"{retry_after:.2f}"},
+        )
+    _recent.append(now)
+
+    await asyncio.sleep(random.expovariate(1 / CONFIG["latency"]) if CONFIG["latency"] else 0)
+    if random.random() < CONFIG["error_rate"]:
+        STATS["errors"] += 1
+        return JSONResponse({"error": {"message": "Internal error", "type": "server_error"}}, status_code=500)
+
+    prompt = body["messages"][-1]["content"]
+    prompt_tokens = sum(len(m["content"]) for m in body["messages"]) // 4
+    output_tokens = min(CONFIG["output_tokens"], body.get("max_tokens") or CONFIG["output_tokens"])
+    content = f"MOCK DOCUMENT\n\n1. Parties.\n{prompt}\n\n" + "lorem ipsum " * (output_tokens // 2)
+    return {
+        "id": f"chatcmpl-mock-{STATS['requests']}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "mock"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "length" if output_tokens < CONFIG["output_tokens"] else "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": output_tokens,
+            "total_tokens": prompt_tokens + output_tokens,
+        },
+    }
+
+
+@app.get("/stats")
+def stats():
+    return {**STATS, **CONFIG}
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8999)
+    parser.add_argument("--latency", type=float, default=None, help="mean seconds per response")
+    parser.add_argument("--rpm", type=int, default=None)
+    parser.add_argument("--error-rate", type=float, default=None)
+    args = parser.parse_args()
+
+    configure(latency=args.latency, rpm=args.rpm, error_rate=args.error_rate)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
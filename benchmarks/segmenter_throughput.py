@@ -0,0 +1,126 @@
+"""
+segmenter_throughput.py
+-----------------------
+Throughput benchmark of the clause segmenter on multi-megabyte contracts.
+
+Generates a synthetic contract with nested numbering (sections, 1.1-style
+sub-clauses, (a)/(i) items and titled clauses) and times:
+
+- segment        spans over the whole text (backend/segmenter.py)
+- split_clauses  the same, copying clause strings
+- stream         ClauseStream fed page-sized chunks (PDF ingestion path)
+- legacy-*       the two splitters the segmenter replaced, for reference
+
+Usage:
+    python benchmarks/segmenter_throughput.py [--mb 8] [--runs 5]
+"""
+
+import re
+import sys
+import time
+import random
+import argparse
+import statistics
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from backend.segmenter import ClauseStream, segment, split_clauses  # noqa: E402
+
+WORDS = (
+    "the party shall provide notice in writing within thirty days of any breach "
+    "of this agreement including payment obligations confidentiality and the "
+    "Employment Act subject to clause termination fees services client supplier"
+).split()
+
+
+def sentence(rng, n=24):
+    return " ".join(rng.choice(WORDS) for _ in range(n)).capitalize() + "."
+
+
+def make_contract(target_bytes: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    out, size, section = [], 0, 0
+    while size < target_bytes:
+        section += 1
+        lines = [f"{section}. {sentence(rng, 4)}"]
+        for sub in range(1, rng.randint(2, 6)):
+            lines.append(f"{section}.{sub} {sentence(rng)} {sentence(rng)}")
+            if rng.random() < 0.4:
+                for j, letter in enumerate("abcd"[: rng.randint(2, 4)]):
+                    lines.append(f"({letter}) {sentence(rng, 16)}")
+                    if j == 0 and rng.random() < 0.5:
+                        lines.append(f"   (i) {sentence(rng, 12)}")
+                        lines.append(f"   (ii) {sentence(rng, 12)}")
+        if rng.random() < 0.2:
+            lines.append(f"Governing Law: {sentence(rng)}")
+        block = "\n".join(lines) + "\n\n"
+        out.append(block)
+        size += len(block)
+    return "".join(out)
+
+
+def legacy_backend(text):
+    patterns = [r"\n\d+\.", r"\n\d+\)", r"\n[A-Z][a-zA-Z ]+:"]
+    pieces = re.split("|".join(patterns), text)
+    return [c.strip() for c in pieces if len(c.strip()) > 30]
+
+
+def legacy_ui(text, min_len=40):
+    joined = "\n".join(l.rstrip() for l in text.splitlines())
+    pieces = re.split(
+        r"\n\s*\d+\.\s+|\n\s*\d+\)\s+|\n\s*[A-Za-z]\)\s+|\n\s*\n\s*", joined
+    )
+    return [p.strip() for p in pieces if len(p.strip()) >= min_len]
+
+
+def stream(text, page_chars=3000):
+    pages = []
+    start = 0
+    while start < len(text):
+        cut = text.find("\n", start + page_chars)
+        cut = len(text) if cut < 0 else cut
+        pages.append(text[start:cut])
+        start = cut + 1
+    clauses = ClauseStream()
+    out = []
+    for page in pages:
+        out.extend(clauses.feed(page))
+    out.extend(clauses.close())
+    return out
+
+
+def bench(fn, text, runs):
+    times = []
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn(text)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), len(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--mb", type=float, default=8.0)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    text = make_contract(int(args.mb * 1024 * 1024))
+    mb = len(text.encode("utf-8")) / (1024 * 1024)
+    print(f"{mb:.1f} MB synthetic contract, median of {args.runs} runs")
+    print(f"{'splitter':<14} {'seconds':>8} {'MB/s':>8} {'clauses':>8}")
+
+    for name, fn in [
+        ("segment", segment),
+        ("split_clauses", split_clauses),
+        ("stream", stream),
+        ("legacy-backend", legacy_backend),
+        ("legacy-ui", legacy_ui),
+    ]:
+        seconds, count = bench(fn, text, args.runs)
+        print(f"{name:<14} {seconds:>8.3f} {mb / seconds:>8.1f} {count:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+init_db.py
+----------
+Create (or upgrade in place) the SQLite database from schema.sql.
+
+The schema is idempotent, so this runs on every pool start-up as well as
+from the command line:
+
+    python -m database.init_db [--path data/legal_agent.sqlite3]
+"""
+
+import sqlite3
+import argparse
+from pathlib import Path
+
+SCHEMA_PATH = Path(__file__).with_name("schema.sql")
+
+
+def apply_schema(conn: sqlite3.Connection):
+    conn.executescript(SCHEMA_PATH.read_text(encoding="utf-8"))
+    conn.commit()
+
+
+def init_db(path=None) -> Path:
+    """Create the database at `path` (default DATABASE_PATH) and apply the schema."""
+    from database.models import DB_PATH
+
+    path = Path(path or DB_PATH)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path))
+    try:
+        apply_schema(conn)
+    finally:
+        conn.close()
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Initialise the agent's SQLite database.")
+    parser.add_argument("--path", default=None)
+    args = parser.parse_args()
+    print(f"Database ready at {init_db(args.path)}")
@@ -0,0 +1,444 @@
+"""
+models.py
+---------
+SQLite persistence layer: a pooled, thread-safe connection manager and
+the read/write helpers for contracts, clauses, analyses, negotiations,
+mediations and feedback (tables in schema.sql).
+
+The database runs in WAL mode, so readers never block the single writer
+and every FastAPI worker process can share one file. Within a process,
+`ConnectionPool` hands each thread its own connection for the duration of
+a `with pool.connection()` block; the block is one transaction, committed
+on success and rolled back on error. Bulk paths use `executemany` inside
+a single transaction.
+"""
+
+import os
+import json
+import time
+import queue
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from pathlib import Path
+from contextlib import contextmanager
+
+from database.init_db import apply_schema
+
+DB_PATH = Path(os.getenv("DATABASE_PATH", "data/legal_agent.sqlite3"))
+POOL_SIZE = int(os.getenv("DATABASE_POOL_SIZE", "8"))
+BUSY_TIMEOUT_SECONDS = float(os.getenv("DATABASE_BUSY_TIMEOUT", "30"))
+# How long a caller waits for a free pooled connection before giving up.
+ACQUIRE_TIMEOUT_SECONDS = float(os.getenv("DATABASE_ACQUIRE_TIMEOUT", "10"))
+
+
+class PoolTimeout(RuntimeError):
+    """No pooled connection became free within ACQUIRE_TIMEOUT_SECONDS."""
+
+
+def normalize_text(text: str) -> str:
+    """Normalize unicode, case and whitespace so trivially different copies share a key."""
+    text = unicodedata.normalize("NFKC", text or "")
+    return " ".join(text.split()).casefold()
+
+
+def clause_hash(text: str) -> str:
+    """SHA-256 of the normalized clause text; identical clauses share a hash."""
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class ConnectionPool:
+    """
+    Bounded pool of SQLite connections. Connections are opened lazily up to
+    `size`; once all are in use, callers wait up to `acquire_timeout`
+    seconds for one to be returned, then get a PoolTimeout.
+    """
+
+    def __init__(self, path=DB_PATH, size=POOL_SIZE, acquire_timeout=ACQUIRE_TIMEOUT_SECONDS):
+        self.path = Path(path)
+        self.size = size
+        self.acquire_timeout = acquire_timeout
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        apply_schema(conn)
+        self._idle.put(conn)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            str(self.path), timeout=BUSY_TIMEOUT_SECONDS, check_same_thread=False
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        self._opened += 1
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._opened < self.size:
+                return self._connect()
+        try:
+            return self._idle.get(timeout=self.acquire_timeout)
+        except queue.Empty:
+            raise PoolTimeout(
+                f"no database connection free after {self.acquire_timeout}s "
+                f"({self.size} in use)"
+            ) from None
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for one transaction."""
+        conn = self._acquire()
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self._idle.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Return the process-wide connection pool, creating the schema on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+    return _pool
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+def _json(value):
+    return None if value is None else json.dumps(value, ensure_ascii=False)
+
+
+# ---------------------------------------------------------------------------
+# Contracts, clauses and analyses
+# ---------------------------------------------------------------------------
+
+def _insert_contract(conn, contract_id, source, filename):
+    version = None
+    if contract_id:
+        # Taken inside the write transaction, so concurrent uploads of the
+        # same contract get distinct versions.
+        conn.execute("BEGIN IMMEDIATE")
+        version = conn.execute(
+            "SELECT COALESCE(MAX(version), 0) + 1 FROM contracts WHERE contract_id = ?",
+            (contract_id,),
+        ).fetchone()[0]
+    contract_pk = conn.execute(
+        "INSERT INTO contracts (contract_id, version, source, filename, created_at) "
+        "VALUES (?, ?, ?, ?, ?)",
+        (contract_id, version, source, filename, time.time()),
+    ).lastrowid
+    return contract_pk, version
+
+
+def _insert_entries(conn, contract_pk, indexed_entries):
+    """Bulk-insert (position, entry) pairs as clauses plus their analyses."""
+    now = time.time()
+    rows = [(i, clause_hash(e.get("clause") or ""), e) for i, e in indexed_entries]
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+    first = conn.execute("SELECT COALESCE(MAX(id), 0) FROM clauses").fetchone()[0]
+    conn.executemany(
+        "INSERT INTO clauses (contract_pk, position, clause_hash, text, status) VALUES (?, ?, ?, ?, ?)",
+        [(contract_pk, i, h, e.get("clause") or "", e.get("status")) for i, h, e in rows],
+    )
+    # The write lock is held from here on, so this batch's ids follow `first`.
+    clause_pks = {row[1]: row[0] for row in conn.execute(
+        "SELECT id, position FROM clauses WHERE contract_pk = ? AND id > ?", (contract_pk, first)
+    )}
+    conn.executemany(
+        "INSERT INTO analyses (clause_pk, clause_hash, analysis, sources, error, cached, created_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [
+            (clause_pks[i], h, _json(e.get("analysis")), _json(e.get("sources")), e.get("error"),
+             int(bool(e.get("cached"))), now)
+            for i, h, e in rows
+        ],
+    )
+
+
+def _finish_contract(conn, contract_pk):
+    conn.execute(
+        "UPDATE contracts SET "
+        "clause_count = (SELECT COUNT(*) FROM clauses WHERE contract_pk = ?), "
+        "failed = (SELECT COUNT(*) FROM analyses a JOIN clauses c ON c.id = a.clause_pk "
+        "          WHERE c.contract_pk = ? AND a.error IS NOT NULL) "
+        "WHERE id = ?",
+        (contract_pk, contract_pk, contract_pk),
+    )
+
+
+def save_contract_analysis(entries, contract_id=None, source="text", filename=None):
+    """
+    Store one analysed upload in a single transaction: a contracts row, then
+    its clauses and analyses with one bulk insert each. `entries` are
+    /analyze result entries in document order. With a `contract_id` the
+    upload is stored as that contract's next version. Returns
+    (contract row id, version).
+    """
+    with get_pool().connection() as conn:
+        contract_pk, version = _insert_contract(conn, contract_id, source, filename)
+        _insert_entries(conn, contract_pk, enumerate(entries))
+        _finish_contract(conn, contract_pk)
+    return contract_pk, version
+
+
+class ContractWriter:
+    """
+    Incremental form of `save_contract_analysis` for streamed analyses:
+    entries arrive in any order and are bulk-inserted every `batch_size`,
+    so a long upload is never held in memory just to be stored.
+
+    The contracts row is only written with the first batch. A stream that
+    stops early must call `abort()`, which deletes whatever was written,
+    so history never lists a half-stored upload.
+    """
+
+    def __init__(self, contract_id=None, source="text", filename=None, batch_size=64):
+        self.batch_size = batch_size
+        self._pending = []
+        self._contract = (contract_id, source, filename)
+        self.contract_pk = self.version = None
+        self.closed = False
+
+    def _open(self, conn):
+        if self.contract_pk is None:
+            self.contract_pk, self.version = _insert_contract(conn, *self._contract)
+
+    def add(self, index: int, entry):
+        self._pending.append((index, entry))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            with get_pool().connection() as conn:
+                self._open(conn)
+                _insert_entries(conn, self.contract_pk, self._pending)
+            self._pending = []
+
+    def close(self):
+        """Store the remaining entries and the contract's totals."""
+        with get_pool().connection() as conn:
+            self._open(conn)
+            _insert_entries(conn, self.contract_pk, self._pending)
+            _finish_contract(conn, self.contract_pk)
+        self._pending = []
+        self.closed = True
+        return self.contract_pk, self.version
+
+    def abort(self):
+        """Drop an unfinished upload: pending entries and any rows already written."""
+        self._pending = []
+        if self.contract_pk is not None and not self.closed:
+            with get_pool().connection() as conn:
+                # Clauses and analyses go with it (ON DELETE CASCADE).
+                conn.execute("DELETE FROM contracts WHERE id = ?", (self.contract_pk,))
+            self.contract_pk = self.version = None
+        self.closed = True
+
+
+def latest_version(contract_id: str):
+    """Return (version, [(clause hash, entry)]) of a contract's latest version, or (0, [])."""
+    with get_pool().connection() as conn:
+        row = conn.execute(
+            "SELECT id, version FROM contracts WHERE contract_id = ? ORDER BY version DESC LIMIT 1",
+            (contract_id,),
+        ).fetchone()
+        if row is None:
+            return 0, []
+        rows = conn.execute(
+            "SELECT c.clause_hash, c.text, c.status, a.analysis, a.sources, a.error, a.cached "
+            "FROM clauses c JOIN analyses a ON a.clause_pk = c.id "
+            "WHERE c.contract_pk = ? ORDER BY c.position",
+            (row["id"],),
+        ).fetchall()
+    return row["version"], [(r["clause_hash"], _entry(r)) for r in rows]
+
+
+def recent_contracts(limit: int = 20, contract_id: str = None):
+    """Most recent analysed uploads (optionally of one tracked contract), newest first."""
+    sql = "SELECT * FROM contracts"
+    params = []
+    if contract_id:
+        sql += " WHERE contract_id = ?"
+        params.append(contract_id)
+    sql += " ORDER BY created_at DESC LIMIT ?"
+    params.append(limit)
+    with get_pool().connection() as conn:
+        return [dict(row) for row in conn.execute(sql, params)]
+
+
+def contract_analyses(contract_pk: int):
+    """The clause entries of one stored upload, in document order."""
+    with get_pool().connection() as conn:
+        rows = conn.execute(
+            "SELECT c.position, c.text, c.status, a.analysis, a.sources, a.error, a.cached "
+            "FROM clauses c JOIN analyses a ON a.clause_pk = c.id "
+            "WHERE c.contract_pk = ? ORDER BY c.position",
+            (contract_pk,),
+        ).fetchall()
+    return [_entry(row) for row in rows]
+
+
+def find_analyses(clause: str = None, hash_: str = None, limit: int = 5):
+    """Past successful analyses of a clause (by text or hash), newest first."""
+    hash_ = hash_ or clause_hash(clause or "")
+    with get_pool().connection() as conn:
+        rows = conn.execute(
+            "SELECT c.text, c.status, a.analysis, a.sources, a.error, a.cached, a.created_at "
+            "FROM analyses a JOIN clauses c ON c.id = a.clause_pk "
+            "WHERE a.clause_hash = ? AND a.error IS NULL "
+            "ORDER BY a.created_at DESC LIMIT ?",
+            (hash_, limit),
+        ).fetchall()
+    return [_entry(row) for row in rows]
+
+
+def _entry(row):
+    entry = {
+        "clause": row["text"],
+        "analysis": json.loads(row["analysis"]) if row["analysis"] else None,
+        "sources": json.loads(row["sources"]) if row["sources"] else [],
+    }
+    if row["error"]:
+        entry["error"] = row["error"]
+    if row["cached"]:
+        entry["cached"] = True
+    if row["status"]:
+        entry["status"] = row["status"]
+    return entry
+
+
+# ---------------------------------------------------------------------------
+# Negotiations and mediations
+# ---------------------------------------------------------------------------
+
+def save_negotiation(clause: str, position: str, result):
+    with get_pool().connection() as conn:
+        conn.execute(
+            "INSERT INTO negotiations (clause_hash, clause, position, result, created_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (clause_hash(clause), clause, position, _json(result), time.time()),
+        )
+
+
+def save_mediation(party_a: str, party_b: str, result):
+    with get_pool().connection() as conn:
+        conn.execute(
+            "INSERT INTO mediations (party_a, party_b, result, created_at) VALUES (?, ?, ?, ?)",
+            (party_a, party_b, _json(result), time.time()),
+        )
+
+
+def recent_negotiations(limit: int = 20, clause: str = None):
+    sql = "SELECT clause, position, result, created_at FROM negotiations"
+    params = []
+    if clause:
+        sql += " WHERE clause_hash = ?"
+        params.append(clause_hash(clause))
+    sql += " ORDER BY created_at DESC LIMIT ?"
+    params.append(limit)
+    with get_pool().connection() as conn:
+        return [{**dict(row), "result": json.loads(row["result"])} for row in conn.execute(sql, params)]
+
+
+# ---------------------------------------------------------------------------
+# Feedback
+# ---------------------------------------------------------------------------
+
+FEEDBACK_FIELDS = ("username", "rating", "comments")
+
+
+def _insert_feedback(conn, rows):
+    now = time.time()
+    rows = [(u, int(r), c or "", now) for u, r, c in rows]
+    conn.executemany(
+        "INSERT INTO feedback (username, rating, comments, created_at) VALUES (?, ?, ?, ?)",
+        rows,
+    )
+    conn.execute(
+        "UPDATE feedback_stats SET count = count + ?, rating_sum = rating_sum + ? WHERE id = 0",
+        (len(rows), sum(r[1] for r in rows)),
+    )
+
+
+def add_feedback_many(rows):
+    """Append (username, rating, comments) rows and update the aggregates in one transaction."""
+    with get_pool().connection() as conn:
+        _insert_feedback(conn, rows)
+
+
+LEGACY_FEEDBACK_MARKER = "migrated:feedback.json"
+
+
+def import_legacy_feedback(rows) -> bool:
+    """
+    Import legacy feedback rows unless this database already has them.
+    The `meta` marker is checked and set in the same BEGIN IMMEDIATE
+    transaction as the insert, so concurrent processes import once.
+    Returns True if this call imported the rows.
+    """
+    with get_pool().connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        if conn.execute("SELECT 1 FROM meta WHERE key = ?", (LEGACY_FEEDBACK_MARKER,)).fetchone():
+            return False
+        _insert_feedback(conn, rows)
+        conn.execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?)", (LEGACY_FEEDBACK_MARKER, str(time.time()))
+        )
+    return True
+
+
+def feedback_totals():
+    """Return (count, rating_sum) from the running aggregates."""
+    with get_pool().connection() as conn:
+        return tuple(conn.execute(
+            "SELECT count, rating_sum FROM feedback_stats WHERE id = 0"
+        ).fetchone())
+
+
+def iter_feedback_rows():
+    """Yield feedback dicts in submission order without loading them all."""
+    with get_pool().connection() as conn:
+        for row in conn.execute(f"SELECT {', '.join(FEEDBACK_FIELDS)} FROM feedback ORDER BY id"):
+            yield dict(row)
+
+
+def clear_feedback_rows():
+    with get_pool().connection() as conn:
+        conn.execute("DELETE FROM feedback")
+        conn.execute("UPDATE feedback_stats SET count = 0, rating_sum = 0 WHERE id = 0")
@@ -0,0 +1,99 @@
+-- Persistence schema for the legal negotiation agent (SQLite, WAL mode).
+-- Applied idempotently by database/init_db.py; every statement must be
+-- safe to re-run on an existing database.
+
+PRAGMA journal_mode = WAL;
+
+-- One row per analysed upload. contract_id/version are set when the upload
+-- is a revision of a tracked contract (see backend/versioning.py).
+CREATE TABLE IF NOT EXISTS contracts (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    contract_id   TEXT,
+    version       INTEGER,
+    source        TEXT NOT NULL DEFAULT 'text',
+    filename      TEXT,
+    clause_count  INTEGER NOT NULL DEFAULT 0,
+    failed        INTEGER NOT NULL DEFAULT 0,
+    created_at    REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_contracts_created ON contracts(created_at);
+CREATE INDEX IF NOT EXISTS idx_contracts_contract_id ON contracts(contract_id, version);
+
+-- Clauses in document order. clause_hash is the SHA-256 of the normalized
+-- clause text, so identical clauses across contracts share a hash.
+CREATE TABLE IF NOT EXISTS clauses (
+    id           INTEGER PRIMARY KEY AUTOINCREMENT,
+    contract_pk  INTEGER NOT NULL REFERENCES contracts(id) ON DELETE CASCADE,
+    position     INTEGER NOT NULL,
+    clause_hash  TEXT NOT NULL,
+    text         TEXT NOT NULL,
+    status       TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_clauses_contract ON clauses(contract_pk, position);
+CREATE INDEX IF NOT EXISTS idx_clauses_hash ON clauses(clause_hash);
+
+-- One analysis result per clause. analysis and sources are JSON text.
+CREATE TABLE IF NOT EXISTS analyses (
+    id           INTEGER PRIMARY KEY AUTOINCREMENT,
+    clause_pk    INTEGER NOT NULL REFERENCES clauses(id) ON DELETE CASCADE,
+    clause_hash  TEXT NOT NULL,
+    analysis     TEXT,
+    sources      TEXT,
+    error        TEXT,
+    cached       INTEGER NOT NULL DEFAULT 0,
+    created_at   REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_analyses_hash ON analyses(clause_hash, created_at);
+CREATE INDEX IF NOT EXISTS idx_analyses_created ON analyses(created_at);
+
+CREATE TABLE IF NOT EXISTS negotiations (
+    id           INTEGER PRIMARY KEY AUTOINCREMENT,
+    clause_hash  TEXT NOT NULL,
+    clause       TEXT NOT NULL,
+    position     TEXT NOT NULL,
+    result       TEXT NOT NULL,
+    created_at   REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_negotiations_hash ON negotiations(clause_hash);
+CREATE INDEX IF NOT EXISTS idx_negotiations_created ON negotiations(created_at);
+
+CREATE TABLE IF NOT EXISTS mediations (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    party_a     TEXT NOT NULL,
+    party_b     TEXT NOT NULL,
+    result      TEXT NOT NULL,
+    created_at  REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_mediations_created ON mediations(created_at);
+
+-- Append-only user feedback plus running aggregates, updated in the same
+-- transaction as each insert so count and average are O(1).
+CREATE TABLE IF NOT EXISTS feedback (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    username    TEXT NOT NULL,
+    rating      INTEGER NOT NULL,
+    comments    TEXT NOT NULL,
+    created_at  REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_feedback_created ON feedback(created_at);
+
+CREATE TABLE IF NOT EXISTS feedback_stats (
+    id          INTEGER PRIMARY KEY CHECK (id = 0),
+    count       INTEGER NOT NULL,
+    rating_sum  INTEGER NOT NULL
+);
+
+INSERT OR IGNORE INTO feedback_stats (id, count, rating_sum) VALUES (0, 0, 0);
+
+-- One-off data migrations that have run against this database, so that
+-- several worker processes never apply the same one twice.
+CREATE TABLE IF NOT EXISTS meta (
+    key         TEXT PRIMARY KEY,
+    value       TEXT NOT NULL
+);
@@ -8,13 +8,20 @@ Modern dark premium look (gold + navy), with:
 - Feedback
 """
 
+import sys
 import streamlit as st
 import requests
+import json
 import time
 import io
 import base64
 from datetime import datetime
-from PyPDF2 import PdfReader
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from backend.pdf_extract import extract_text  # noqa: E402
+from backend.segmenter import MIN_CLAUSE_CHARS, split_clauses  # noqa: E402
 
 try:
     from reportlab.lib.pagesizes import letter
@@ -25,11 +32,17 @@ except Exception:
 
 BACKEND_URL = "http://127.0.0.1:8000"
 ANALYZE_ENDPOINT = f"{BACKEND_URL}/analyze"
+ANALYZE_STREAM_ENDPOINT = f"{BACKEND_URL}/analyze/stream"
+ANALYZE_PDF_ENDPOINT = f"{BACKEND_URL}/analyze/pdf"
 NEGOTIATE_ENDPOINT = f"{BACKEND_URL}/negotiate"
+NEGOTIATE_STREAM_ENDPOINT = f"{BACKEND_URL}/negotiate/stream"
+NEGOTIATE_BATCH_STREAM_ENDPOINT = f"{BACKEND_URL}/negotiate/batch/stream"
 MEDIATE_ENDPOINT = f"{BACKEND_URL}/mediate"
 FEEDBACK_ENDPOINT = f"{BACKEND_URL}/feedback"
+ANALYSES_ENDPOINT = f"{BACKEND_URL}/analyses"
 
 TIMEOUT_SECONDS = 600
+PREVIEW_PAGES = 10
 
 PRIMARY = "#0B5D1E"      # Deep Kenyan Green
 ACCENT = "#CFAA4A"       # Gold trim (premium)
@@ -191,17 +204,19 @@ small.muted {{
     unsafe_allow_html=True,
 )
 
-def read_pdf(file) -> str:
-    """Extract text from uploaded PDF using PyPDF2."""
+def read_pdf(file, max_pages=None) -> str:
+    """
+    Extract text from uploaded PDF (shared, cached extractor), optionally
+    only the first `max_pages` pages. The file is rewound so it can be
+    uploaded afterwards.
+    """
     try:
-        pdf_reader = PdfReader(file)
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text() or ""
-        return text.strip()
+        return extract_text(file, max_pages=max_pages)
     except Exception as e:
         st.error(f"Failed to read PDF: {e}")
         return ""
+    finally:
+        file.seek(0)
 
 
 def robust_post_json(url: str, payload: dict, timeout=TIMEOUT_SECONDS):
@@ -225,20 +240,46 @@ def robust_post_json(url: str, payload: dict, timeout=TIMEOUT_SECONDS):
         return False, resp.text
 
 
-def extract_clauses_simple(text: str, min_len=40):
+def stream_post_ndjson(url: str, payload: dict, timeout=TIMEOUT_SECONDS, files=None):
     """
-    Lightweight heuristic clause splitter:
-    - Splits by numbered items & blank lines.
+    POST JSON (or, with `files`, a multipart upload with `payload` as form
+    fields) to a streaming backend endpoint and yield each NDJSON event
+    as a dict while the backend is still producing the rest.
+    Raises RuntimeError on transport or HTTP errors.
     """
-    import re
+    try:
+        if files:
+            resp = requests.post(
+                url, data=payload, files=files, timeout=timeout, stream=True
+            )
+        else:
+            resp = requests.post(
+                url,
+                json=payload,
+                timeout=timeout,
+                headers={"Content-Type": "application/json"},
+                stream=True,
+            )
+    except requests.exceptions.RequestException as e:
+        raise RuntimeError(f"Request failed: {e}")
 
-    lines = [l.rstrip() for l in text.splitlines()]
-    joined = "\n".join(lines)
-    pieces = re.split(
-        r"\n\s*\d+\.\s+|\n\s*\d+\)\s+|\n\s*[A-Za-z]\)\s+|\n\s*\n\s*", joined
-    )
-    clauses = [p.strip() for p in pieces if len(p.strip()) >= min_len]
-    return clauses
+    with resp:
+        if resp.status_code != 200:
+            raise RuntimeError(f"HTTP {resp.status_code}: {resp.text}")
+        try:
+            for line in resp.iter_lines(decode_unicode=True):
+                if line:
+                    yield json.loads(line)
+        except requests.exceptions.RequestException as e:
+            raise RuntimeError(f"Stream interrupted: {e}")
+
+
+def extract_clauses_simple(text: str, min_len=MIN_CLAUSE_CHARS):
+    """
+    Clause preview using the backend's segmenter, so the preview shows the
+    same clauses the analysis will.
+    """
+    return split_clauses(text, min_chars=min_len)
 
 
 def export_analysis_pdf(title: str, contract_text: str, clauses_analysis: list):
@@ -291,22 +332,10 @@ def export_analysis_pdf(title: str, contract_text: str, clauses_analysis: list):
 
         y -= 6
         analysis = ca.get("analysis") or {}
-        if isinstance(analysis, dict):
-            summary = (
-                analysis.get("clause_summary")
-                or analysis.get("summary")
-                or analysis.get("issue")
-                or ""
-            )
-            revision = (
-                analysis.get("suggested_revision")
-                or analysis.get("revision")
-                or analysis.get("recommendation")
-                or ""
-            )
-            line = f"Summary: {summary} | Suggested: {revision}"
-        else:
-            line = str(analysis)[:400]
+        line = (
+            f"Summary: {analysis.get('clause_summary', '')} | "
+            f"Suggested: {analysis.get('suggested_revision', '')}"
+        )
 
         for chunk in [line[i : i + 110] for i in range(0, len(line), 110)]:
             c.drawString(margin + 10, y, chunk)
@@ -331,111 +360,104 @@ def make_download_button(data_bytes: bytes, filename: str, mime: str):
     return href
 
 
-def _maybe_to_list(x):
-    if x is None:
-        return []
-    if isinstance(x, list):
-        return x
-    return [x]
-
-
-def _pretty_dict_like_string(value: str):
-    """
-    If value looks like a dict JSON string, try to pretty them as bullet lines.
-    Otherwise return value.
-    """
-    import json
-
-    v = str(value).strip()
-    if not v.startswith("{"):
-        return None
-    try:
-        obj = json.loads(v)
-    except Exception:
-        return None
-    if not isinstance(obj, dict):
-        return None
-    lines = []
-    for k, val in obj.items():
-        lines.append(f"- **{k.replace('_', ' ').title()}**: {val}")
-    return "\n".join(lines)
-
-
 def render_clause_analysis_block(analysis: dict):
     """
-    Render a single clause's analysis in a user-friendly, Kenyan-law oriented format.
-    Handles:
-    - clause_summary / summary
-    - issues / risks
-    - compliance_notes
-    - suggested_revision / revision / recommendation
+    Render a single clause's analysis (the backend's ClauseAnalysis schema:
+    clause_summary, issues, compliance_notes, suggested_revision).
     """
 
     if not isinstance(analysis, dict):
         st.write(str(analysis))
         return
 
-    summary = (
-        analysis.get("clause_summary")
-        or analysis.get("summary")
-        or analysis.get("issue")
-        or analysis.get("analysis")
-    )
-
-    if summary:
+    if analysis.get("clause_summary"):
         st.markdown("**Summary**")
-        if isinstance(summary, dict):
-            for k, v in summary.items():
-                st.markdown(f"- **{k.replace('_', ' ').title()}**: {v}")
-        else:
-            pretty = _pretty_dict_like_string(str(summary))
-            if pretty:
-                st.markdown(pretty, unsafe_allow_html=True)
-            else:
-                st.write(summary)
+        st.write(analysis["clause_summary"])
 
-    issues = analysis.get("issues") or analysis.get("risks") or analysis.get("risk")
-    issues_list = _maybe_to_list(issues)
-    if issues_list:
+    if analysis.get("issues"):
         st.markdown("**Issues / Risks**")
-        for item in issues_list:
-            if isinstance(item, dict):
-                section = item.get("section") or item.get("area") or ""
-                concern = item.get("concern") or item.get("detail") or str(item)
-                if section:
-                    st.markdown(f"- **{section}** — {concern}")
-                else:
-                    st.markdown(f"- {concern}")
-            else:
-                st.markdown(f"- {item}")
+        for item in analysis["issues"]:
+            st.markdown(f"- {item}")
 
-    compliance = (
-        analysis.get("compliance_notes")
-        or analysis.get("legal_refs")
-        or analysis.get("law_notes")
-    )
-    comp_list = _maybe_to_list(compliance)
-    if comp_list:
+    if analysis.get("compliance_notes"):
         st.markdown("**Compliance Notes (Kenyan law focus)**")
-        for note in comp_list:
+        for note in analysis["compliance_notes"]:
             st.markdown(f"- {note}")
 
-    suggested = (
-        analysis.get("suggested_revision")
-        or analysis.get("revision")
-        or analysis.get("recommendation")
-    )
-    if suggested:
+    if analysis.get("suggested_revision"):
         st.markdown("**Suggested Revision**")
-        if isinstance(suggested, dict):
-            for k, v in suggested.items():
-                st.markdown(f"- **{k.replace('_', ' ').title()}**: {v}")
+        st.write(analysis["suggested_revision"])
+
+
+def render_clause_result(i: int, cl):
+    """Render one clause entry from /analyze (header + expandable reasoning)."""
+    clause_text = cl.get("clause") if isinstance(cl, dict) else str(cl)
+    analysis = cl.get("analysis") if isinstance(cl, dict) else {}
+
+    short_snip = clause_text[:120].replace("\n", " ")
+    change = cl.get("status") if isinstance(cl, dict) else None
+    chip = f" <span class='clause-chip'>{change}</span>" if change else ""
+    st.markdown(
+        f"**Clause {i}**{chip} &nbsp;&nbsp;"
+        f"<span class='label-muted'>{short_snip}...</span>",
+        unsafe_allow_html=True,
+    )
+
+    with st.expander("View clause & AI reasoning", expanded=(i <= 2)):
+        st.markdown("**Clause text**")
+        st.write(clause_text)
+
+        st.markdown("---")
+        st.markdown("**AI Reasoning (Kenyan law)**")
+        if isinstance(cl, dict) and cl.get("duplicate_of") is not None:
+            st.caption(
+                f"Near-duplicate of clause {cl['duplicate_of'] + 1} "
+                f"({cl.get('similarity', 0):.0%} similar); its analysis is reused."
+            )
+        elif isinstance(cl, dict) and cl.get("near_duplicate"):
+            st.caption("Near-duplicate of a previously analysed clause; its analysis is reused.")
+        error = cl.get("error") if isinstance(cl, dict) else None
+        if error:
+            st.error(f"Clause analysis failed: {error}")
         else:
-            pretty = _pretty_dict_like_string(str(suggested))
-            if pretty:
-                st.markdown(pretty, unsafe_allow_html=True)
-            else:
-                st.write(suggested)
+            render_clause_analysis_block(analysis)
+
+
+def render_negotiation_result(payload: dict, transcript=None):
+    """
+    Render a NegotiationResult (or its error). `transcript`, from a streamed
+    negotiation, also shows the user's interjections between turns.
+    """
+    if payload.get("error"):
+        st.error(payload["error"])
+        if payload.get("raw_output"):
+            st.code(payload["raw_output"])
+        return
+
+    st.markdown("### Simulated Negotiation")
+    n = 0
+    for turn in transcript or payload["dialogue"]:
+        if turn["party"] == "user":
+            st.markdown(f"- 📝 **Your note:** {turn['text']}")
+        else:
+            n += 1
+            st.markdown(f"- **Turn {n} – Party {turn['party']}:** {turn['text']}")
+
+    st.markdown("### Proposed Revised Clause")
+    st.markdown(payload["mutually_beneficial_revision"])
+
+    if payload["tradeoffs"]:
+        st.markdown("### Trade-offs")
+        for item in payload["tradeoffs"]:
+            st.markdown(f"- {item}")
+
+    st.markdown("### Justification (Win–Win Rationale)")
+    st.markdown(payload["win_win_justification"])
+
+    if payload["legal_refs"]:
+        st.markdown("### Legal References")
+        for ref in payload["legal_refs"]:
+            st.markdown(f"- {ref}")
 
 
 if "past_analyses" not in st.session_state:
@@ -495,6 +517,7 @@ if page == "Contract Analysis":
     col_left, col_right = st.columns([1.8, 2.2], gap="large")
 
     contract_text = ""
+    is_pdf = False
 
     with col_left:
         st.markdown('<div class="card-panel">', unsafe_allow_html=True)
@@ -510,7 +533,10 @@ if page == "Contract Analysis":
                 unsafe_allow_html=True,
             )
             if uploaded_file.type == "application/pdf":
-                contract_text = read_pdf(uploaded_file)
+                # Only the first pages are read here for the preview; the full
+                # document is extracted page by page on the backend.
+                is_pdf = True
+                contract_text = read_pdf(uploaded_file, max_pages=PREVIEW_PAGES)
             else:
                 try:
                     contract_text = uploaded_file.read().decode("utf-8")
@@ -532,6 +558,11 @@ if page == "Contract Analysis":
             )
 
         st.markdown("<hr class='hr-soft'/>", unsafe_allow_html=True)
+        contract_id = st.text_input(
+            "Contract ID (optional)",
+            help="Reuse the same ID for each revision of a contract: only new "
+            "and changed clauses are re-analysed.",
+        ).strip()
         analyze_btn = st.button("🔍 Analyze Contract", use_container_width=True)
 
         st.markdown("</div>", unsafe_allow_html=True)  # end card-panel
@@ -543,9 +574,10 @@ if page == "Contract Analysis":
         if contract_text:
             with st.spinner("Detecting clauses from your contract..."):
                 clauses = extract_clauses_simple(contract_text)
+                scope = f" in the first {PREVIEW_PAGES} pages" if is_pdf else ""
                 st.markdown(
-                    f"Detected **{len(clauses)}** potential clauses "
-                    "(simple heuristic: numbered items + paragraphs)."
+                    f"Detected **{len(clauses)}** potential clauses{scope} "
+                    "(numbered sections, sub-items and titled clauses)."
                 )
                 st.markdown("<br/>", unsafe_allow_html=True)
 
@@ -572,17 +604,93 @@ if page == "Contract Analysis":
             st.error("Please upload a contract first.")
         else:
             st.markdown("----")
-            with st.spinner("Running clause-by-clause legal analysis…"):
-                ok, resp = robust_post_json(
-                    ANALYZE_ENDPOINT, {"text": contract_text}, timeout=600
+            st.subheader("📑 Clause Analyses")
+            status = st.empty()
+            progress = st.progress(0.0)
+            status.info("Running clause-by-clause legal analysis…")
+
+            clauses_list = []
+            slots = []
+            total = 0
+            done = 0
+            failed = 0
+            stream_error = None
+
+            if is_pdf:
+                # The total is unknown up front: clauses are split and
+                # analysed as the backend reads each page.
+                events = stream_post_ndjson(
+                    ANALYZE_PDF_ENDPOINT,
+                    {"contract_id": contract_id} if contract_id else {},
+                    timeout=TIMEOUT_SECONDS,
+                    files={"file": (uploaded_file.name, uploaded_file, "application/pdf")},
+                )
+            else:
+                payload = {"text": contract_text}
+                if contract_id:
+                    payload["contract_id"] = contract_id
+                events = stream_post_ndjson(
+                    ANALYZE_STREAM_ENDPOINT, payload, timeout=TIMEOUT_SECONDS
                 )
 
-            if not ok:
-                st.error("Contract analysis failed or backend returned non-JSON.")
-                st.code(str(resp))
+            try:
+                for event in events:
+                    kind = event.get("type")
+                    if kind in ("start", "revision"):
+                        if "total" in event:
+                            total = event.get("total") or 0
+                            clauses_list = [None] * total
+                            slots = [st.empty() for _ in range(total)]
+                            if not total:
+                                status.warning("No clauses detected in this contract.")
+                        if event.get("previous_version"):
+                            st.caption(
+                                f"Revision of **{event['contract_id']}** (previous version "
+                                f"{event['previous_version']}): {event['new']} new, "
+                                f"{event['changed']} changed, {event['unchanged']} unchanged, "
+                                f"{len(event['removed'])} removed."
+                            )
+                    elif kind == "clause":
+                        idx = event["index"]
+                        cl = {
+                            k: v for k, v in event.items() if k not in ("type", "index")
+                        }
+                        # Placeholders are created up to idx so clauses stay
+                        # in document order even when the total is unknown.
+                        while len(slots) <= idx:
+                            slots.append(st.empty())
+                            clauses_list.append(None)
+                        clauses_list[idx] = cl
+                        done += 1
+                        if cl.get("error"):
+                            failed += 1
+                        with slots[idx].container():
+                            render_clause_result(idx + 1, cl)
+                        if total:
+                            progress.progress(done / total)
+                            status.info(f"Analysed {done} of {total} clauses…")
+                        else:
+                            status.info(f"Analysed {done} clauses so far…")
+                    elif kind == "error":
+                        stream_error = event.get("error")
+                progress.progress(1.0)
+            except RuntimeError as e:
+                stream_error = str(e)
+
+            if stream_error:
+                status.error("Contract analysis failed or stream was interrupted.")
+                st.code(stream_error)
+            elif failed:
+                status.warning(
+                    f"Analysis complete, but {failed} clause(s) could not be analysed."
+                )
             else:
-                st.success("Analysis complete.")
+                status.success("Analysis complete.")
+
+            clauses_list = [cl for cl in clauses_list if cl is not None]
+            resp = {"clauses": clauses_list, "failed": failed}
 
+            if clauses_list:
                 entry = {
                     "timestamp": datetime.utcnow().isoformat(),
                     "filename": uploaded_file.name if uploaded_file else "pasted_text",
@@ -591,37 +699,7 @@ if page == "Contract Analysis":
                 }
                 st.session_state.past_analyses.insert(0, entry)
 
-                clauses_list = resp.get("clauses") or []
-                st.subheader("📑 Clause Analyses")
-
-                for i, cl in enumerate(clauses_list, start=1):
-                    clause_text = (
-                        cl.get("clause")
-                        if isinstance(cl, dict)
-                        else str(cl)
-                    )
-                    analysis = (
-                        cl.get("analysis")
-                        if isinstance(cl, dict)
-                        else {}
-                    )
-
-                    short_snip = clause_text[:120].replace("\n", " ")
-                    st.markdown(
-                        f"**Clause {i}** &nbsp;&nbsp;"
-                        f"<span class='label-muted'>{short_snip}...</span>",
-                        unsafe_allow_html=True,
-                    )
-
-                    with st.expander("View clause & AI reasoning", expanded=(i <= 2)):
-                        st.markdown("**Clause text**")
-                        st.write(clause_text)
-
-                        st.markdown("---")
-                        st.markdown("**AI Reasoning (Kenyan law)**")
-                        render_clause_analysis_block(analysis)
-
-                if REPORTLAB_AVAILABLE and clauses_list:
+                if REPORTLAB_AVAILABLE:
                     pdf_bytes = export_analysis_pdf(
                         f"Contract Analysis - {entry['filename']}",
                         contract_text,
@@ -668,8 +746,25 @@ elif page == "Negotiation Simulator":
             key="neg_position",
         )
 
+        max_turns = st.slider(
+            "Maximum turns", min_value=2, max_value=12, value=6, key="neg_max_turns",
+            help="The negotiation stops earlier if the parties converge.",
+        )
+
         simulate = st.button("🤝 Simulate Negotiation", use_container_width=True)
 
+        interjection = st.text_area(
+            "Interject (note to both parties)",
+            height=80,
+            key="neg_interjection",
+            help="Continues the latest negotiation with your note taken into account.",
+        )
+        resume = st.button(
+            "▶️ Continue with note",
+            use_container_width=True,
+            disabled=not st.session_state.negotiation_history,
+        )
+
         if st.button("🧹 Clear Negotiation History", use_container_width=True):
             st.session_state.negotiation_history = []
             st.success("History cleared.")
@@ -694,31 +789,86 @@ elif page == "Negotiation Simulator":
         st.markdown('<div class="card-panel">', unsafe_allow_html=True)
         st.subheader("Negotiation Output")
 
+        request = None
         if simulate:
             if not clause_in.strip() or not counter_pos.strip():
                 st.error("Please fill in both the clause and counterparty position.")
             else:
-                with st.spinner("Simulating negotiation via backend…"):
-                    ok, resp = robust_post_json(
-                        NEGOTIATE_ENDPOINT,
-                        {"clause": clause_in, "position": counter_pos},
-                        timeout=90,
-                    )
-                if not ok:
-                    st.error("Negotiation failed.")
-                    st.code(str(resp))
+                request = {"clause": clause_in, "position": counter_pos}
+        elif resume:
+            if not interjection.strip():
+                st.error("Please write a note to interject.")
+            else:
+                previous = st.session_state.negotiation_history[0]
+                request = {
+                    "clause": previous["clause"],
+                    "position": previous["position"],
+                    "history": previous.get("transcript", []),
+                    "interjection": interjection,
+                }
+
+        if request:
+            # Turns are rendered as their text streams in; the finished
+            # negotiation replaces this live view below.
+            status = st.empty()
+            live = st.empty()
+            turns = {}
+            done = None
+            stream_error = None
+            status.info("Negotiating…")
+            try:
+                for event in stream_post_ndjson(
+                    NEGOTIATE_STREAM_ENDPOINT,
+                    {**request, "max_turns": max_turns},
+                    timeout=TIMEOUT_SECONDS,
+                ):
+                    kind = event.get("type")
+                    if kind == "delta":
+                        turn = turns.setdefault(
+                            event["index"], {"party": event["party"], "text": ""}
+                        )
+                        turn["text"] += event["text"]
+                    elif kind == "turn":
+                        turns[event["index"]] = {
+                            "party": event["party"], "text": event["text"]
+                        }
+                        if event.get("accepts"):
+                            status.info(f"Party {event['party']} accepted — summarising…")
+                    elif kind == "error":
+                        stream_error = event.get("error")
+                        if event.get("raw_output"):
+                            stream_error += f"\n\n{event['raw_output']}"
+                    elif kind == "done":
+                        done = event
+                    if kind in ("delta", "turn"):
+                        live.markdown(
+                            "\n".join(
+                                f"- **Party {t['party']}:** {t['text']}"
+                                for _, t in sorted(turns.items())
+                            )
+                        )
+            except RuntimeError as e:
+                stream_error = str(e)
+
+            if done:
+                live.empty()
+                st.session_state.negotiation_history.insert(
+                    0,
+                    {
+                        "time": datetime.utcnow().isoformat(),
+                        "clause": request["clause"],
+                        "position": request["position"],
+                        "result": done["result"],
+                        "transcript": done["transcript"],
+                    },
+                )
+                if done["converged"]:
+                    status.success("The parties converged on a revised clause.")
                 else:
-                    payload = resp.get("result", resp)
-                    st.session_state.negotiation_history.insert(
-                        0,
-                        {
-                            "time": datetime.utcnow().isoformat(),
-                            "clause": clause_in,
-                            "position": counter_pos,
-                            "result": payload,
-                        },
-                    )
-                    st.success("Negotiation simulated successfully.")
+                    status.warning("Turn limit reached without full agreement.")
+            else:
+                status.error("Negotiation failed or stream was interrupted.")
+                st.code(stream_error or "No result received.")
 
         if not st.session_state.negotiation_history:
             st.info("No negotiation runs yet. Fill in details and click *Simulate Negotiation*.")
@@ -731,34 +881,105 @@ elif page == "Negotiation Simulator":
             st.write(f"- **Counterparty position:** {latest['position']}")
             st.markdown("---")
 
-            if isinstance(payload, dict):
-                dialogue = payload.get("negotiation") or payload.get("dialogue")
-                revision = payload.get("revised_clause") or payload.get(
-                    "mutually_beneficial_revision"
-                )
-                justification = (
-                    payload.get("justification")
-                    or payload.get("win_win_justification")
-                    or payload.get("win-win")
-                )
+            render_negotiation_result(payload, latest.get("transcript"))
 
-                if dialogue:
-                    st.markdown("### Simulated Negotiation")
-                    for turn in dialogue:
-                        st.markdown(f"- {turn}")
+        st.markdown("</div>", unsafe_allow_html=True)
 
-                if revision:
-                    st.markdown("### Proposed Revised Clause")
-                    st.markdown(revision)
+    st.markdown("---")
+    st.subheader("📝 Whole-Contract Redlining")
+    st.markdown(
+        "<span class='label-muted'>Negotiate every clause flagged in your latest contract analysis in one go.</span>",
+        unsafe_allow_html=True,
+    )
 
-                if justification:
-                    st.markdown("### Justification (Win–Win Rationale)")
-                    st.markdown(justification)
+    latest_analysis = (
+        st.session_state.past_analyses[0] if st.session_state.past_analyses else None
+    )
+    flagged = [
+        cl
+        for cl in (latest_analysis["results"]["clauses"] if latest_analysis else [])
+        if isinstance(cl, dict)
+        and not cl.get("error")
+        and (cl.get("analysis") or {}).get("issues")
+    ]
+
+    if not latest_analysis:
+        st.info("Analyse a contract first; its flagged clauses will be listed here.")
+    elif not flagged:
+        st.success(f"No clauses with issues in **{latest_analysis['filename']}**.")
+    else:
+        st.caption(
+            f"{len(flagged)} flagged clause(s) in **{latest_analysis['filename']}**. "
+            "Each is negotiated against the position below plus the issues found for it."
+        )
+        batch_position = st.text_area(
+            "Counterparty position (applies to every clause)",
+            height=100,
+            key="batch_position",
+        )
+        if st.button("🤝 Negotiate All Flagged Clauses", use_container_width=True):
+            items = [
+                {
+                    "clause": cl["clause"],
+                    "position": (
+                        f"{batch_position.strip()}\n"
+                        f"Issues raised in review: {'; '.join(cl['analysis']['issues'])}"
+                    ).strip(),
+                }
+                for cl in flagged
+            ]
+            status = st.empty()
+            progress = st.progress(0.0)
+            slots = [st.empty() for _ in items]
+            results = [None] * len(items)
+            done = 0
+            summary = None
+            stream_error = None
+            status.info(f"Negotiating {len(items)} clauses…")
+            try:
+                for event in stream_post_ndjson(
+                    NEGOTIATE_BATCH_STREAM_ENDPOINT, {"items": items}, timeout=TIMEOUT_SECONDS
+                ):
+                    kind = event.get("type")
+                    if kind == "item":
+                        idx = event["index"]
+                        results[idx] = event
+                        done += 1
+                        with slots[idx].container():
+                            snip = event["clause"][:120].replace("\n", " ")
+                            with st.expander(
+                                f"Clause {idx + 1}: {snip}…",
+                                expanded=bool(event["result"].get("error")),
+                            ):
+                                render_negotiation_result(event["result"])
+                        progress.progress(done / len(items))
+                        status.info(f"Negotiated {done} of {len(items)} clauses…")
+                    elif kind == "done":
+                        summary = event
+            except RuntimeError as e:
+                stream_error = str(e)
+
+            if stream_error or not summary:
+                status.error("Batch negotiation failed or stream was interrupted.")
+                st.code(stream_error or "No summary received.")
             else:
-                st.markdown("### Negotiation Output")
-                st.markdown(str(payload))
+                timing = summary["timing"]
+                message = (
+                    f"Negotiated {summary['total']} clauses in {timing['seconds']:.1f}s "
+                    f"({timing['sequential_seconds']:.1f}s one after another)."
+                )
+                if summary["failed"]:
+                    status.warning(f"{message} {summary['failed']} failed.")
+                else:
+                    status.success(message)
 
-        st.markdown("</div>", unsafe_allow_html=True)
+            if any(results):
+                st.download_button(
+                    "Download Redlining Results (JSON)",
+                    data=json.dumps([r for r in results if r], indent=2),
+                    file_name=f"redlining_{int(time.time())}.json",
+                    mime="application/json",
+                )
 
 elif page == "Mediation Agent":
     st.header("🕊️ Mediation Agent")
@@ -793,51 +1014,30 @@ elif page == "Mediation Agent":
                 st.error("Mediation failed or backend non-JSON response.")
                 st.code(str(resp))
             else:
-                st.success("Mediation result")
-                payload = resp.get("result", resp)
-
-                if isinstance(payload, dict) and "result" in payload:
-                    payload = payload["result"]
-
-                import json
-
-                if isinstance(payload, str):
-                    try:
-                        parsed = json.loads(payload)
-                        payload = parsed
-                    except Exception:
-                        pass
-
-                if isinstance(payload, dict):
-                    neutral = payload.get("neutral_summary")
-                    int_a = payload.get("interests_party_a")
-                    int_b = payload.get("interests_party_b")
-                    evaluation = payload.get("evaluation")
-                    compromise = payload.get("proposed_compromise")
-
-                    if neutral:
-                        st.markdown("**Neutral Summary**")
-                        st.markdown(neutral)
-
-                    if int_a:
-                        st.markdown("**Interests — Party A**")
-                        for x in _maybe_to_list(int_a):
-                            st.markdown(f"- {x}")
-
-                    if int_b:
-                        st.markdown("**Interests — Party B**")
-                        for x in _maybe_to_list(int_b):
-                            st.markdown(f"- {x}")
-
-                    if evaluation:
-                        st.markdown("**Objective Evaluation**")
-                        st.markdown(evaluation)
-
-                    if compromise:
-                        st.markdown("**Proposed Compromise**")
-                        st.markdown(compromise)
+                payload = resp["result"]
+
+                if payload.get("error"):
+                    st.error(payload["error"])
+                    if payload.get("raw_output"):
+                        st.code(payload["raw_output"])
                 else:
-                    st.markdown(str(payload))
+                    st.success("Mediation result")
+                    st.markdown("**Neutral Summary**")
+                    st.markdown(payload["neutral_summary"])
+
+                    st.markdown("**Interests — Party A**")
+                    for x in payload["interests_party_a"]:
+                        st.markdown(f"- {x}")
+
+                    st.markdown("**Interests — Party B**")
+                    for x in payload["interests_party_b"]:
+                        st.markdown(f"- {x}")
+
+                    st.markdown("**Objective Evaluation**")
+                    st.markdown(payload["evaluation"])
+
+                    st.markdown("**Proposed Compromise**")
+                    st.markdown(payload["proposed_compromise"])
     else:
         st.caption("Mediation result will appear here after you click *Run Mediation*.")
     st.markdown("</div>", unsafe_allow_html=True)
@@ -864,6 +1064,31 @@ elif page == "Past Analyses":
                     mime="application/json",
                 )
 
+    st.markdown("----")
+    st.subheader("🗄️ Stored analyses (all sessions)")
+    try:
+        resp = requests.get(ANALYSES_ENDPOINT, params={"limit": 20}, timeout=TIMEOUT_SECONDS)
+        resp.raise_for_status()
+        stored = resp.json().get("contracts", [])
+    except Exception as e:
+        stored = []
+        st.caption(f"Could not load stored analyses: {e}")
+
+    for row in stored:
+        when = datetime.utcfromtimestamp(row["created_at"]).isoformat(timespec="seconds")
+        name = row.get("filename") or row.get("contract_id") or f"{row['source']} upload"
+        version = f" • v{row['version']}" if row.get("version") else ""
+        st.markdown(
+            f"**{name}**{version} <span class='label-muted'>{when} • "
+            f"{row['clause_count']} clauses ({row['failed']} failed)</span>",
+            unsafe_allow_html=True,
+        )
+        # Clause results render their own expanders, which cannot be nested.
+        if st.button("Load clauses", key=f"stored_{row['id']}"):
+            detail = requests.get(f"{ANALYSES_ENDPOINT}/{row['id']}", timeout=TIMEOUT_SECONDS)
+            for i, cl in enumerate(detail.json().get("clauses", []), start=1):
+                render_clause_result(i, cl)
+
 elif page == "Feedback":
     st.header("💬 Feedback")
     st.markdown(
@@ -0,0 +1,118 @@
+import sys
+import json
+import asyncio
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+# Tests import the app packages (backend, database) from the repo root.
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+def _pdf(pages):
+    """A minimal PDF with one page per list of text lines (Helvetica, no compression)."""
+    def escape(line):
+        return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+    kids = " ".join(f"{4 + 2 * i} 0 R" for i in range(len(pages)))
+    objs = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>".encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i, lines in enumerate(pages):
+        body = " ".join(f"({escape(line)}) Tj T*" for line in lines)
+        data = f"BT /F1 12 Tf 14 TL 72 720 Td {body} ET".encode("latin-1")
+        objs.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>".encode()
+        )
+        objs.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(data), data))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for n, obj in enumerate(objs, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (n, obj)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objs) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objs) + 1, xref)
+    return bytes(out)
+
+
+@pytest.fixture
+def make_pdf():
+    return _pdf
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """Point the shared database at a fresh file."""
+    from database import models
+
+    pool = models.ConnectionPool(path=tmp_path / "app.sqlite3")
+    monkeypatch.setattr(models, "_pool", pool)
+    yield pool
+    pool.close()
+
+
+class FakeLLM:
+    """
+    Stands in for `chat_completion` in clause analysis. A clause sleeps for
+    `delays[clause]` seconds (default 0); clauses containing "FAIL" raise.
+    Tracks calls and the largest number of calls in flight at once.
+    """
+
+    def __init__(self):
+        self.delays = {}
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __call__(self, messages, **kwargs):
+        clause = messages[-1]["content"].split("CLAUSE TO ANALYSE:\n", 1)[-1]
+        self.calls.append(clause)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delays.get(clause, 0))
+            if "FAIL" in clause:
+                raise RuntimeError("upstream 500")
+        finally:
+            self.in_flight -= 1
+        content = json.dumps({
+            "clause_summary": clause[:40],
+            "issues": [],
+            "compliance_notes": [],
+            "suggested_revision": clause,
+        })
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    """Clause analysis against FakeLLM: no cache, no retrieval."""
+    from backend import analysis, reasoning
+
+    async def no_context(queries, **kwargs):
+        return [[] for _ in queries]
+
+    async def no_retrieval(query, **kwargs):
+        return []
+
+    llm = FakeLLM()
+    monkeypatch.setattr(reasoning, "chat_completion", llm)
+    monkeypatch.setattr(reasoning, "retrieve", no_retrieval)
+    monkeypatch.setattr(analysis, "retrieve_many", no_context)
+    monkeypatch.setattr(analysis, "CACHE_ENABLED", False)
+    return llm
+
+
+@pytest.fixture
+def client(db, fake_llm):
+    from fastapi.testclient import TestClient
+    from backend.main import app
+
+    return TestClient(app)
@@ -0,0 +1,60 @@
+import asyncio
+
+from backend.analysis import analyze_clauses, iter_clause_analyses, iter_streamed_clause_analyses
+
+CLAUSES = [f"Clause {i}: the tenant shall pay rent on day {i}." for i in range(6)]
+
+
+def test_results_keep_clause_order_under_out_of_order_completion(fake_llm):
+    # Earlier clauses take longest, so they finish last.
+    fake_llm.delays = {c: 0.01 * (len(CLAUSES) - i) for i, c in enumerate(CLAUSES)}
+    output = asyncio.run(analyze_clauses(CLAUSES, max_concurrency=6))
+    assert [e["clause"] for e in output] == CLAUSES
+    assert all(e["analysis"]["suggested_revision"] == e["clause"] for e in output)
+    assert fake_llm.calls[0] == CLAUSES[0]
+
+
+def test_concurrency_is_bounded(fake_llm):
+    fake_llm.delays = dict.fromkeys(CLAUSES, 0.01)
+    asyncio.run(analyze_clauses(CLAUSES, max_concurrency=2))
+    assert fake_llm.max_in_flight == 2
+    assert len(fake_llm.calls) == len(CLAUSES)
+
+
+def test_one_failure_does_not_sink_the_batch(fake_llm):
+    clauses = CLAUSES[:2] + ["FAIL: the landlord may enter at any time."] + CLAUSES[2:4]
+    output = asyncio.run(analyze_clauses(clauses, max_concurrency=3))
+    assert [e["clause"] for e in output] == clauses
+    assert output[2]["analysis"] is None
+    assert output[2]["error"] == "LLM request failed: upstream 500"
+    assert all("error" not in e for i, e in enumerate(output) if i != 2)
+
+
+def test_iter_yields_in_completion_order(fake_llm):
+    fake_llm.delays = {CLAUSES[0]: 0.05}
+
+    async def collect():
+        return [i async for i, _ in iter_clause_analyses(CLAUSES[:3], max_concurrency=3)]
+
+    assert asyncio.run(collect())[-1] == 0
+
+
+def test_streamed_input_is_pulled_only_when_a_slot_frees(fake_llm):
+    fake_llm.delays = dict.fromkeys(CLAUSES, 0.01)
+    pulled = []
+    finished = []
+
+    async def source():
+        for clause in CLAUSES:
+            # Never more than `limit` clauses ahead of the finished ones.
+            assert len(pulled) - len(finished) <= 2
+            pulled.append(clause)
+            yield clause
+
+    async def collect():
+        async for index, entry in iter_streamed_clause_analyses(source(), max_concurrency=2):
+            finished.append(index)
+        return finished
+
+    assert sorted(asyncio.run(collect())) == list(range(len(CLAUSES)))
+    assert fake_llm.max_in_flight == 2
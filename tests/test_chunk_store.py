@@ -0,0 +1,54 @@
+import numpy as np
+
+from backend.chunk_store import OFFSET_DTYPE, ChunkStore
+
+
+def open_store(tmp_path, limit=None):
+    return ChunkStore(tmp_path / "meta.jsonl", tmp_path / "meta.offsets", limit=limit)
+
+
+def test_append_is_readable_before_and_after_flush(tmp_path):
+    store = open_store(tmp_path)
+    store.append("chunk 0", {"n": 0})
+    assert store.dirty and len(store) == 1 and store.persisted == 0
+    assert store.chunk(0) == "chunk 0"
+    store.flush()
+    store.append("chunk 1", {"n": 1})
+    assert store.persisted == 1 and len(store) == 2
+    assert store.metadata(0) == {"n": 0} and store.chunk(1) == "chunk 1"
+
+
+def test_reopen_truncates_to_limit(tmp_path):
+    store = open_store(tmp_path)
+    for i in range(3):
+        store.append(f"chunk {i}", {})
+    store.flush()
+    # The index was only written for two vectors before a crash.
+    reopened = open_store(tmp_path, limit=2)
+    assert len(reopened) == 2
+    assert reopened.chunk(1) == "chunk 1"
+    assert open_store(tmp_path).persisted == 2
+
+
+def test_repair_drops_torn_offsets_entry(tmp_path):
+    store = open_store(tmp_path)
+    store.append("chunk 0", {})
+    store.flush()
+    # An offsets entry whose data row never reached the disk.
+    with open(tmp_path / "meta.offsets", "ab") as f:
+        f.write(np.asarray([10_000], dtype=OFFSET_DTYPE).tobytes())
+    reopened = open_store(tmp_path)
+    assert len(reopened) == 1 and reopened.chunk(0) == "chunk 0"
+
+
+def test_missing_offsets_are_rebuilt(tmp_path):
+    store = open_store(tmp_path)
+    store.append("a", {})
+    store.append("b", {})
+    store.flush()
+    del store
+    (tmp_path / "meta.offsets").unlink()
+    with open(tmp_path / "meta.jsonl", "ab") as f:
+        f.write(b'{"chunk": "torn')  # partial row without newline
+    reopened = open_store(tmp_path)
+    assert [reopened.chunk(i) for i in range(len(reopened))] == ["a", "b"]
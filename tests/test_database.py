@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from backend import routes
+from database import models
+from database.models import ConnectionPool, ContractWriter, PoolTimeout
+
+
+@pytest.fixture
+def pool(tmp_path, monkeypatch):
+    pool = ConnectionPool(path=tmp_path / "db.sqlite3", size=2)
+    monkeypatch.setattr(models, "_pool", pool)
+    yield pool
+    pool.close()
+
+
+def test_acquire_times_out_when_pool_is_exhausted(tmp_path):
+    pool = ConnectionPool(path=tmp_path / "db.sqlite3", size=1, acquire_timeout=0.05)
+    with pool.connection():
+        with pytest.raises(PoolTimeout):
+            with pool.connection():
+                pass
+    with pool.connection() as conn:
+        assert conn.execute("SELECT 1").fetchone()[0] == 1
+
+
+def test_writer_batches_and_totals(pool):
+    writer = ContractWriter(contract_id="c1", batch_size=2)
+    writer.add(1, {"clause": "B", "analysis": {"risk": "low"}})
+    writer.add(0, {"clause": "A", "error": "timeout"})
+    writer.add(2, {"clause": "C", "analysis": {"risk": "high"}})
+    contract_pk, version = writer.close()
+
+    assert version == 1
+    assert [e["clause"] for e in models.contract_analyses(contract_pk)] == ["A", "B", "C"]
+    (row,) = models.recent_contracts(contract_id="c1")
+    assert (row["clause_count"], row["failed"]) == (3, 1)
+
+
+def test_writer_opens_lazily_and_abort_drops_partial_upload(pool):
+    writer = ContractWriter(batch_size=2)
+    assert models.recent_contracts() == []
+    writer.add(0, {"clause": "A"})
+    writer.add(1, {"clause": "B"})  # flushes the first batch
+    (row,) = models.recent_contracts()
+    assert row["clause_count"] == 0
+
+    writer.add(2, {"clause": "C"})
+    writer.abort()
+    assert models.recent_contracts() == []
+    with pool.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM clauses").fetchone()[0] == 0
+        assert conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0] == 0
+
+
+def test_abort_after_close_keeps_the_upload(pool):
+    writer = ContractWriter()
+    writer.add(0, {"clause": "A"})
+    contract_pk, _ = writer.close()
+    writer.abort()
+    assert [row["id"] for row in models.recent_contracts()] == [contract_pk]
+
+
+def test_latest_version_follows_revisions(pool):
+    assert models.latest_version("c1") == (0, [])
+    models.save_contract_analysis([{"clause": "A"}], contract_id="c1")
+    models.save_contract_analysis([{"clause": "A"}, {"clause": "B"}], contract_id="c1")
+    version, rows = models.latest_version("c1")
+    assert version == 2
+    assert [h for h, _ in rows] == [models.clause_hash("A"), models.clause_hash("b ")]
+
+
+def test_store_history_swallows_errors():
+    def failing():
+        raise PoolTimeout("busy")
+
+    assert asyncio.run(routes._store_history(failing)) is None
+    assert asyncio.run(routes._store_history(lambda x: x * 2, 21)) == 42
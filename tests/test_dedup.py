@@ -0,0 +1,76 @@
+from backend import dedup
+
+LIABILITY = (
+    "The Supplier shall not be liable for any indirect or consequential loss "
+    "arising out of or in connection with the performance of this Agreement."
+)
+PAYMENT = (
+    "The Supplier shall pay the Client all amounts due under this Agreement "
+    "within thirty (30) days of receipt of a valid invoice."
+)
+
+
+def test_identical_wording_clusters():
+    variant = LIABILITY.replace("arising out of", "arising  out of")
+    reps = dedup.cluster([LIABILITY, variant])
+    assert [rep for rep, _, _ in reps] == [0, 0]
+
+
+def test_negation_is_not_a_duplicate():
+    flipped = LIABILITY.replace("shall not be liable", "shall be liable")
+    # Shingle overlap alone would group these at this threshold.
+    assert dedup.similarity(dedup.minhash(LIABILITY), dedup.minhash(flipped)) >= 0.5
+    reps = dedup.cluster([LIABILITY, flipped], threshold=0.5)
+    assert [rep for rep, _, _ in reps] == [0, 1]
+
+
+def test_role_swap_is_not_a_duplicate():
+    swapped = PAYMENT.replace("Supplier", "@").replace("Client", "Supplier").replace("@", "Client")
+    reps = dedup.cluster([PAYMENT, swapped], threshold=0.5)
+    assert [rep for rep, _, _ in reps] == [0, 1]
+
+
+def test_party_name_variants_are_duplicates():
+    lease = (
+        "The Landlord shall give the Tenant not less than thirty (30) days written "
+        "notice before entering the Premises for inspection or repairs."
+    )
+    renamed = lease.replace("Landlord", "Lessor").replace("Tenant", "Lessee")
+    reps = dedup.cluster([lease, renamed])
+    assert [rep for rep, _, _ in reps] == [0, 0]
+    assert reps[1][1] >= dedup.DEDUP_THRESHOLD
+
+
+def test_changed_amount_is_not_a_duplicate():
+    longer = PAYMENT.replace("thirty (30)", "sixty (60)")
+    reps = dedup.cluster([PAYMENT, longer], threshold=0.5)
+    assert [rep for rep, _, _ in reps] == [0, 1]
+
+
+def test_meaning_guard():
+    assert dedup.meaning_guard("Party A can't assign.") == "not\tparty a"
+    assert dedup.meaning_guard("pay KES 1,000.") == "1,000\tkes"
+
+
+def test_guards_match_ignores_renamed_parties_only():
+    guard = dedup.meaning_guard(PAYMENT)
+    renamed = PAYMENT.replace("Supplier", "Vendor").replace("Client", "Buyer")
+    swapped = PAYMENT.replace("Supplier", "@").replace("Client", "Supplier").replace("@", "Client")
+    assert dedup.guards_match(guard, dedup.meaning_guard(renamed))
+    assert not dedup.guards_match(guard, dedup.meaning_guard(swapped))
+    assert not dedup.guards_match(guard, dedup.meaning_guard(PAYMENT.replace("shall", "may")))
+
+
+def test_index_requires_matching_guard(tmp_path):
+    index = dedup.NearDuplicateIndex(path=tmp_path / "index.sqlite3", threshold=0.5)
+    sig = dedup.minhash(LIABILITY)
+    index.add("k", sig, dedup.meaning_guard(LIABILITY))
+    assert index.query(sig, dedup.meaning_guard(LIABILITY))[0] == "k"
+    flipped = LIABILITY.replace("shall not", "shall")
+    assert index.query(dedup.minhash(flipped), dedup.meaning_guard(flipped)) is None
+
+
+def test_lsh_params_midpoint_below_threshold():
+    bands, rows = dedup.lsh_params(0.9, 128)
+    assert bands * rows == 128
+    assert (1 / bands) ** (1 / rows) <= 0.9
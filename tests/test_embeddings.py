@@ -0,0 +1,106 @@
+import time
+import hashlib
+
+import numpy as np
+import pytest
+
+from backend.utils import embedding_cache, embedding_manager
+
+
+def vector(text, dim):
+    seed = int(hashlib.sha1(text.encode()).hexdigest()[:8], 16)
+    v = np.random.default_rng(seed).random(dim, dtype=np.float32)
+    return v / np.linalg.norm(v)
+
+
+class StubModel:
+    def __init__(self):
+        self.batches = []
+
+    def encode(self, texts, batch_size=None):
+        self.batches.append(list(texts))
+        return np.stack([vector(t, 8) for t in texts])
+
+
+class StubCollection:
+    metadata = {}
+
+    def __init__(self):
+        self.queries = []
+
+    def query(self, query_embeddings, n_results):
+        self.queries.append(query_embeddings)
+        docs = [[f"doc for {round(e[0], 6)}"] for e in query_embeddings]
+        return {"documents": docs, "metadatas": [[{}] for _ in docs], "distances": [[0.1] for _ in docs]}
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = embedding_cache.EmbeddingCache(path=tmp_path / "emb.sqlite3")
+    monkeypatch.setattr(embedding_cache, "_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def chroma(monkeypatch, cache):
+    model, collection = StubModel(), StubCollection()
+    monkeypatch.setattr(embedding_manager, "_model", model)
+    monkeypatch.setattr(embedding_manager, "_collection", collection)
+    return model, collection
+
+
+def test_search_many_encodes_and_queries_once(chroma):
+    model, collection = chroma
+    queries = ["rent", "deposit", "rent", "notice"]
+    results = embedding_manager.search_memory_many(queries, k=1)
+
+    assert model.batches == [["rent", "deposit", "notice"]]
+    assert len(collection.queries) == 1
+    assert [r[0]["text"] for r in results] == [
+        f"doc for {round(float(vector(q, 8)[0]), 6)}" for q in queries
+    ]
+
+
+def test_cached_queries_skip_the_model(chroma):
+    model, _ = chroma
+    embedding_manager.generate_embeddings(["rent", "deposit"])
+    embedding_manager.search_memory_many(["deposit", "notice", "rent"])
+    assert model.batches == [["rent", "deposit"], ["notice"]]
+
+
+def test_round_trip_float32(cache):
+    v = np.array([0.1, -2.5, 3.0], dtype=np.float64)
+    cache.put_many("m", ["rent"], [v])
+    (got,) = cache.get_many("m", ["rent"])
+    assert got.dtype == np.float32
+    assert np.array_equal(got, v.astype(np.float32))
+
+
+def test_other_model_is_a_miss(cache):
+    cache.put_many("model-a", ["rent"], [np.ones(3)])
+    assert cache.get_many("model-b", ["rent"]) == [None]
+    assert cache.stats()["misses"] == 1
+
+
+def test_hits_do_not_write_until_batch(cache, monkeypatch):
+    monkeypatch.setattr(embedding_cache, "TOUCH_BATCH", 2)
+    cache.put_many("m", ["a", "b"], [np.ones(3), np.zeros(3)])
+    changes = cache._conn.total_changes
+    cache.get_many("m", ["a", "a"])
+    assert cache._conn.total_changes == changes
+    cache.get_many("m", ["b"])
+    assert cache._conn.total_changes == changes + 2
+
+
+def test_eviction_keeps_recently_read_entries(tmp_path):
+    cache = embedding_cache.EmbeddingCache(path=tmp_path / "e.sqlite3", max_entries=3)
+    cache.put_many("m", ["old"], [np.ones(2)])
+    time.sleep(0.01)
+    cache.put_many("m", ["mid", "new"], [np.ones(2), np.ones(2)])
+    time.sleep(0.01)
+    cache.get_many("m", ["old"])  # pending touch, written before eviction
+    cache.put_many("m", ["extra"], [np.ones(2)])
+
+    assert cache.stats()["evictions"] == 2
+    assert cache.get_many("m", ["old", "mid", "new", "extra"])[1:3] == [None, None]
+    assert cache.get_many("m", ["old"])[0] is not None
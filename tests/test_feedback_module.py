@@ -0,0 +1,70 @@
+import csv
+import json
+
+import pytest
+
+from backend import feedback
+from database import models
+from database.models import ConnectionPool
+
+
+@pytest.fixture(autouse=True)
+def store(tmp_path, monkeypatch):
+    pool = ConnectionPool(path=tmp_path / "db.sqlite3")
+    monkeypatch.setattr(models, "_pool", pool)
+    monkeypatch.setattr(feedback, "LEGACY_FILE", tmp_path / "feedback.json")
+    monkeypatch.setattr(feedback, "_migrated", False)
+    yield tmp_path
+    pool.close()
+
+
+def test_aggregates_track_inserts_and_clear():
+    assert feedback.feedback_stats() == {"count": 0, "average_rating": 0}
+    feedback.save_feedback("ann", 5, "clear")
+    feedback.save_feedback("bob", 2, "")
+    assert feedback.get_feedback_count() == 2
+    assert feedback.get_average_rating() == pytest.approx(3.5)
+    assert [fb["username"] for fb in feedback.load_feedback()] == ["ann", "bob"]
+
+    feedback.clear_feedback()
+    assert feedback.feedback_stats() == {"count": 0, "average_rating": 0}
+    assert feedback.load_feedback() == []
+
+
+def test_legacy_file_is_imported_once(store):
+    legacy = store / "feedback.json"
+    legacy.write_text(json.dumps([{"username": "old", "rating": 4, "comments": "fine"}]))
+    assert feedback.get_feedback_count() == 1
+    assert not legacy.exists()
+    assert (store / "feedback.json.migrated").exists()
+    assert feedback.get_feedback_count() == 1
+
+
+def test_legacy_import_runs_once_per_database(store, monkeypatch):
+    legacy = store / "feedback.json"
+    legacy.write_text(json.dumps([{"username": "old", "rating": 4, "comments": "fine"}]))
+    # Another worker imported the file but has not yet moved it aside.
+    assert models.import_legacy_feedback([("old", 4, "fine")]) is True
+    assert feedback.get_feedback_count() == 1
+    assert (store / "feedback.json.migrated").exists()
+
+    # A later worker that still finds the file imports nothing.
+    monkeypatch.setattr(feedback, "_migrated", False)
+    legacy.write_text(json.dumps([{"username": "old", "rating": 4, "comments": "fine"}]))
+    assert feedback.get_feedback_count() == 1
+
+
+def test_exports_stream_all_rows(store):
+    out = store / "out.json"
+    feedback.export_feedback_to_json(str(out))
+    assert json.loads(out.read_text()) == []
+    assert feedback.export_feedback_to_csv(str(store / "out.csv")) is False
+
+    feedback.save_feedback("ann", 5, "clear")
+    feedback.save_feedback("bob", 1, "vague")
+    feedback.export_feedback_to_json(str(out))
+    assert [fb["rating"] for fb in json.loads(out.read_text())] == [5, 1]
+    assert feedback.export_feedback_to_csv(str(store / "out.csv")) is True
+    with open(store / "out.csv", newline="", encoding="utf-8") as f:
+        assert [row["comments"] for row in csv.DictReader(f)] == ["clear", "vague"]
+    assert "- vague" in feedback.summarize_feedback()
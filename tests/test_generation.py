@@ -0,0 +1,78 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from backend import generation
+from backend.generation import GenerationItem, Manifest, TokenBucket, backoff_delay, generate_all
+
+
+class FakeCompletions:
+    def __init__(self, finish_reasons):
+        self.finish_reasons = list(finish_reasons)
+        self.calls = []
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        reason = self.finish_reasons.pop(0) if self.finish_reasons else "stop"
+        return SimpleNamespace(
+            choices=[SimpleNamespace(finish_reason=reason, message=SimpleNamespace(content=" DOC "))],
+            usage=SimpleNamespace(total_tokens=10),
+        )
+
+
+def fake_client(finish_reasons):
+    return SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions(finish_reasons)))
+
+
+def run(items, tmp_path, client, **kwargs):
+    return asyncio.run(generate_all(
+        items, tmp_path / "manifest.jsonl", client=client, rpm=1e6, tpm=1e9, **kwargs
+    ))
+
+
+def test_token_bucket_waits_for_refill():
+    bucket = TokenBucket(60)
+    assert bucket.wait_time(60) == 0
+    bucket.take(60)
+    assert bucket.wait_time(1) == pytest.approx(1.0, abs=0.05)
+    bucket.refund(30)
+    assert bucket.wait_time(30) == 0
+    # Requests larger than the bucket wait for a full bucket, not forever.
+    assert bucket.wait_time(1000) == pytest.approx(30.0, abs=0.1)
+
+
+def test_backoff_is_capped_and_honours_retry_after():
+    assert all(0 <= backoff_delay(20) <= generation.BACKOFF_CAP_SECONDS for _ in range(50))
+    error = SimpleNamespace(response=SimpleNamespace(headers={"retry-after": "7"}))
+    assert 7 <= backoff_delay(0, error) <= 8
+
+
+def test_manifest_skips_torn_line(tmp_path):
+    path = tmp_path / "manifest.jsonl"
+    path.write_text(json.dumps({"item_id": "a"}) + "\n" + '{"item_id": "b"')
+    manifest = Manifest(path)
+    assert "a" in manifest and "b" not in manifest
+    manifest.close()
+
+
+def test_uncapped_by_default(tmp_path):
+    client = fake_client([])
+    item = GenerationItem("a", "Draft a lease.", "lease", tmp_path / "a.txt")
+    stats = run([item], tmp_path, client)
+    assert stats["generated"] == 1
+    assert "max_tokens" not in client.chat.completions.calls[0]
+    assert (tmp_path / "a.txt").read_text() == "DOC"
+
+
+def test_truncated_output_is_retried_then_failed(tmp_path):
+    items = [
+        GenerationItem("a", "Draft a lease.", "lease", tmp_path / "a.txt"),
+        GenerationItem("b", "Draft a will.", "will", tmp_path / "b.txt"),
+    ]
+    client = fake_client(["length", "stop", "length", "length"])
+    stats = run(items, tmp_path, client, concurrency=1, max_attempts=2)
+    assert (stats["generated"], stats["failed"], stats["truncated"]) == (1, 1, 3)
+    assert set(Manifest(tmp_path / "manifest.jsonl").done) == {"a"}
+    assert not (tmp_path / "b.txt").exists()
@@ -0,0 +1,6 @@
+from benchmarks.import_time import FORBIDDEN, measure_once
+
+
+def test_routes_import_keeps_heavy_modules_lazy():
+    result = measure_once(["backend.routes"])
+    assert result["forbidden"] == [], f"loaded at import time: {result['forbidden']} (of {FORBIDDEN})"
@@ -0,0 +1,37 @@
+import json
+
+import pytest
+
+from backend import json_repair
+from backend.json_repair import parse_json, parse_json_tiered, repair
+
+
+@pytest.mark.parametrize("text, tier", [
+    ('{"a": 1}', "strict"),
+    ('Sure, here it is:\n```json\n{"a": "x}y"}\n```\nAnything else?', "extracted"),
+    ("{'a': True, b: None,}", "repaired"),
+    ("no json at all", "failed"),
+])
+def test_tiers(text, tier):
+    assert parse_json_tiered(text)[1] == tier
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"a": [1, 2,], // note\n "b": 3 /* x */}', {"a": [1, 2], "b": 3}),
+    ("{'it\\'s': 'say \"hi\"'}", {"it's": 'say "hi"'}),
+    ('{"text": "line one\nline two"}', {"text": "line one\nline two"}),
+    ('{"dialogue": [{"party": "A", "text": "We pro', {"dialogue": [{"party": "A", "text": "We pro"}]}),
+    ('{"a": 1, "b":', {"a": 1, "b": None}),
+    ('{"a": 1, "b', {"a": 1, "b": None}),
+    ('{"n": 1.', {"n": 1}),
+    ('[1, 2', [1, 2]),
+])
+def test_repair_cases(text, expected):
+    assert json.loads(repair(text)) == expected
+
+
+def test_parse_json_counts_tiers(monkeypatch):
+    monkeypatch.setattr(json_repair, "STATS", dict.fromkeys(json_repair.STATS, 0))
+    assert parse_json("[1]") == [1]
+    assert parse_json("nope", default={}) == {}
+    assert json_repair.json_repair_stats() == {"strict": 1, "extracted": 0, "repaired": 0, "failed": 1}
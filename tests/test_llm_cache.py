@@ -0,0 +1,62 @@
+import asyncio
+import sqlite3
+
+from backend import analysis, llm_cache
+from backend.llm_cache import ResponseCache, make_key
+
+
+def test_key_ignores_case_and_whitespace():
+    assert make_key("The  Tenant shall pay", "v1", "m", 0.2) == make_key("the tenant shall pay ", "v1", "m", 0.2)
+    assert make_key("x", "v1", "m", 0.2) != make_key("x", "v2", "m", 0.2)
+
+
+def test_hits_do_not_write_until_batch(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_cache, "TOUCH_BATCH", 3)
+    cache = ResponseCache(path=tmp_path / "c.sqlite3")
+    cache.set("a", {"v": 1})
+    changes = cache._conn.total_changes
+    assert cache.get("a") == {"v": 1}
+    assert cache.get("a") == {"v": 1}
+    assert cache._conn.total_changes == changes
+    cache.flush()
+    assert cache._conn.total_changes > changes
+    assert cache.stats()["hits"] == 2
+
+
+def test_ttl_expiry_counts_as_miss(tmp_path):
+    cache = ResponseCache(path=tmp_path / "c.sqlite3", ttl_seconds=-1)
+    cache.set("a", {"v": 1})
+    assert cache.get("a") is None
+    assert cache.stats()["expired"] == 1
+
+
+def test_lru_eviction_uses_pending_touches(tmp_path):
+    cache = ResponseCache(path=tmp_path / "c.sqlite3", max_bytes=30)
+    cache.set("old", "x" * 10)
+    cache.set("new", "y" * 10)
+    cache.get("old")  # more recently used than "new" once flushed
+    cache.set("third", "z" * 10)
+    assert cache.contains("old")
+    assert not cache.contains("new")
+
+
+class BrokenCache:
+    def contains(self, key):
+        raise sqlite3.OperationalError("database is locked")
+
+    get = set = contains
+
+
+def test_cache_errors_do_not_fail_the_clause(monkeypatch):
+    async def reason(clause, retrieved=None):
+        return (
+            '{"clause_summary": "s", "issues": [], "compliance_notes": [], '
+            '"suggested_revision": "r"}'
+        ), []
+
+    monkeypatch.setattr(analysis, "get_response_cache", lambda: BrokenCache())
+    monkeypatch.setattr(analysis, "CACHE_ENABLED", True)
+    monkeypatch.setattr(analysis, "reason_over_clause", reason)
+    entry = asyncio.run(analysis.analyze_clause("The Tenant shall pay rent."))
+    assert entry["analysis"]["clause_summary"] == "s"
+    assert "error" not in entry
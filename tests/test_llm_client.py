@@ -0,0 +1,54 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from backend import llm_client
+
+
+class FakeStream:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.closed = False
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            yield chunk
+
+    async def close(self):
+        self.closed = True
+
+
+def _chunk(text=None, usage=None):
+    choices = [SimpleNamespace(delta=SimpleNamespace(content=text))] if text is not None else []
+    return SimpleNamespace(choices=choices, usage=usage)
+
+
+def _run(stream, stop_after=None):
+    async def consume():
+        metered = llm_client._metered_stream(stream, "v1", time.perf_counter())
+        seen = 0
+        async for _ in metered:
+            seen += 1
+            if seen == stop_after:
+                await metered.aclose()
+                break
+    asyncio.run(consume())
+
+
+def test_drained_stream_records_usage(monkeypatch):
+    monkeypatch.setattr(llm_client, "USAGE", {})
+    usage = SimpleNamespace(prompt_tokens=10, completion_tokens=3,
+                            prompt_tokens_details=SimpleNamespace(cached_tokens=0))
+    stream = FakeStream([_chunk("Hel"), _chunk("lo"), _chunk(usage=usage)])
+    _run(stream)
+    stats = llm_client.prompt_cache_stats()["v1"]
+    assert (stats["calls"], stats["prompt_tokens"], stats["completion_tokens"]) == (1, 10, 3)
+    assert stats["mean_first_token_miss"] is not None
+
+
+def test_early_stop_still_records_and_closes(monkeypatch):
+    monkeypatch.setattr(llm_client, "USAGE", {})
+    stream = FakeStream([_chunk("Hel"), _chunk("lo"), _chunk("!")])
+    _run(stream, stop_after=1)
+    assert llm_client.prompt_cache_stats()["v1"]["calls"] == 1
+    assert stream.closed
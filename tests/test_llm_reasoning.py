@@ -0,0 +1,68 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from backend import mediation, schemas
+from backend.schemas import (
+    ClauseAnalysis,
+    MediationResult,
+    NegotiationResult,
+    OutputValidationError,
+    response_format,
+    validate_output,
+)
+
+ANALYSIS = {
+    "clause_summary": "Rent is due monthly.",
+    "issues": [],
+    "compliance_notes": ["Consistent with the Rent Restriction Act."],
+    "suggested_revision": "Rent is due on the first day of each month.",
+}
+
+
+def _objects(schema):
+    yield schema
+    yield from schema.get("$defs", {}).values()
+
+
+@pytest.mark.parametrize("model", [ClauseAnalysis, NegotiationResult, MediationResult])
+def test_schemas_satisfy_strict_mode(model, monkeypatch):
+    monkeypatch.setattr(schemas, "STRUCTURED_OUTPUT", True)
+    fmt = response_format(model)
+    assert fmt["json_schema"]["strict"] is True
+    for obj in _objects(fmt["json_schema"]["schema"]):
+        assert obj["additionalProperties"] is False
+        assert set(obj["required"]) == set(obj["properties"])
+
+
+def test_prompt_only_mode(monkeypatch):
+    monkeypatch.setattr(schemas, "STRUCTURED_OUTPUT", False)
+    assert response_format(ClauseAnalysis) == {"type": "json_object"}
+
+
+def test_validate_output_accepts_fenced_reply():
+    assert validate_output(ClauseAnalysis, "```json\n" + json.dumps(ANALYSIS) + "\n```") == ANALYSIS
+
+
+@pytest.mark.parametrize("reply", [
+    "I cannot help with that.",
+    json.dumps({**ANALYSIS, "risk": "high"}),
+    json.dumps({k: v for k, v in ANALYSIS.items() if k != "issues"}),
+])
+def test_validate_output_rejects(reply):
+    with pytest.raises(OutputValidationError):
+        validate_output(ClauseAnalysis, reply)
+
+
+def test_mediate_reports_invalid_reply(monkeypatch):
+    async def fake_completion(**kwargs):
+        assert kwargs["response_format"]["json_schema"]["name"] == "MediationResult"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content='{"evaluation": "x"}'))])
+
+    monkeypatch.setattr(schemas, "STRUCTURED_OUTPUT", True)
+    monkeypatch.setattr(mediation, "chat_completion", fake_completion)
+    result = asyncio.run(mediation.mediate("A wants X", "B wants Y"))
+    assert result["error"].startswith("Invalid mediation output")
+    assert result["raw_output"] == '{"evaluation": "x"}'
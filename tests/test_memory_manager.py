@@ -0,0 +1,105 @@
+import time
+import hashlib
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from backend import memory_manager
+from backend.utils import embedding_cache
+
+real_embed_many = memory_manager.embed_many
+
+
+@pytest.fixture
+def memory(tmp_path, monkeypatch):
+    faiss_dir = tmp_path / "vectorstore_faiss"
+    monkeypatch.setattr(memory_manager, "FAISS_DIR", faiss_dir)
+    monkeypatch.setattr(memory_manager, "INDEX_PATH", faiss_dir / "documents.index")
+    monkeypatch.setattr(memory_manager, "META_LOG_PATH", faiss_dir / "metadata.jsonl")
+    monkeypatch.setattr(memory_manager, "META_OFFSETS_PATH", faiss_dir / "metadata.offsets")
+    monkeypatch.setattr(memory_manager, "META_PATH", faiss_dir / "metadata.pkl")
+    monkeypatch.setattr(memory_manager, "MMAP_INDEX", False)
+    monkeypatch.setattr(memory_manager, "_index", None)
+    monkeypatch.setattr(memory_manager, "_store", None)
+    monkeypatch.setattr(memory_manager, "_flush_timer", None)
+    monkeypatch.setattr(memory_manager, "_last_flush", time.monotonic())
+    monkeypatch.setattr(memory_manager, "index_documents", lambda docs: list(docs))
+    rng = np.random.default_rng(0)
+    monkeypatch.setattr(
+        memory_manager, "embed_many",
+        lambda texts: rng.random((len(texts), 1536), dtype=np.float32),
+    )
+    return memory_manager
+
+
+def test_small_batch_is_flushed_by_timer_without_further_writes(memory, monkeypatch):
+    monkeypatch.setattr(memory, "FLUSH_INTERVAL_SECONDS", 0.2)
+    memory.add_many_to_memory([("clause one", {"source": "t"}), ("clause two", {"source": "t"})])
+    assert memory.get_store().dirty
+    assert not memory.INDEX_PATH.exists()
+
+    deadline = time.monotonic() + 5
+    while memory.get_store().dirty and time.monotonic() < deadline:
+        time.sleep(0.05)
+    # Rows are persisted before the index; wait for the timer's flush to finish.
+    with memory._write_lock:
+        pass
+
+    assert not memory.get_store().dirty
+    assert memory.INDEX_PATH.exists()
+    assert memory.get_store().persisted == 2
+
+
+def test_flush_every_n_items(memory, monkeypatch):
+    monkeypatch.setattr(memory, "FLUSH_EVERY", 3)
+    monkeypatch.setattr(memory, "FLUSH_INTERVAL_SECONDS", 3600)
+    memory.add_many_to_memory([(f"c{i}", {}) for i in range(3)])
+    assert not memory.get_store().dirty
+    assert memory.get_store().persisted == 3
+
+
+class StubEmbeddings:
+    """OpenAI embeddings endpoint returning a fixed random unit vector per text."""
+
+    def __init__(self):
+        self.calls = []
+
+    def create(self, model, input):
+        self.calls.append(list(input))
+        return SimpleNamespace(data=[SimpleNamespace(embedding=self.vector(t)) for t in input])
+
+    @staticmethod
+    def vector(text):
+        seed = int(hashlib.sha1(text.encode()).hexdigest()[:8], 16)
+        v = np.random.default_rng(seed).random(1536, dtype=np.float32)
+        return v / np.linalg.norm(v)
+
+
+def test_bulk_add_and_search_batch_embedding_calls(memory, monkeypatch, tmp_path):
+    stub = StubEmbeddings()
+    monkeypatch.setattr(memory, "embed_many", real_embed_many)
+    monkeypatch.setattr(memory, "_client", SimpleNamespace(embeddings=stub))
+    monkeypatch.setattr(memory, "EMBED_API_BATCH", 2)
+    monkeypatch.setattr(embedding_cache, "_cache", embedding_cache.EmbeddingCache(tmp_path / "e.sqlite3"))
+
+    texts = [f"clause {i}" for i in range(5)]
+    assert memory.add_many_to_memory([(t, {"i": i}) for i, t in enumerate(texts)]) == 5
+    # One embedding pass for the whole bulk add, split into API-sized batches.
+    assert stub.calls == [texts[0:2], texts[2:4], texts[4:5]]
+
+    queries = ["clause 3", "clause 0", "clause 4"]
+    results = memory.search_memory_many(queries, k=1)
+    assert stub.calls[3:] == []  # queries were embedded before; served from the cache
+    assert [hits[0]["text"] for hits in results] == queries
+    assert [hits[0]["meta"]["i"] for hits in results] == [3, 0, 4]
+
+
+def test_rebuild_command_converts_stored_index(memory, monkeypatch):
+    monkeypatch.setattr(memory, "FLUSH_INTERVAL_SECONDS", 3600)
+    memory.add_many_to_memory([(f"clause {i}", {}) for i in range(300)])
+    assert memory.main(["rebuild", "--kind", "ivf_flat", "--nlist", "4"]) == "ivf_flat"
+    assert memory.get_index().ntotal == 300
+    assert not memory.get_store().dirty
+    with pytest.raises(SystemExit):
+        memory.main(["rebuild", "--kind", "annoy"])
@@ -0,0 +1,123 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from backend import negotiation
+from backend.json_repair import JSONStream
+from backend.negotiation import converged, iter_negotiation, next_party
+
+
+def feed_all(stream, pieces):
+    out = []
+    for piece in pieces:
+        stream.feed(piece)
+        out.append(stream.take_tracked())
+    return out
+
+
+def test_stream_tracks_text_across_split_escapes():
+    reply = json.dumps({"text": 'We say "no" é\n\U0001F600 ok', "proposal": "x", "accepts": False})
+    stream = JSONStream(track="text")
+    pieces = feed_all(stream, [reply[i:i + 3] for i in range(0, len(reply), 3)])
+    assert "".join(pieces) == 'We say "no" é\n\U0001F600 ok'
+    assert stream.complete
+    assert stream.result() == json.loads(reply)
+
+
+def test_stream_ignores_nested_and_other_keys():
+    reply = '{"proposal": "text", "meta": {"text": "inner"}, "text": "outer"}'
+    stream = JSONStream(track="text")
+    assert "".join(feed_all(stream, list(reply))) == "outer"
+
+
+def test_stream_partial_still_available():
+    stream = JSONStream()
+    stream.feed('{"text": "We pro')
+    assert stream.partial() == {"text": "We pro"}
+    assert stream.take_tracked() == ""
+
+
+def test_next_party_skips_user_notes():
+    assert next_party([]) == "A"
+    assert next_party([{"party": "A"}, {"party": "user"}]) == "B"
+    assert next_party([{"party": "A"}, {"party": "B"}]) == "A"
+
+
+def test_converged_on_acceptance_or_repeated_proposal():
+    transcript = [{"party": "A", "text": "", "proposal": "Rent is  KES 10,000."}]
+    assert converged({"accepts": True, "proposal": ""}, transcript)
+    assert converged({"accepts": False, "proposal": "rent is KES 10,000."}, transcript)
+    assert not converged({"accepts": False, "proposal": "Rent is KES 9,000."}, transcript)
+
+
+def _chunk(text):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text, refusal=None))])
+
+
+async def _stream(reply):
+    for i in range(0, len(reply), 5):
+        yield _chunk(reply[i:i + 5])
+
+
+def fake_completion(moves, summary):
+    moves = list(moves)
+
+    async def create(**kwargs):
+        if kwargs.get("stream"):
+            return _stream(json.dumps(moves.pop(0)))
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=json.dumps(summary)))])
+    return create
+
+
+SUMMARY = {
+    "mutually_beneficial_revision": "Rent is KES 9,500.",
+    "tradeoffs": [],
+    "win_win_justification": "Split the difference.",
+    "legal_refs": [],
+}
+
+
+def test_iter_negotiation_streams_until_converged(monkeypatch):
+    moves = [
+        {"text": "I propose 9,000.", "proposal": "Rent is KES 9,000.", "accepts": False},
+        {"text": "Meet at 9,500?", "proposal": "Rent is KES 9,500.", "accepts": False},
+        {"text": "Agreed.", "proposal": "Rent is KES 9,500.", "accepts": True},
+    ]
+    monkeypatch.setattr(negotiation, "chat_completion", fake_completion(moves, SUMMARY))
+
+    async def collect():
+        return [e async for e in iter_negotiation("Rent is KES 10,000.", "tenant", max_turns=6)]
+
+    events = asyncio.run(collect())
+    deltas = "".join(e["text"] for e in events if e["type"] == "delta" and e["index"] == 1)
+    assert deltas == "Meet at 9,500?"
+    assert [e["party"] for e in events if e["type"] == "turn"] == ["A", "B", "A"]
+    done = events[-1]
+    assert done["type"] == "done" and done["converged"] and done["stopped"] == "converged"
+    assert done["result"]["mutually_beneficial_revision"] == "Rent is KES 9,500."
+
+
+def test_iter_negotiation_resumes_after_interjection(monkeypatch):
+    moves = [{"text": "Fine.", "proposal": "", "accepts": True}]
+    monkeypatch.setattr(negotiation, "chat_completion", fake_completion(moves, SUMMARY))
+    history = [{"party": "A", "text": "9,000", "proposal": "9,000", "accepts": False}]
+
+    async def collect():
+        return [e async for e in iter_negotiation("c", "p", history=history, interjection=" Keep it short ")]
+
+    events = asyncio.run(collect())
+    assert events[0]["next_party"] == "B"
+    assert events[-1]["transcript"][1] == {"party": "user", "text": "Keep it short"}
+
+
+def test_batch_failures_stay_isolated(monkeypatch):
+    async def fake_negotiate(clause, position):
+        if clause == "bad":
+            raise RuntimeError("boom")
+        return {"clause": clause}
+
+    monkeypatch.setattr(negotiation, "negotiate", fake_negotiate)
+    results = asyncio.run(negotiation.negotiate_many([("a", "p"), ("bad", "p"), ("c", "p")], 2))
+    assert [r for r, _ in results] == [
+        {"clause": "a"}, {"error": "Negotiation failed: boom"}, {"clause": "c"},
+    ]
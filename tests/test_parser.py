@@ -0,0 +1,67 @@
+import pytest
+
+from backend.parser import iter_clauses, split_into_clauses
+from backend.segmenter import ClauseStream, segment
+
+CONTRACT = """SERVICES AGREEMENT between the Supplier and the Client, made this day.
+1. Definitions. In this Agreement the following words have the meanings set out below.
+1.1 "Services" means the consulting services described in Schedule 1 to this Agreement.
+1.2 "Fees" means the fees payable by the Client to the Supplier for the Services.
+2. Payment
+(a) The Client shall pay each invoice within thirty (30) days of receipt by the Client.
+(b) Late payments shall accrue interest at the rate set out in Schedule 2 of this Agreement.
+(i) Interest is calculated daily on the outstanding amount until the date of payment.
+Termination: Either party may terminate this Agreement on ninety days' written notice.
+"""
+
+
+def test_labels_and_depths():
+    spans = segment(CONTRACT)
+    assert [(s.label, s.depth) for s in spans] == [
+        (None, 0), ("1", 1), ("1.1", 2), ("1.2", 2),
+        ("2(a)", 2), ("2(b)", 2), ("2(b)(i)", 3), (None, 1),
+    ]
+
+
+def test_markers_dropped_headings_kept():
+    clauses = split_into_clauses(CONTRACT)
+    assert clauses[1].startswith("Definitions.")
+    assert clauses[4].startswith("The Client shall pay")
+    assert clauses[-1].startswith("Termination:")
+
+
+def test_spans_are_offsets_into_the_text():
+    for span in segment(CONTRACT):
+        assert CONTRACT[span.start:span.end] == CONTRACT[span.start:span.end].strip()
+
+
+def test_decimal_at_line_start_is_not_a_heading():
+    text = (
+        "1. Payment\nThe buyer pays each invoice on receipt.\n"
+        "3.5 percent interest accrues monthly on any amount left unpaid.\n"
+        "2.5% of the fee is withheld until acceptance of the deliverables.\n"
+        "1.1 Late Payment. Interest is charged on overdue invoices from the due date."
+    )
+    spans = segment(text)
+    assert [s.label for s in spans] == ["1", "1.1"]
+    assert "3.5 percent" in text[spans[0].start:spans[0].end]
+    assert "2.5% of the fee" in text[spans[0].start:spans[0].end]
+
+
+def test_short_fragments_dropped():
+    assert split_into_clauses("1. Too short.\n2. Also short.") == []
+
+
+@pytest.mark.parametrize("size", [1, 7, 40, 10_000])
+def test_stream_matches_batch_for_any_chunking(size):
+    lines = CONTRACT.split("\n")
+    chunks = ["\n".join(lines[i:i + size]) for i in range(0, len(lines), size)]
+    assert list(iter_clauses(chunks)) == split_into_clauses("\n".join(chunks))
+
+
+def test_stream_caps_buffer_at_paragraph_break():
+    text = ("word " * 30 + "\n\n") * 10
+    stream = ClauseStream(max_chars=400)
+    out = list(stream.feed(text)) + list(stream.close())
+    assert len(out) > 1
+    assert all(len(clause) <= 400 for clause in out)
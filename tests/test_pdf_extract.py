@@ -0,0 +1,154 @@
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from backend import pdf_extract
+from backend.pdf_extract import iter_pdf_clauses, spool_upload
+
+PAGES = [
+    ["1. Payment", "The buyer pays the purchase price monthly", "by bank transfer to the seller and"],
+    ["continues across the page break without a new heading.", "2. Term",
+     "This agreement runs for one year from signing."],
+    ["3. Termination", "Either party may terminate on thirty days notice."],
+]
+
+
+@pytest.fixture(autouse=True)
+def text_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_extract, "TEXT_CACHE_DIR", tmp_path / "pdf_text_cache")
+    return tmp_path / "pdf_text_cache"
+
+
+class ChunkedReader(io.BytesIO):
+    """Records every read size; a bare read() would pull the whole upload into memory."""
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.sizes = []
+
+    def read(self, size=-1):
+        self.sizes.append(size)
+        return super().read(size)
+
+
+def test_upload_is_spooled_in_chunks(monkeypatch, make_pdf):
+    monkeypatch.setattr(pdf_extract, "COPY_CHUNK_BYTES", 64)
+    data = make_pdf(PAGES)
+    upload = ChunkedReader(data)
+    path, digest = spool_upload(upload)
+    try:
+        assert set(upload.sizes) == {64}
+        with open(path, "rb") as f:
+            assert f.read() == data
+        assert digest == pdf_extract.file_sha256(path)
+    finally:
+        pdf_extract.os.remove(path)
+
+
+def test_clauses_follow_page_order_across_page_breaks(tmp_path, make_pdf):
+    path = tmp_path / "contract.pdf"
+    path.write_bytes(make_pdf(PAGES))
+    stats = {}
+    clauses = list(iter_pdf_clauses(str(path), stats))
+
+    assert [c.split("\n", 1)[0] for c in clauses] == ["Payment", "Term", "Termination"]
+    assert clauses[0].endswith("seller and\n\ncontinues across the page break without a new heading.")
+    assert stats["pages"] == 3
+
+
+def test_clauses_stream_before_later_pages_are_read(tmp_path, make_pdf):
+    path = tmp_path / "contract.pdf"
+    path.write_bytes(make_pdf(PAGES))
+    stats = {}
+    clauses = iter_pdf_clauses(str(path), stats)
+    assert next(clauses).startswith("Payment")
+    assert stats["pages"] == 2
+    clauses.close()
+
+
+def test_second_extraction_reads_the_text_cache(tmp_path, make_pdf, monkeypatch, text_cache):
+    path = tmp_path / "contract.pdf"
+    path.write_bytes(make_pdf(PAGES))
+    first = list(pdf_extract.iter_pages(str(path)))
+    assert len(list(text_cache.iterdir())) == 1
+
+    def not_again(*args):
+        raise AssertionError("extracted a cached file again")
+
+    monkeypatch.setattr(pdf_extract, "_iter_extracted", not_again)
+    with open(path, "rb") as upload:
+        assert list(pdf_extract.iter_pages(upload)) == first
+
+
+def test_partial_read_does_not_publish_cache(tmp_path, make_pdf, text_cache):
+    path = tmp_path / "contract.pdf"
+    path.write_bytes(make_pdf(PAGES))
+    pages = pdf_extract.iter_pages(str(path))
+    next(pages)
+    pages.close()
+    assert list(text_cache.iterdir()) == []
+
+
+class InlineExecutor(ThreadPoolExecutor):
+    """Threads in this process instead of spawned workers; counts submissions."""
+
+    submitted = 0
+
+    def submit(self, fn, *args):
+        InlineExecutor.submitted += 1
+        return super().submit(fn, *args)
+
+
+def test_parallel_ranges_reassemble_in_page_order(tmp_path, make_pdf, monkeypatch):
+    path = tmp_path / "long.pdf"
+    path.write_bytes(make_pdf([[f"Page {i}"] for i in range(12)]))
+    pool = InlineExecutor(max_workers=4)
+    InlineExecutor.submitted = 0
+    monkeypatch.setattr(pdf_extract, "get_pool", lambda: pool)
+    monkeypatch.setattr(pdf_extract, "PARALLEL_MIN_PAGES", 2)
+    monkeypatch.setattr(pdf_extract, "PAGES_PER_TASK", 1)
+
+    def slow_early_pages(path, start, stop):
+        # Later ranges finish first.
+        time.sleep(0.01 * (12 - start))
+        return [f"page {i}" for i in range(start, stop)]
+
+    monkeypatch.setattr(pdf_extract, "_extract_range", slow_early_pages)
+    workers = 2
+    pages = []
+    for text in pdf_extract._iter_extracted(str(path), workers):
+        pages.append(text)
+        # Only a window of two ranges per worker is ever in flight.
+        assert InlineExecutor.submitted - len(pages) <= 2 * workers
+    pool.shutdown()
+    assert pages == [f"page {i}" for i in range(12)]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_extract_many_isolates_failures(tmp_path, make_pdf, monkeypatch, workers):
+    good = tmp_path / "good.pdf"
+    good.write_bytes(make_pdf([["1. Payment is due monthly."], ["2. Term is one year."]]))
+    corrupt = tmp_path / "corrupt.pdf"
+    corrupt.write_bytes(b"%PDF-1.4\ngarbage")
+    failing = tmp_path / "failing.pdf"
+    failing.write_bytes(make_pdf([["Unreadable page"]]))
+
+    real = pdf_extract._extract_range
+
+    def extract(path, start, stop):
+        if path.endswith("failing.pdf"):
+            raise ValueError("bad content stream")
+        return real(path, start, stop)
+
+    pool = InlineExecutor(max_workers=2)
+    monkeypatch.setattr(pdf_extract, "get_pool", lambda: pool)
+    monkeypatch.setattr(pdf_extract, "_extract_range", extract)
+    paths = [str(corrupt), str(good), str(failing)]
+    results = pdf_extract.extract_many(paths, workers=workers)
+    pool.shutdown()
+
+    assert list(results) == paths
+    assert results[str(corrupt)] == "" and results[str(failing)] == ""
+    assert results[str(good)] == "1. Payment is due monthly.\n\n2. Term is one year."
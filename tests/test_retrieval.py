@@ -0,0 +1,89 @@
+import time
+import asyncio
+import logging
+
+import pytest
+
+from backend import retrieval
+from backend.retrieval import RRF_K, lexical_prefilter, merge_results, retrieve_many
+
+
+def hit(text, store, score):
+    return {"text": text, "store": store, "score": score, "metadata": {"store": store}}
+
+
+def test_rrf_rewards_agreement_across_stores():
+    chroma = [hit("A", "chroma", 0.9), hit("B", "chroma", 0.8)]
+    faiss = [hit("B", "faiss", 0.7), hit("C", "faiss", 0.6)]
+    merged = merge_results([chroma, faiss], k=3, fusion="rrf")
+    assert [h["text"] for h in merged] == ["B", "A", "C"]
+    assert merged[0]["stores"] == ["chroma", "faiss"]
+    assert merged[0]["rrf"] == 1 / (RRF_K + 2) + 1 / (RRF_K + 1)
+
+
+def test_duplicates_merge_on_normalized_text_and_keep_dense_score():
+    bm25 = [hit("Employment  Act", "bm25", 12.5)]
+    faiss = [hit("employment act", "faiss", 0.4)]
+    (merged,) = merge_results([bm25, faiss], k=5, fusion="rrf")
+    assert merged["score"] == 0.4 and merged["store"] == "faiss"
+    assert sorted(merged["stores"]) == ["bm25", "faiss"]
+
+
+def test_score_fusion_ranks_dense_above_bm25():
+    merged = merge_results(
+        [[hit("X", "bm25", 30.0)], [hit("Y", "chroma", 0.2)]], k=2, fusion="score"
+    )
+    assert [h["text"] for h in merged] == ["Y", "X"]
+
+
+def test_lexical_prefilter():
+    dense = [hit("Data Protection Act", "faiss", 0.5), hit("unrelated", "faiss", 0.9)]
+    lexical = [hit("data protection act", "bm25", 3.0)]
+    assert lexical_prefilter([dense, lexical], lexical)[0] == dense[:1]
+    assert lexical_prefilter([dense], []) == [dense]
+
+
+def searcher(store, delay=0.0, error=None):
+    def search(queries, k):
+        time.sleep(delay)
+        if error:
+            raise error
+        return [[hit(f"{store}: {q}", store, 0.5)] for q in queries]
+    return search
+
+
+@pytest.fixture
+def stores(monkeypatch):
+    monkeypatch.setattr(retrieval, "STATS", {
+        s: {"ok": 0, "timeout": 0, "error": 0} for s in ("chroma", "faiss", "bm25")
+    })
+    monkeypatch.setattr(retrieval, "LEXICAL_PREFILTER", False)
+
+    def install(**searchers):
+        for store, fn in searchers.items():
+            monkeypatch.setitem(retrieval.SEARCHERS, store, fn)
+    return install
+
+
+def test_slow_store_is_dropped_at_the_budget(stores):
+    stores(chroma=searcher("chroma"), faiss=searcher("faiss", delay=0.5))
+
+    async def timed():
+        started = time.perf_counter()
+        results = await retrieve_many(["rent", "notice"], k=2, budget_ms=100, stores=["chroma", "faiss"])
+        return results, time.perf_counter() - started
+
+    results, seconds = asyncio.run(timed())
+    assert seconds < 0.4
+    assert [[h["text"] for h in r] for r in results] == [["chroma: rent"], ["chroma: notice"]]
+    assert retrieval.STATS["faiss"]["timeout"] == 1
+    assert retrieval.STATS["chroma"]["ok"] == 1
+
+
+def test_failing_store_does_not_drop_the_others(stores, caplog):
+    stores(chroma=searcher("chroma", error=RuntimeError("collection missing")), faiss=searcher("faiss"))
+    with caplog.at_level(logging.WARNING, logger="backend.retrieval"):
+        results = asyncio.run(retrieve_many(["rent"], k=2, budget_ms=1000, stores=["chroma", "faiss"]))
+    assert [h["text"] for h in results[0]] == ["faiss: rent"]
+    assert retrieval.STATS["chroma"]["error"] == 1
+    assert "Retrieval from chroma failed: collection missing" in caplog.text
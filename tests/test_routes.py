@@ -0,0 +1,153 @@
+import io
+import os
+import json
+
+import pytest
+from PyPDF2 import PdfReader, PdfWriter
+
+from backend import pdf_extract
+from database import models
+
+PAGES = [
+    ["1. Payment", "The buyer pays the purchase price monthly", "by bank transfer to the seller and"],
+    ["continues across the page break without a new heading.", "2. Term",
+     "This agreement runs for one year from signing."],
+]
+
+
+@pytest.fixture(autouse=True)
+def text_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_extract, "TEXT_CACHE_DIR", tmp_path / "pdf_text_cache")
+
+
+def events(response):
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    return [json.loads(line) for line in response.iter_lines() if line]
+
+
+def _encrypted(pdf):
+    writer = PdfWriter()
+    for page in PdfReader(io.BytesIO(pdf)).pages:
+        writer.add_page(page)
+    writer.encrypt("secret")
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+
+def test_analyze_pdf_streams_clauses(client, make_pdf, monkeypatch):
+    from backend import routes
+
+    spooled = []
+
+    def spool(fileobj):
+        spooled.append(pdf_extract.spool_upload(fileobj))
+        return spooled[-1]
+
+    monkeypatch.setattr(routes, "spool_upload", spool)
+    response = client.post(
+        "/analyze/pdf", files={"file": ("lease.pdf", make_pdf(PAGES), "application/pdf")},
+    )
+    assert response.status_code == 200
+    lines = events(response)
+    assert lines[0] == {"type": "start", "filename": "lease.pdf"}
+    clauses = sorted((e for e in lines if e["type"] == "clause"), key=lambda e: e["index"])
+    assert [e["clause"].split("\n", 1)[0] for e in clauses] == ["Payment", "Term"]
+    assert "continues across the page break" in clauses[0]["clause"]
+    assert lines[-1] == {"type": "done", "total": 2, "failed": 0, "deduplicated": 0, "pages": 2}
+    # The private copy of the upload is removed once the stream ends.
+    assert not os.path.exists(spooled[0][0])
+
+
+@pytest.mark.parametrize("payload", [b"%PDF-1.4\nnot really a pdf", "encrypted"])
+def test_unreadable_pdf_is_an_error_event(client, make_pdf, payload):
+    if payload == "encrypted":
+        payload = _encrypted(make_pdf(PAGES))
+    response = client.post("/analyze/pdf", files={"file": ("bad.pdf", payload, "application/pdf")})
+    assert response.status_code == 200
+    lines = events(response)
+    assert lines[0]["type"] == "start"
+    assert lines[1]["type"] == "error"
+    assert lines[1]["error"].startswith("PDF extraction failed")
+    assert lines[-1]["type"] == "done" and lines[-1]["total"] == 0
+    # The failed upload leaves nothing in the analysis history.
+    assert client.get("/analyses").json() == {"contracts": []}
+
+
+CONTRACT = """1. Payment
+The tenant shall pay rent monthly in advance.
+2. Repairs
+FAIL: the tenant shall carry out all structural repairs.
+3. Term
+This agreement runs for one year from the date of signing.
+"""
+
+
+def test_analyze_stream_framing(client, fake_llm):
+    fake_llm.delays = {"Payment\nThe tenant shall pay rent monthly in advance.": 0.05}
+    response = client.post("/analyze/stream", json={"text": CONTRACT})
+    assert response.status_code == 200
+    lines = events(response)
+
+    assert lines[0] == {"type": "start", "total": 3}
+    clauses = lines[1:-1]
+    assert all(e["type"] == "clause" for e in clauses)
+    assert sorted(e["index"] for e in clauses) == [0, 1, 2]
+    # The slow first clause arrives last; indices let the client reorder.
+    assert clauses[-1]["index"] == 0
+    failed = next(e for e in clauses if e["index"] == 1)
+    assert failed["error"] == "LLM request failed: upstream 500" and failed["analysis"] is None
+    assert lines[-1] == {"type": "done", "total": 3, "failed": 1, "deduplicated": 0}
+
+
+def test_history_routes(client):
+    client.post("/analyze/stream", json={"text": CONTRACT})
+    (contract,) = client.get("/analyses").json()["contracts"]
+    assert (contract["clause_count"], contract["failed"]) == (3, 1)
+
+    clause = "Payment\nThe tenant shall pay rent monthly in advance."
+    (past,) = client.get("/analyses", params={"clause": clause}).json()["analyses"]
+    assert past["clause"] == clause and past["analysis"]["suggested_revision"] == clause
+    failing = "Repairs\nFAIL: the tenant shall carry out all structural repairs."
+    assert client.get("/analyses", params={"clause": failing}).json() == {"analyses": []}
+
+    models.save_negotiation(clause, "tenant", {"agreed": True})
+    models.save_negotiation("Another clause.", "landlord", {"agreed": False})
+    assert len(client.get("/negotiations").json()["negotiations"]) == 2
+    (negotiation,) = client.get("/negotiations", params={"clause": clause}).json()["negotiations"]
+    assert negotiation["result"] == {"agreed": True}
+
+
+@pytest.fixture
+def flaky_negotiate(monkeypatch):
+    from backend import negotiation
+
+    async def fake_negotiate(clause, position):
+        if clause == "bad":
+            raise RuntimeError("boom")
+        return {"clause": clause, "position": position}
+
+    monkeypatch.setattr(negotiation, "negotiate", fake_negotiate)
+
+
+BATCH = {"items": [{"clause": c, "position": "tenant"} for c in ("a", "bad", "c")]}
+
+
+def test_negotiate_batch_isolates_failures(client, flaky_negotiate):
+    body = client.post("/negotiate/batch", json=BATCH).json()
+    assert [item["index"] for item in body["items"]] == [0, 1, 2]
+    assert [item["result"] for item in body["items"]] == [
+        {"clause": "a", "position": "tenant"},
+        {"error": "Negotiation failed: boom"},
+        {"clause": "c", "position": "tenant"},
+    ]
+    assert (body["total"], body["failed"]) == (3, 1)
+    assert len(client.get("/negotiations").json()["negotiations"]) == 3
+
+
+def test_negotiate_batch_stream_isolates_failures(client, flaky_negotiate):
+    lines = events(client.post("/negotiate/batch/stream", json=BATCH))
+    assert lines[0] == {"type": "start", "total": 3}
+    items = sorted(lines[1:-1], key=lambda e: e["index"])
+    assert [e["result"].get("error") for e in items] == [None, "Negotiation failed: boom", None]
+    assert lines[-1]["type"] == "done" and lines[-1]["failed"] == 1
@@ -0,0 +1,58 @@
+import pytest
+
+from database import models
+from database.models import ConnectionPool
+from backend.versioning import RevisionPlan, diff_clauses
+
+
+@pytest.fixture(autouse=True)
+def pool(tmp_path, monkeypatch):
+    pool = ConnectionPool(path=tmp_path / "db.sqlite3")
+    monkeypatch.setattr(models, "_pool", pool)
+    yield pool
+    pool.close()
+
+
+def test_diff_unchanged_changed_new_removed():
+    statuses, removed = diff_clauses(["a", "b", "c", "d"], ["a", "x", "c", "y", "z"])
+    assert statuses == [
+        ("unchanged", 0), ("changed", 1), ("unchanged", 2), ("changed", 3), ("new", None),
+    ]
+    assert removed == []
+
+
+def test_diff_deletion_and_insertion():
+    statuses, removed = diff_clauses(["a", "b", "c"], ["n", "a", "c"])
+    assert statuses == [("new", None), ("unchanged", 0), ("unchanged", 2)]
+    assert removed == [1]
+
+
+def test_plan_reuses_only_successful_unchanged_results():
+    models.save_contract_analysis(
+        [
+            {"clause": "Rent is due monthly.", "analysis": {"risk": "low"}},
+            {"clause": "Tenant pays repairs.", "error": "timeout"},
+            {"clause": "Term is one year.", "analysis": {"risk": "low"}},
+        ],
+        contract_id="lease",
+    )
+    plan = RevisionPlan("lease", ["Rent is due monthly.", "Tenant pays repairs.", "Term is two years."])
+
+    assert plan.previous_version == 1
+    assert plan.pending == [1, 2]
+    assert plan.entries[0]["analysis"] == {"risk": "low"}
+    assert plan.entries[0]["status"] == "unchanged"
+    summary = plan.summary()
+    assert (summary["unchanged"], summary["changed"], summary["new"]) == (2, 1, 0)
+
+    for i in plan.pending:
+        plan.entries[i] = plan.mark(i, {"clause": plan.clauses[i], "analysis": {"risk": "high"}})
+    assert plan.commit() == 2
+    assert models.latest_version("lease")[0] == 2
+
+
+def test_plan_without_history_analyses_everything():
+    plan = RevisionPlan("fresh", ["A.", "B."])
+    assert plan.previous_version == 0
+    assert plan.pending == [0, 1]
+    assert plan.summary()["previous_version"] is None